@@ -7,14 +7,20 @@ from app.models.user import UserInDB
 from app.services import auth_service
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
+from starlette.requests import Request
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{API_PREFIX}/users/login/token/")
 
 async def get_user_from_token(
     *,
+    request: Request,
     token: str = Depends(oauth2_scheme),
     user_repo: UsersRepository = Depends(get_repository(UsersRepository)),
 ) -> Optional[UserInDB]:
+    # Batched sub-requests carry the user already resolved for their token.
+    principal = getattr(request.state, "batch_principal", None)
+    if principal is not None and principal[0] == token:
+        return principal[1]
     try:
         username = auth_service.get_username_from_token(
             token=token, secret_key=str(SECRET_KEY))
@@ -39,3 +45,14 @@ def get_current_active_user(current_user: UserInDB = Depends(
             headers={"WWW-Authenticate": "Bearer"},
         )
     return current_user
+
+
+def get_current_superuser(
+    current_user: UserInDB = Depends(get_current_active_user),
+) -> UserInDB:
+    if not current_user.is_superuser:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Action forbidden. Superuser privileges are required.",
+        )
+    return current_user
@@ -1,16 +1,88 @@
-from typing import Callable, Type
+from typing import Callable, Optional, Type
 
+from app.api.dependencies.deadlines import get_deadline, run_with_deadline
+from app.db.connector import DatabaseConnector, is_connection_error
 from app.db.repositories.base import BaseRepository
+from app.db.unit_of_work import UnitOfWork
 from databases import Database
-from fastapi import Depends
+from fastapi import Depends, HTTPException, status
+from fastapi.routing import APIRoute
 from starlette.requests import Request
+from starlette.responses import Response
+
+MUTATING_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+
+def get_connector(request: Request) -> Optional[DatabaseConnector]:
+    return getattr(request.app.state, "_db_connector", None)
 
 
 def get_database(request: Request) -> Database:
-    return request.app.state._db
+    """
+    The primary database, or a 503 while it is unavailable.
+    """
+    connector = get_connector(request)
+    if connector is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="The database is not configured yet.",
+        )
+    connector.check()
+    return connector.database
 
 
 def get_repository(Repo_type: Type[BaseRepository]) -> Callable:
     def get_repo(db: Database = Depends(get_database)) -> Type[BaseRepository]:
         return Repo_type(db)
     return get_repo
+
+
+class UnitOfWorkRoute(APIRoute):
+    """
+    Runs the whole route, dependencies included, in a `UnitOfWork` on the
+    primary database. Mutating methods get a transaction, which commits
+    before the response goes out unless the route raised or answered with an
+    error status.
+
+    The route also runs under its deadline (see `deadlines`): past it, or once
+    the client disconnects, the handler and its query are cancelled. The
+    deadline doubles as each query's timeout (see `UnitOfWork`).
+
+    Connection errors answer 503 and count towards the connector's circuit
+    breaker; while it is open, requests get a 503 before touching the pool.
+
+    Not for routes whose work outlives the handler, like streaming responses,
+    or that fan out concurrent sub-requests, like batches.
+    """
+
+    def get_route_handler(self) -> Callable:
+        route_handler = super().get_route_handler()
+
+        async def unit_of_work_route_handler(request: Request) -> Response:
+            deadline = get_deadline(request, self.name)
+            database = get_database(request)
+            connector = get_connector(request)
+            await request.body()
+            try:
+                async with UnitOfWork(
+                    database,
+                    transactional=request.method in MUTATING_METHODS,
+                    statement_timeout=deadline,
+                ) as unit_of_work:
+                    response = await run_with_deadline(
+                        request, route_handler(request), deadline=deadline
+                    )
+                    if response.status_code >= 400:
+                        unit_of_work.set_rollback_only()
+            except Exception as e:
+                if not is_connection_error(e):
+                    raise
+                connector.record_failure(e)
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Lost the connection to the database, try again.",
+                )
+            connector.record_success()
+            return response
+
+        return unit_of_work_route_handler
@@ -0,0 +1,112 @@
+"""
+Request deadlines.
+
+A route gets REQUEST_DEADLINE_SECONDS, or its entry in ROUTE_DEADLINES. Clients
+can ask for another deadline with the `X-Request-Timeout` header (seconds),
+capped at REQUEST_DEADLINE_MAX_SECONDS.
+
+`run_with_deadline` runs a route handler as its own task and cancels it when
+the deadline passes or the client disconnects. Cancelling a task that is
+waiting on asyncpg also cancels the statement on the server, so the query
+stops and its pooled connection is freed instead of running to completion
+for nobody.
+"""
+
+import asyncio
+import math
+from typing import Awaitable, Dict, Iterable
+
+import asyncpg
+from app.core.config import (
+    REQUEST_DEADLINE_MAX_SECONDS,
+    REQUEST_DEADLINE_SECONDS,
+    ROUTE_DEADLINES,
+)
+from app.core.metrics import metrics
+from app.db.unit_of_work import StatementTimeoutError
+from fastapi import HTTPException, status
+from starlette.requests import Request
+from starlette.responses import Response
+
+DEADLINE_HEADER = "X-Request-Timeout"
+
+# Not a registered status; the nginx convention for "client closed request".
+# Only logs and metrics ever see it, the client is gone.
+CLIENT_CLOSED_REQUEST = 499
+
+
+def parse_route_deadlines(entries: Iterable[str]) -> Dict[str, float]:
+    deadlines = {}
+    for entry in entries:
+        name, _, seconds = entry.partition("=")
+        deadlines[name.strip()] = float(seconds)
+    return deadlines
+
+
+route_deadlines = parse_route_deadlines(ROUTE_DEADLINES)
+
+
+def get_deadline(request: Request, route_name: str) -> float:
+    header = request.headers.get(DEADLINE_HEADER)
+    if header is None:
+        return route_deadlines.get(route_name, REQUEST_DEADLINE_SECONDS)
+    try:
+        seconds = float(header)
+    except ValueError:
+        seconds = math.nan
+    if not 0 < seconds < math.inf:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"{DEADLINE_HEADER} must be a positive number of seconds.",
+        )
+    return min(seconds, REQUEST_DEADLINE_MAX_SECONDS)
+
+
+async def wait_for_disconnect(request: Request) -> None:
+    while (await request.receive())["type"] != "http.disconnect":
+        pass
+
+
+async def run_with_deadline(
+    request: Request, call: Awaitable[Response], *, deadline: float
+) -> Response:
+    """
+    Await `call` for at most `deadline` seconds, or until the client goes away.
+    Read the request body before calling this: disconnects are detected on the
+    same channel the body arrives on.
+    """
+    handler = asyncio.ensure_future(call)
+    disconnected = asyncio.ensure_future(wait_for_disconnect(request))
+    try:
+        await asyncio.wait(
+            {handler, disconnected},
+            timeout=deadline,
+            return_when=asyncio.FIRST_COMPLETED,
+        )
+    finally:
+        disconnected.cancel()
+        if not handler.done():
+            handler.cancel()
+            # Let the handler unwind (and asyncpg cancel its statement) before
+            # the caller releases the connection or rolls back.
+            await asyncio.wait({handler})
+
+    if not handler.cancelled():
+        try:
+            return handler.result()
+        except (asyncpg.exceptions.QueryCanceledError, StatementTimeoutError):
+            # The statement timed out, on the server or through asyncpg.
+            metrics.counter("db.cancellations.statement_timeout").inc()
+            raise deadline_exceeded()
+    if disconnected.done() and not disconnected.cancelled():
+        metrics.counter("db.cancellations.disconnect").inc()
+        return Response(status_code=CLIENT_CLOSED_REQUEST)
+    metrics.counter("db.cancellations.deadline").inc()
+    raise deadline_exceeded()
+
+
+def deadline_exceeded() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+        detail="The request did not finish within its deadline.",
+    )
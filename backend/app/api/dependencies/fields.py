@@ -0,0 +1,56 @@
+from typing import Any, Callable, Optional, Tuple, Type
+
+from app.models.core import prune_model
+from fastapi import HTTPException, Query, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+
+def get_fields(model: Type[BaseModel]) -> Callable:
+    """
+    Dependency parsing `?fields=a,b` against the attributes of `model`. Returns
+    the requested names in model order, or None when every field is wanted.
+    """
+
+    def get_requested_fields(
+        fields: Optional[str] = Query(
+            None, description="Comma separated list of fields to return."
+        ),
+    ) -> Optional[Tuple[str, ...]]:
+        if fields is None:
+            return None
+        requested = {name.strip() for name in fields.split(",") if name.strip()}
+        if not requested:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail="At least one field must be requested.",
+            )
+        unknown = requested - set(model.__fields__)
+        if unknown:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=f"Unknown fields requested: {', '.join(sorted(unknown))}.",
+            )
+        return tuple(name for name in model.__fields__ if name in requested)
+
+    return get_requested_fields
+
+
+def with_fields(fields: Tuple[str, ...], *extra: str) -> Tuple[str, ...]:
+    return fields + tuple(name for name in extra if name not in fields)
+
+
+def fields_response(
+    content: Any, *, model: Type[BaseModel], fields: Tuple[str, ...]
+) -> JSONResponse:
+    """
+    Serialize `content` (a model or list of models) through the pruned copy of
+    `model`. Returned directly so the full response_model does not reject it.
+    """
+    pruned = prune_model(model, fields)
+    if isinstance(content, list):
+        data = [pruned(**item.dict(include=set(fields))) for item in content]
+    else:
+        data = pruned(**content.dict(include=set(fields)))
+    return JSONResponse(content=jsonable_encoder(data))
@@ -0,0 +1,33 @@
+from typing import Callable, Type
+
+from app.api.dependencies.database import get_database
+from app.db.loaders import BatchLoader
+from app.db.repositories.base import BaseRepository
+from databases import Database
+from fastapi import Depends
+from starlette.requests import Request
+
+
+def get_loader(Repo_type: Type[BaseRepository], batch_method: str) -> Callable:
+    """
+    Dependency returning the request's `BatchLoader` for `Repo_type.batch_method`.
+    Every dependant in the same request shares the loader, so their loads are
+    batched and deduplicated together.
+    """
+
+    def get_batch_loader(
+        request: Request, db: Database = Depends(get_database)
+    ) -> BatchLoader:
+        loaders = getattr(request.state, "loaders", None)
+        if loaders is None:
+            loaders = request.state.loaders = {}
+        key = (Repo_type, batch_method)
+        if key not in loaders:
+            repo = Repo_type(db)
+            loaders[key] = BatchLoader(
+                f"{Repo_type.__name__}.{batch_method}",
+                lambda keys: getattr(repo, batch_method)(ids=keys),
+            )
+        return loaders[key]
+
+    return get_batch_loader
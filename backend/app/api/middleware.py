@@ -0,0 +1,25 @@
+from app.core.metrics import metrics
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+
+class InFlightRequestsMiddleware:
+    """
+    Counts the HTTP requests this worker is handling as `http.in_flight`.
+
+    Plain ASGI rather than `BaseHTTPMiddleware`, which would run the app in
+    another task and hide client disconnects from the routes.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+        self.in_flight = metrics.gauge("http.in_flight")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        self.in_flight.inc()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight.dec()
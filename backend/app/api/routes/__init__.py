@@ -1,5 +1,9 @@
+from app.api.routes.admin import router as admin_router
+from app.api.routes.batch import router as batch_router
+from app.api.routes.health import router as health_router
 from app.api.routes.hedgehogs import router as hedgehogs_router
 from app.api.routes.profiles import router as profiles_router
+from app.api.routes.streams import router as streams_router
 from app.api.routes.users import router as users_router
 from fastapi import APIRouter
 
@@ -7,3 +11,7 @@ router = APIRouter()
 router.include_router(hedgehogs_router, prefix="/hedgehogs", tags=["hedgehogs"])
 router.include_router(users_router, prefix="/users", tags=["users"])
 router.include_router(profiles_router, prefix="/profiles", tags=["profiles"])
+router.include_router(streams_router, prefix="/stream", tags=["stream"])
+router.include_router(batch_router, prefix="/batch", tags=["batch"])
+router.include_router(admin_router, prefix="/admin", tags=["admin"])
+router.include_router(health_router, prefix="/health", tags=["health"])
@@ -0,0 +1,77 @@
+from datetime import datetime
+from typing import Optional
+
+from app.api.dependencies.auth import get_current_superuser
+from app.api.dependencies.database import UnitOfWorkRoute, get_repository
+from app.db.repositories.jobs import JobsRepository
+from app.db.repositories.users import UsersRepository
+from app.models.job import JobPublic
+from app.models.user import (
+    AdminUserPage,
+    UserInDB,
+    UsersActivation,
+    UsersActivationResult,
+)
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, status
+
+router = APIRouter(route_class=UnitOfWorkRoute)
+
+
+@router.get("/users/", response_model=AdminUserPage, name="admin:list-users")
+async def list_users(
+    email: Optional[str] = Query(None, min_length=1, description="Email prefix."),
+    username: Optional[str] = Query(
+        None, min_length=1, description="Username prefix."
+    ),
+    is_active: Optional[bool] = Query(None),
+    created_after: Optional[datetime] = Query(None),
+    created_before: Optional[datetime] = Query(None),
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None),
+    current_user: UserInDB = Depends(get_current_superuser),
+    users_repo: UsersRepository = Depends(get_repository(UsersRepository)),
+) -> AdminUserPage:
+    return await users_repo.list_users(
+        limit=limit,
+        cursor=cursor,
+        email_prefix=email,
+        username_prefix=username,
+        is_active=is_active,
+        created_after=created_after,
+        created_before=created_before,
+    )
+
+
+@router.post(
+    "/users/activation/",
+    response_model=UsersActivationResult,
+    name="admin:set-users-active",
+)
+async def set_users_active(
+    activation: UsersActivation = Body(..., embed=True),
+    current_user: UserInDB = Depends(get_current_superuser),
+    users_repo: UsersRepository = Depends(get_repository(UsersRepository)),
+) -> UsersActivationResult:
+    if not activation.is_active and current_user.id in activation.user_ids:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Superusers cannot deactivate their own account.",
+        )
+    updated = await users_repo.set_users_active(
+        ids=activation.user_ids, is_active=activation.is_active
+    )
+    return UsersActivationResult(updated=updated)
+
+
+@router.get("/jobs/{job_id}/", response_model=JobPublic, name="admin:get-job")
+async def get_job(
+    job_id: int,
+    current_user: UserInDB = Depends(get_current_superuser),
+    jobs_repo: JobsRepository = Depends(get_repository(JobsRepository)),
+) -> JobPublic:
+    job = await jobs_repo.get_job_by_id(id=job_id)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="No job found with that id."
+        )
+    return job
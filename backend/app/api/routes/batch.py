@@ -0,0 +1,76 @@
+import asyncio
+from typing import Any, Dict, List
+
+from app.api.dependencies.database import get_database
+from app.core.config import BATCH_MAX_CONCURRENCY, BATCH_MAX_REQUESTS, SECRET_KEY
+from app.db.repositories.users import UsersRepository
+from app.models.batch import BatchRequestItem, BatchResponseItem
+from app.services import auth_service
+from app.services.batch import build_scope, group_requests, run_subrequest
+from fastapi import APIRouter, Body, HTTPException, status
+from fastapi.security.utils import get_authorization_scheme_param
+from starlette.requests import Request
+
+router = APIRouter()
+
+
+async def resolve_principal(request: Request) -> Dict[str, Any]:
+    """
+    Look the caller up once for the whole batch. Sub-requests presenting the
+    same token pick the user up from their scope state instead of querying.
+    """
+    scheme, token = get_authorization_scheme_param(
+        request.headers.get("Authorization")
+    )
+    if scheme.lower() != "bearer" or not token:
+        return {}
+    try:
+        username = auth_service.get_username_from_token(
+            token=token, secret_key=str(SECRET_KEY)
+        )
+    except HTTPException:
+        # Every sub-request will be rejected with the usual 401.
+        return {}
+    user = await UsersRepository(get_database(request)).get_user_by_username(
+        username=username
+    )
+    return {"batch_principal": (token, user)}
+
+
+@router.post("/", response_model=List[BatchResponseItem], name="batch:execute")
+async def execute_batch(
+    request: Request,
+    requests: List[BatchRequestItem] = Body(..., embed=True, min_items=1),
+) -> List[BatchResponseItem]:
+    if len(requests) > BATCH_MAX_REQUESTS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"A batch may contain at most {BATCH_MAX_REQUESTS} requests.",
+        )
+    excluded = (
+        request.app.url_path_for("batch:execute"),
+        request.app.url_path_for("stream:subscribe-changes"),
+    )
+    for item in requests:
+        if item.url.startswith(excluded):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"{item.url} cannot be called from a batch.",
+            )
+
+    # Run the lookup in its own task so the database connection it takes is
+    # not inherited by the sub-requests, which each need their own to run
+    # concurrently.
+    state = await asyncio.ensure_future(resolve_principal(request))
+    semaphore = asyncio.Semaphore(BATCH_MAX_CONCURRENCY)
+    responses: List[BatchResponseItem] = [None] * len(requests)
+
+    async def run(index: int, item: BatchRequestItem) -> None:
+        async with semaphore:
+            responses[index] = await run_subrequest(
+                request.app, build_scope(request.scope, item, state=state), item.body
+            )
+
+    for group in group_requests(requests):
+        await asyncio.gather(*(run(index, item) for index, item in group))
+    return responses
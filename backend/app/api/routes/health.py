@@ -0,0 +1,109 @@
+import asyncio
+import os
+import time
+
+from app.api.dependencies.auth import get_current_superuser
+from app.api.dependencies.database import get_connector
+from app.core.config import READINESS_PING_BUDGET_SECONDS
+from app.core.metrics import metrics
+from app.core.monitoring import event_loop_monitor
+from app.db.connector import PING_QUERY, is_connection_error
+from app.db.drivers import pool_stats
+from app.db.singleflight import single_flight
+from app.models.health import EventLoopLag, Liveness, Readiness, WorkerStats
+from app.models.user import UserInDB
+from app.services import profile_cache, username_index
+from fastapi import APIRouter, Depends, status
+from starlette.requests import Request
+from starlette.responses import Response
+
+router = APIRouter()
+
+
+@router.get("/live/", response_model=Liveness, name="health:liveness")
+async def liveness() -> Liveness:
+    """
+    The worker is up and its event loop answers. Says nothing about the
+    database, so a database outage doesn't get healthy workers restarted.
+    """
+    return Liveness(status="ok")
+
+
+@router.get(
+    "/ready/",
+    response_model=Readiness,
+    name="health:readiness",
+    responses={status.HTTP_503_SERVICE_UNAVAILABLE: {"model": Readiness}},
+)
+async def readiness(request: Request, response: Response) -> Readiness:
+    """
+    Whether to send this worker traffic: startup warm-up must have finished,
+    and the database must be available and answer a ping within
+    READINESS_PING_BUDGET_SECONDS.
+    """
+    connector = get_connector(request)
+    if not getattr(request.app.state, "_warmed_up", False):
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        return Readiness(
+            status="warming",
+            database=connector.status if connector else "unconfigured",
+        )
+    if connector is None or not connector.available:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        return Readiness(
+            status="unavailable",
+            database=connector.status if connector else "unconfigured",
+            detail=connector.last_error if connector else None,
+        )
+
+    start = time.perf_counter()
+    try:
+        await asyncio.wait_for(
+            connector.database.fetch_val(query=PING_QUERY),
+            timeout=READINESS_PING_BUDGET_SECONDS,
+        )
+    except asyncio.TimeoutError:
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        return Readiness(
+            status="unavailable",
+            database=connector.status,
+            detail=f"Ping took over {READINESS_PING_BUDGET_SECONDS * 1000:.0f}ms.",
+        )
+    except Exception as e:
+        if not is_connection_error(e):
+            raise
+        connector.record_failure(e)
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        return Readiness(status="unavailable", database=connector.status, detail=str(e))
+    ping = time.perf_counter() - start
+    metrics.histogram("health.ping_seconds").observe(ping)
+    return Readiness(status="ok", database=connector.status, ping_ms=ping * 1000)
+
+
+@router.get("/stats/", response_model=WorkerStats, name="health:worker-stats")
+async def worker_stats(
+    request: Request,
+    current_user: UserInDB = Depends(get_current_superuser),
+) -> WorkerStats:
+    """
+    Runtime numbers for the worker that served this request; each worker
+    process answers for itself.
+    """
+    connector = get_connector(request)
+    lag = metrics.histogram("event_loop.lag_seconds")
+    # No router until the connector has reached the database.
+    databases = connector.shards.databases if connector.shards else [connector.database]
+    return WorkerStats(
+        pid=os.getpid(),
+        in_flight_requests=int(metrics.gauge("http.in_flight").value),
+        event_loop_lag=EventLoopLag(
+            current_ms=event_loop_monitor.lag * 1000,
+            p99_ms=lag.percentile(99) * 1000,
+            max_ms=lag.max * 1000,
+        ),
+        database=connector.status,
+        pools=[pool_stats(db) for db in databases],
+        caches={"profiles": profile_cache.stats()},
+        single_flight_in_flight=single_flight.in_flight,
+        autocomplete_entries=len(username_index),
+    )
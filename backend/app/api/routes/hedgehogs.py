@@ -1,22 +1,47 @@
-from typing import List
+from typing import List, Optional, Tuple
 
 from app.api.dependencies.auth import get_current_active_user
-from app.api.dependencies.database import get_repository
+from app.api.dependencies.database import UnitOfWorkRoute, get_repository
+from app.api.dependencies.fields import fields_response, get_fields
 from app.api.dependencies.hedgehogs import (
     check_hedgehog_modification_permissions,
     get_hedgehog_by_id_from_path,
 )
+from app.api.dependencies.loaders import get_loader
+from app.db.loaders import BatchLoader
 from app.db.repositories.hedgehogs import HedgehogsRepository
+from app.db.repositories.users import UsersRepository
 from app.models.hedgehog import (
+    ColorType,
+    HedgehogCatalogPage,
     HedgehogCreate,
+    HedgehogExpansion,
     HedgehogInDB,
     HedgehogPublic,
+    HedgehogSearchPage,
     HedgehogUpdate,
 )
 from app.models.user import UserInDB
-from fastapi import APIRouter, Body, Depends, status
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, status
 
-router = APIRouter()
+router = APIRouter(route_class=UnitOfWorkRoute)
+
+get_users_loader = get_loader(UsersRepository, "get_public_users_by_ids")
+
+
+async def expand_hedgehogs(
+    hedgehogs: List[HedgehogInDB],
+    *,
+    expand: List[HedgehogExpansion],
+    users_loader: BatchLoader,
+) -> List[HedgehogPublic]:
+    if HedgehogExpansion.owner not in expand:
+        return hedgehogs
+    owners = await users_loader.load_many(hedgehog.owner for hedgehog in hedgehogs)
+    return [
+        hedgehog.copy(update={"owner": owners.get(hedgehog.owner) or hedgehog.owner})
+        for hedgehog in hedgehogs
+    ]
 
 
 @router.post(
@@ -39,10 +64,67 @@ async def create_new_hedgehog(
     "/", response_model=List[HedgehogPublic], name="hedgehogs:list-all-user-hedgehogs"
 )
 async def list_all_user_hedgehogs(
+    expand: List[HedgehogExpansion] = Query([]),
+    fields: Optional[Tuple[str, ...]] = Depends(get_fields(HedgehogPublic)),
     current_user: UserInDB = Depends(get_current_active_user),
     hedgehogs_repo: HedgehogsRepository = Depends(get_repository(HedgehogsRepository)),
+    users_loader: BatchLoader = Depends(get_users_loader),
 ) -> List[HedgehogPublic]:
-    return await hedgehogs_repo.list_all_user_hedgehogs(requesting_user=current_user)
+    if fields and "owner" not in fields:
+        expand = []
+    hedgehogs = await hedgehogs_repo.list_all_user_hedgehogs(
+        requesting_user=current_user, fields=fields
+    )
+    hedgehogs = await expand_hedgehogs(
+        hedgehogs, expand=expand, users_loader=users_loader
+    )
+    if fields:
+        return fields_response(hedgehogs, model=HedgehogPublic, fields=fields)
+    return hedgehogs
+
+
+@router.get(
+    "/catalog/",
+    response_model=HedgehogCatalogPage,
+    name="hedgehogs:browse-catalog",
+)
+async def browse_catalog(
+    color_type: Optional[ColorType] = Query(None),
+    min_age: Optional[float] = Query(None, ge=0),
+    max_age: Optional[float] = Query(None, ge=0),
+    name: Optional[str] = Query(None, min_length=1, max_length=100),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None),
+    hedgehogs_repo: HedgehogsRepository = Depends(get_repository(HedgehogsRepository)),
+) -> HedgehogCatalogPage:
+    if min_age is not None and max_age is not None and min_age > max_age:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="min_age cannot be greater than max_age.",
+        )
+    return await hedgehogs_repo.browse_catalog(
+        limit=limit,
+        cursor=cursor,
+        color_type=color_type,
+        min_age=min_age,
+        max_age=max_age,
+        name=name,
+    )
+
+
+@router.get(
+    "/search/",
+    response_model=HedgehogSearchPage,
+    name="hedgehogs:search-hedgehogs",
+)
+async def search_hedgehogs(
+    q: str = Query(..., min_length=2, max_length=100),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None),
+    current_user: UserInDB = Depends(get_current_active_user),
+    hedgehogs_repo: HedgehogsRepository = Depends(get_repository(HedgehogsRepository)),
+) -> HedgehogSearchPage:
+    return await hedgehogs_repo.search_hedgehogs(term=q, limit=limit, cursor=cursor)
 
 
 @router.get(
@@ -51,9 +133,19 @@ async def list_all_user_hedgehogs(
     name="hedgehogs:get-hedgehog-by-id",
 )
 async def get_hedgehog_by_id(
+    expand: List[HedgehogExpansion] = Query([]),
+    fields: Optional[Tuple[str, ...]] = Depends(get_fields(HedgehogPublic)),
     hedgehog: HedgehogInDB = Depends(get_hedgehog_by_id_from_path),
+    users_loader: BatchLoader = Depends(get_users_loader),
 ) -> HedgehogPublic:
-    return hedgehog
+    if fields and "owner" not in fields:
+        expand = []
+    expanded = await expand_hedgehogs(
+        [hedgehog], expand=expand, users_loader=users_loader
+    )
+    if fields:
+        return fields_response(expanded[0], model=HedgehogPublic, fields=fields)
+    return expanded[0]
 
 
 @router.put(
@@ -1,11 +1,21 @@
+from typing import Optional, Tuple
+
 from app.api.dependencies.auth import get_current_active_user
-from app.api.dependencies.database import get_repository
+from app.api.dependencies.database import UnitOfWorkRoute, get_repository
+from app.api.dependencies.fields import fields_response, get_fields, with_fields
 from app.db.repositories.profiles import ProfilesRepository
 from app.models.profile import ProfilePublic, ProfileUpdate
 from app.models.user import UserCreate, UserInDB, UserPublic, UserUpdate
+from app.services import profile_cache
+from app.services.profiles import (
+    cache_profile_response,
+    profile_cache_key,
+    profile_response,
+)
 from fastapi import APIRouter, Body, Depends, HTTPException, Path, status
+from fastapi.responses import Response
 
-router = APIRouter()
+router = APIRouter(route_class=UnitOfWorkRoute)
 
 
 @router.get(
@@ -15,16 +25,32 @@ router = APIRouter()
 )
 async def get_profile_by_username(
     username: str = Path(..., min_length=3, regex="^[a-zA-Z0-9_-]+$"),
+    fields: Optional[Tuple[str, ...]] = Depends(get_fields(ProfilePublic)),
     current_user: UserInDB = Depends(get_current_active_user),
     profiles_repo: ProfilesRepository = Depends(get_repository(ProfilesRepository)),
-) -> ProfilePublic:
-    profile = await profiles_repo.get_profile_by_username(username=username)
+) -> Response:
+    cache_key = profile_cache_key(username, fields)
+    cached_body = await profile_cache.get(cache_key)
+    if cached_body is not None:
+        return Response(content=cached_body, media_type="application/json")
+
+    # Read before the profile, so an update racing this read isn't cached.
+    cache_version = await profile_cache.version()
+    # user_id is always selected, it is needed to tag the cache entry.
+    profile = await profiles_repo.get_profile_by_username(
+        username=username, fields=with_fields(fields, "user_id") if fields else None
+    )
     if not profile:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="No profile found with that username.",
         )
-    return profile
+    if fields:
+        response = fields_response(profile, model=ProfilePublic, fields=fields)
+    else:
+        response = profile_response(profile)
+    await cache_profile_response(cache_key, profile, response, version=cache_version)
+    return response
 
 
 @router.put("/me/", response_model=ProfilePublic, name="profiles:update-own-profile")
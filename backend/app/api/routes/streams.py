@@ -0,0 +1,66 @@
+import asyncio
+from typing import AsyncIterator
+
+from app.api.dependencies.auth import get_current_active_user
+from app.core.config import STREAM_HEARTBEAT_SECONDS
+from app.models.user import UserInDB
+from app.services.streams import (
+    StreamLimitExceeded,
+    Subscription,
+    change_broadcaster,
+    format_sse,
+)
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import StreamingResponse
+from starlette.types import Receive, Scope, Send
+
+router = APIRouter()
+
+
+async def stream_subscription(subscription: Subscription) -> AsyncIterator[str]:
+    yield "retry: 3000\n\n"
+    while True:
+        try:
+            event = await asyncio.wait_for(
+                subscription.get(), timeout=STREAM_HEARTBEAT_SECONDS
+            )
+        except asyncio.TimeoutError:
+            yield ": keep-alive\n\n"
+            continue
+        yield format_sse(event)
+
+
+class SubscriptionResponse(StreamingResponse):
+    """
+    Streams a subscription as server-sent events. The subscription is released
+    when the response finishes however it ends, including when the client is
+    gone before the first event was sent and the generator never started.
+    """
+
+    media_type = "text/event-stream"
+
+    def __init__(self, subscription: Subscription) -> None:
+        super().__init__(
+            stream_subscription(subscription),
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+        self.subscription = subscription
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            change_broadcaster.unsubscribe(self.subscription)
+
+
+@router.get("/", name="stream:subscribe-changes")
+async def subscribe_to_changes(
+    current_user: UserInDB = Depends(get_current_active_user),
+) -> SubscriptionResponse:
+    try:
+        subscription = change_broadcaster.subscribe(owner=current_user.id)
+    except StreamLimitExceeded as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=str(e)
+        )
+    return SubscriptionResponse(subscription)
@@ -1,13 +1,17 @@
+from typing import List
+
 from app.api.dependencies.auth import get_current_active_user
-from app.api.dependencies.database import get_repository
+from app.api.dependencies.database import UnitOfWorkRoute, get_repository
+from app.db.repositories.user_stats import UserStatsRepository
 from app.db.repositories.users import UsersRepository
+from app.models.job import JobPublic
 from app.models.token import AccessToken
 from app.models.user import UserCreate, UserInDB, UserPublic
-from app.services import auth_service
-from fastapi import APIRouter, Body, Depends, HTTPException, status
+from app.services import auth_service, username_index
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, status
 from fastapi.security import OAuth2PasswordRequestForm
 
-router = APIRouter()
+router = APIRouter(route_class=UnitOfWorkRoute)
 
 
 @router.post(
@@ -54,5 +58,54 @@ async def user_login_with_email_and_password(
 @router.get("/me/", response_model=UserPublic, name="users:get-current-user")
 async def get_currently_authenticated_user(
     current_user: UserInDB = Depends(get_current_active_user),
+    user_stats_repo: UserStatsRepository = Depends(
+        get_repository(UserStatsRepository)
+    ),
+) -> UserPublic:
+    stats = await user_stats_repo.get_user_stats(user_id=current_user.id)
+    return current_user.copy(update={"stats": stats})
+
+
+@router.delete(
+    "/me/",
+    response_model=JobPublic,
+    name="users:delete-own-account",
+    status_code=status.HTTP_202_ACCEPTED,
+)
+async def delete_own_account(
+    current_user: UserInDB = Depends(get_current_active_user),
+    user_repo: UsersRepository = Depends(get_repository(UsersRepository)),
+) -> JobPublic:
+    return await user_repo.schedule_account_deletion(user=current_user)
+
+
+@router.get(
+    "/autocomplete/", response_model=List[str], name="users:autocomplete-username"
+)
+async def autocomplete_username(
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(None, ge=1),
+    current_user: UserInDB = Depends(get_current_active_user),
+) -> List[str]:
+    if not username_index.ready:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Username autocomplete is not available yet.",
+        )
+    return username_index.complete(q, limit=limit)
+
+
+@router.post(
+    "/verify-email/", response_model=UserPublic, name="users:verify-email"
+)
+async def verify_email(
+    token: str = Body(..., embed=True),
+    user_repo: UsersRepository = Depends(get_repository(UsersRepository)),
 ) -> UserPublic:
-    return current_user
+    verified_user = await user_repo.verify_email(token=token)
+    if not verified_user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No user found for that verification token.",
+        )
+    return verified_user
@@ -2,6 +2,7 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.core import config, tasks  # 追加
+from app.api.middleware import InFlightRequestsMiddleware
 from app.api.routes import router as api_router
 
 def get_application():
@@ -14,6 +15,7 @@ def get_application():
         allow_methods=["*"],
         allow_headers=["*"],
     )
+    app.add_middleware(InFlightRequestsMiddleware)
 
     app.add_event_handler("startup", tasks.create_start_app_handler(app))  # 追加
     app.add_event_handler("shutdown", tasks.create_stop_app_handler(app))  # 追加
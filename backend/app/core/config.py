@@ -1,6 +1,6 @@
 from databases import DatabaseURL
 from starlette.config import Config
-from starlette.datastructures import Secret
+from starlette.datastructures import CommaSeparatedStrings, Secret
 
 
 config = Config(".env")
@@ -30,3 +30,125 @@ DATABASE_URL = config(
     cast=DatabaseURL,
     default=f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_SERVER}:{POSTGRES_PORT}/{POSTGRES_DB}"
 )
+# "databases" (the wrapper) or "asyncpg" (a pool with cached prepared statements).
+DATABASE_DRIVER = config("DATABASE_DRIVER", cast=str, default="databases")
+DATABASE_STATEMENT_CACHE_SIZE = config(
+    "DATABASE_STATEMENT_CACHE_SIZE", cast=int, default=256
+)
+# Reconnect backoff while the database is unavailable, and how many connection
+# errors in a row mark it unavailable.
+DATABASE_RECONNECT_SECONDS = config(
+    "DATABASE_RECONNECT_SECONDS", cast=float, default=0.5
+)
+DATABASE_RECONNECT_MAX_SECONDS = config(
+    "DATABASE_RECONNECT_MAX_SECONDS", cast=float, default=30.0
+)
+DATABASE_BREAKER_FAILURE_THRESHOLD = config(
+    "DATABASE_BREAKER_FAILURE_THRESHOLD", cast=int, default=3
+)
+# Startup warm-up: connections to open per pool (capped at the pool's maximum)
+# and recently updated profiles to preload into the profile cache.
+WARMUP_POOL_SIZE = config("WARMUP_POOL_SIZE", cast=int, default=5)
+WARMUP_PROFILE_CACHE_SIZE = config("WARMUP_PROFILE_CACHE_SIZE", cast=int, default=100)
+# Readiness fails when a ping to the database takes longer than this.
+READINESS_PING_BUDGET_SECONDS = config(
+    "READINESS_PING_BUDGET_SECONDS", cast=float, default=0.25
+)
+EVENT_LOOP_MONITOR_INTERVAL_SECONDS = config(
+    "EVENT_LOOP_MONITOR_INTERVAL_SECONDS", cast=float, default=0.5
+)
+# Deadline for requests on unit-of-work routes, per-route overrides as
+# "route-name=seconds", and the most a client may ask for in X-Request-Timeout.
+REQUEST_DEADLINE_SECONDS = config("REQUEST_DEADLINE_SECONDS", cast=float, default=10.0)
+REQUEST_DEADLINE_MAX_SECONDS = config(
+    "REQUEST_DEADLINE_MAX_SECONDS", cast=float, default=30.0
+)
+ROUTE_DEADLINES = config("ROUTE_DEADLINES", cast=CommaSeparatedStrings, default="")
+# Extra databases holding hedgehogs, shards 1..n (the primary is shard 0).
+SHARD_DATABASE_URLS = config(
+    "SHARD_DATABASE_URLS", cast=CommaSeparatedStrings, default=""
+)
+
+JOB_WORKER_CONCURRENCY = config("JOB_WORKER_CONCURRENCY", cast=int, default=4)
+JOB_POLL_INTERVAL_SECONDS = config("JOB_POLL_INTERVAL_SECONDS", cast=float, default=1.0)
+JOB_LOCK_TIMEOUT_SECONDS = config("JOB_LOCK_TIMEOUT_SECONDS", cast=float, default=300.0)
+JOB_MAX_ATTEMPTS = config("JOB_MAX_ATTEMPTS", cast=int, default=5)
+JOB_RETRY_BACKOFF_SECONDS = config("JOB_RETRY_BACKOFF_SECONDS", cast=float, default=2.0)
+JOB_RETRY_BACKOFF_MAX_SECONDS = config(
+    "JOB_RETRY_BACKOFF_MAX_SECONDS", cast=float, default=600.0
+)
+JOB_METRICS_LOG_INTERVAL_SECONDS = config(
+    "JOB_METRICS_LOG_INTERVAL_SECONDS", cast=float, default=60.0
+)
+
+EMAIL_VERIFICATION_AUDIENCE = config(
+    "EMAIL_VERIFICATION_AUDIENCE", cast=str, default="phresh:verify-email"
+)
+EMAIL_VERIFICATION_EXPIRE_MINUTES = config(
+    "EMAIL_VERIFICATION_EXPIRE_MINUTES", cast=int, default=24 * 60
+)
+EMAIL_VERIFICATION_URL = config(
+    "EMAIL_VERIFICATION_URL",
+    cast=str,
+    default="http://localhost:3000/verify-email?token={token}",
+)
+
+SMTP_HOST = config("SMTP_HOST", cast=str, default="localhost")
+SMTP_PORT = config("SMTP_PORT", cast=int, default=25)
+SMTP_USERNAME = config("SMTP_USERNAME", cast=str, default="")
+SMTP_PASSWORD = config("SMTP_PASSWORD", cast=Secret, default="")
+SMTP_USE_TLS = config("SMTP_USE_TLS", cast=bool, default=False)
+SMTP_TIMEOUT_SECONDS = config("SMTP_TIMEOUT_SECONDS", cast=float, default=10.0)
+MAIL_FROM = config("MAIL_FROM", cast=str, default="no-reply@hedgehog-reservation.com")
+MAIL_BATCH_SIZE = config("MAIL_BATCH_SIZE", cast=int, default=50)
+MAIL_BATCH_WAIT_SECONDS = config("MAIL_BATCH_WAIT_SECONDS", cast=float, default=0.05)
+MAIL_SMTP_POOL_SIZE = config("MAIL_SMTP_POOL_SIZE", cast=int, default=2)
+
+CHANGE_LISTENER_KEEPALIVE_SECONDS = config(
+    "CHANGE_LISTENER_KEEPALIVE_SECONDS", cast=float, default=5.0
+)
+CHANGE_LISTENER_RECONNECT_SECONDS = config(
+    "CHANGE_LISTENER_RECONNECT_SECONDS", cast=float, default=0.5
+)
+CHANGE_LISTENER_RECONNECT_MAX_SECONDS = config(
+    "CHANGE_LISTENER_RECONNECT_MAX_SECONDS", cast=float, default=30.0
+)
+
+STREAM_SUBSCRIBER_BUFFER_SIZE = config(
+    "STREAM_SUBSCRIBER_BUFFER_SIZE", cast=int, default=100
+)
+STREAM_MAX_SUBSCRIBERS = config("STREAM_MAX_SUBSCRIBERS", cast=int, default=10000)
+STREAM_HEARTBEAT_SECONDS = config("STREAM_HEARTBEAT_SECONDS", cast=float, default=15.0)
+
+CACHE_BACKEND = config("CACHE_BACKEND", cast=str, default="memory")
+CACHE_MAX_ENTRIES = config("CACHE_MAX_ENTRIES", cast=int, default=10000)
+REDIS_URL = config("REDIS_URL", cast=str, default="redis://localhost:6379/0")
+REDIS_TIMEOUT_SECONDS = config("REDIS_TIMEOUT_SECONDS", cast=float, default=1.0)
+PROFILE_CACHE_TTL_SECONDS = config(
+    "PROFILE_CACHE_TTL_SECONDS", cast=float, default=60.0
+)
+
+BATCH_MAX_REQUESTS = config("BATCH_MAX_REQUESTS", cast=int, default=20)
+BATCH_MAX_CONCURRENCY = config("BATCH_MAX_CONCURRENCY", cast=int, default=5)
+
+AUTOCOMPLETE_MAX_RESULTS = config("AUTOCOMPLETE_MAX_RESULTS", cast=int, default=10)
+CATALOG_EXACT_COUNT_THRESHOLD = config(
+    "CATALOG_EXACT_COUNT_THRESHOLD", cast=int, default=1000
+)
+
+ACCOUNT_DELETION_BATCH_SIZE = config(
+    "ACCOUNT_DELETION_BATCH_SIZE", cast=int, default=500
+)
+ACCOUNT_DELETION_BATCH_PAUSE_SECONDS = config(
+    "ACCOUNT_DELETION_BATCH_PAUSE_SECONDS", cast=float, default=0.05
+)
+
+HEDGEHOG_ARCHIVE_AFTER_DAYS = config(
+    "HEDGEHOG_ARCHIVE_AFTER_DAYS", cast=float, default=30.0
+)
+HEDGEHOG_ARCHIVE_INTERVAL_SECONDS = config(
+    "HEDGEHOG_ARCHIVE_INTERVAL_SECONDS", cast=float, default=3600.0
+)
+HEDGEHOG_ARCHIVE_BATCH_SIZE = config(
+    "HEDGEHOG_ARCHIVE_BATCH_SIZE", cast=int, default=1000
+)
@@ -0,0 +1,49 @@
+"""
+Per-worker runtime signals for the stats endpoint.
+
+`EventLoopMonitor` wakes up every EVENT_LOOP_MONITOR_INTERVAL_SECONDS and
+records how late it was. The delay is time the loop spent on other work
+without yielding, e.g. CPU-heavy serialization or a blocking call, and every
+request on the worker waited that long too.
+"""
+
+import asyncio
+from typing import Optional
+
+from app.core.config import EVENT_LOOP_MONITOR_INTERVAL_SECONDS
+from app.core.metrics import metrics
+
+
+class EventLoopMonitor:
+    def __init__(
+        self, *, interval: float = EVENT_LOOP_MONITOR_INTERVAL_SECONDS
+    ) -> None:
+        self.interval = interval
+        self.lag = 0.0
+        self._lag = metrics.histogram("event_loop.lag_seconds")
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.lag = max(0.0, loop.time() - expected)
+            self._lag.observe(self.lag)
+
+
+event_loop_monitor = EventLoopMonitor()
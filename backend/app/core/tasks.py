@@ -1,18 +1,59 @@
+import asyncio
+import logging
+import time
 from typing import Callable
 from fastapi import FastAPI
 
-from app.db.tasks import connect_to_db, close_db_connection
+from app.core.config import SHARD_DATABASE_URLS
+from app.core.monitoring import event_loop_monitor
+from app.core.warmup import rewarm_database, warm_up
+from app.db.events import change_listener
+from app.db.repositories.users import UsersRepository
+from app.db.tasks import connect_to_db, close_db_connection, get_database_url
+from app.services import profile_cache, username_index
+from app.services.streams import change_broadcaster
+
+logger = logging.getLogger(__name__)
 
 
 def create_start_app_handler(app: FastAPI) -> Callable:
     async def start_app() -> None:
+        started_at = time.perf_counter()
+        await event_loop_monitor.start()
         await connect_to_db(app)
+        change_broadcaster.attach(change_listener)
+        if not profile_cache.shared:
+            change_listener.register_cache(profile_cache, "users", "profiles")
+        change_listener.subscribe("users", username_index.apply)
+        change_listener.on_flush(username_index.rebuild)
+        # Hedgehog changes are notified on the shard they are written to.
+        await change_listener.start(str(get_database_url()), *SHARD_DATABASE_URLS)
+        try:
+            await username_index.build(UsersRepository(app.state._db))
+        except Exception as e:
+            logger.warn("--- USERNAME INDEX BUILD ERROR ---")
+            logger.warn(e)
+        connector = app.state._db_connector
+        # Started while the database was down: build once it is back.
+        connector.on_recover(username_index.rebuild)
+        connector.on_recover(lambda: rewarm_database(connector))
+        app.state._change_listener = change_listener
+        # Readiness answers "warming" until this is done.
+        app.state._warmed_up = False
+        app.state._warm_up_task = asyncio.create_task(
+            warm_up(app, started_at=started_at)
+        )
 
     return start_app
 
 
 def create_stop_app_handler(app: FastAPI) -> Callable:
     async def stop_app() -> None:
+        warm_up_task = getattr(app.state, "_warm_up_task", None)
+        if warm_up_task is not None:
+            warm_up_task.cancel()
+        await change_listener.stop()
         await close_db_connection(app)
+        await event_loop_monitor.stop()
 
     return stop_app
@@ -0,0 +1,190 @@
+"""
+Startup warm-up.
+
+A fresh worker's first requests pay for its pools opening connections past
+min_size, Postgres parsing and planning each statement per connection,
+passlib loading its bcrypt backend, the first runs of pydantic validation,
+email validation and the JSON encoder, and an empty profile cache. `warm_up`
+does that work before traffic arrives.
+
+It runs in the background, so liveness answers from the start, and
+readiness reports "warming" until it is done. Each step is best effort: a
+failed step is logged and the worker still becomes ready, only colder. The
+database steps run again when the database comes back after an outage, which
+leaves the pools cold too, unless requests already hold pooled connections:
+those warm the pools themselves, and warm-up would only hold connections they
+wait for.
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable
+
+from app.core.config import SECRET_KEY, WARMUP_POOL_SIZE, WARMUP_PROFILE_CACHE_SIZE
+from app.core.metrics import metrics
+from app.db.connector import PING_QUERY, DatabaseConnector
+from app.db.drivers import pool_stats, warm_pool
+from app.db.registry import query_registry
+from app.db.repositories.profiles import ProfilesRepository
+from app.db.unit_of_work import SET_STATEMENT_TIMEOUT_QUERY
+from app.models.hedgehog import ColorType, HedgehogCatalogPage, HedgehogPublic
+from app.models.profile import ProfilePublic
+from app.models.user import UserBase, UserPublic
+from app.services import auth_service, profile_cache
+from app.services.profiles import (
+    cache_profile_response,
+    profile_cache_key,
+    profile_response,
+)
+from fastapi import FastAPI
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+# Statements most requests run, prepared on every warmed connection. Shards
+# only have the hedgehog tables.
+HOT_QUERIES = (
+    "users.get_user_by_username",
+    "users.get_user_by_email",
+    "profiles.get_profile_by_user_id",
+    "profiles.get_profile_by_username",
+    "hedgehogs.get_hedgehog_by_id",
+    "hedgehogs.list_all_user_hedgehogs",
+    "hedgehogs.create_hedgehog",
+    "hedgehogs.update_hedgehog_by_id",
+)
+SHARD_QUERY_PREFIX = "hedgehogs."
+
+
+async def warm_up(app: FastAPI, *, started_at: float) -> None:
+    """
+    Warm the worker, then mark it ready. `started_at` is when startup began
+    (`time.perf_counter()`), for the time-to-ready metric.
+    """
+    connector: DatabaseConnector = app.state._db_connector
+    await run_step("auth", warm_auth)
+    await run_step("models", warm_models)
+    if connector.available:
+        await warm_database(connector)
+    app.state._warmed_up = True
+    time_to_ready = time.perf_counter() - started_at
+    metrics.gauge("startup.time_to_ready_seconds").set(time_to_ready)
+    logger.info("Worker warmed up %.2fs after startup began", time_to_ready)
+
+
+async def warm_database(connector: DatabaseConnector) -> None:
+    await run_step("pools", lambda: warm_pools(connector))
+    await run_step("caches", lambda: preload_caches(connector))
+
+
+async def rewarm_database(connector: DatabaseConnector) -> None:
+    """
+    `warm_database` for the connector's recover hook, skipped while any pool
+    has connections in use.
+    """
+    for db in connector.shards.databases:
+        stats = pool_stats(db)
+        if stats is not None and stats["in_use"]:
+            metrics.counter("startup.warm_up.skipped").inc()
+            return
+    await warm_database(connector)
+
+
+async def run_step(name: str, step: Callable[[], Awaitable[None]]) -> None:
+    try:
+        with metrics.timer(f"startup.warm_up.{name}"):
+            await step()
+    except Exception as e:
+        logger.warn(f"--- WARM-UP {name.upper()} ERROR ---")
+        logger.warn(e)
+        logger.warn(f"--- WARM-UP {name.upper()} ERROR ---")
+
+
+async def warm_pools(connector: DatabaseConnector) -> None:
+    statements = [
+        PING_QUERY,
+        SET_STATEMENT_TIMEOUT_QUERY,
+        *(query_registry[name] for name in HOT_QUERIES),
+    ]
+    # Units of work, and so their statement timeout, only run on the primary.
+    shard_statements = [
+        PING_QUERY,
+        *(s for s in statements if s.name.startswith(SHARD_QUERY_PREFIX)),
+    ]
+    primary, *shards = connector.shards.databases
+    warmed = await asyncio.gather(
+        warm_pool(primary, size=WARMUP_POOL_SIZE, statements=statements),
+        *(
+            warm_pool(shard, size=WARMUP_POOL_SIZE, statements=shard_statements)
+            for shard in shards
+        ),
+    )
+    metrics.gauge("startup.warm_up.connections").set(sum(warmed))
+
+
+async def warm_auth() -> None:
+    user = UserBase(email="warm-up@example.com", username="warm_up")
+    token = auth_service.create_access_token_for_user(
+        user=user, secret_key=str(SECRET_KEY)
+    )
+    auth_service.get_username_from_token(token=token, secret_key=str(SECRET_KEY))
+    # bcrypt is slow on purpose; keep the loop free for liveness meanwhile.
+    salt = auth_service.generate_salt()
+    await asyncio.get_running_loop().run_in_executor(
+        None, lambda: auth_service.hash_password(password="warm-up", salt=salt)
+    )
+
+
+async def warm_models() -> None:
+    now = datetime.now(timezone.utc)
+    profile = ProfilePublic(
+        id=0,
+        user_id=0,
+        username="warm_up",
+        email="warm-up@example.com",
+        full_name="Warm Up",
+        image="https://example.com/warm-up.png",
+        created_at=now,
+        updated_at=now,
+    )
+    user = UserPublic(
+        id=0,
+        email="warm-up@example.com",
+        username="warm_up",
+        profile=profile,
+        created_at=now,
+        updated_at=now,
+    )
+    hedgehog = HedgehogPublic(
+        id=0,
+        name="Warm Up",
+        description="",
+        age=1.0,
+        color_type=ColorType.chocolate,
+        owner=user,
+        created_at=now,
+        updated_at=now,
+    )
+    page = HedgehogCatalogPage(
+        results=[hedgehog], next_cursor=None, total=1, total_is_estimate=False
+    )
+    for model in (profile, user, hedgehog, page):
+        JSONResponse(content=jsonable_encoder(model))
+
+
+async def preload_caches(connector: DatabaseConnector) -> None:
+    version = await profile_cache.version()
+    profiles = await ProfilesRepository(
+        connector.database
+    ).list_recently_updated_profiles(limit=WARMUP_PROFILE_CACHE_SIZE)
+    for profile in profiles:
+        await cache_profile_response(
+            profile_cache_key(profile.username),
+            profile,
+            profile_response(profile),
+            version=version,
+        )
+    metrics.gauge("startup.warm_up.profiles_cached").set(len(profiles))
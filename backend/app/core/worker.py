@@ -0,0 +1,195 @@
+"""
+Background job worker.
+
+Run it next to the API with `python -m app.core.worker`. Any number of worker
+processes can share the same `jobs` table; `FOR UPDATE SKIP LOCKED` guarantees
+that each job is claimed by exactly one of them.
+"""
+
+import argparse
+import asyncio
+import logging
+import signal
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from app.core.config import (
+    JOB_LOCK_TIMEOUT_SECONDS,
+    JOB_METRICS_LOG_INTERVAL_SECONDS,
+    JOB_POLL_INTERVAL_SECONDS,
+    JOB_WORKER_CONCURRENCY,
+    SHARD_DATABASE_URLS,
+)
+from app.core.metrics import metrics
+from app.db.drivers import create_database
+from app.db.repositories.jobs import JobsRepository
+from app.db.shards import connect_shards, disconnect_shards
+from app.db.tasks import get_database_url
+from app.models.job import JobCreate, JobInDB
+from app.services import job_handlers  # noqa: F401
+from app.services import job_registry, mail_service
+from app.services.jobs import JobRegistry, get_retry_delay
+from databases import Database
+
+logger = logging.getLogger(__name__)
+
+
+class Worker:
+    def __init__(
+        self,
+        db: Database,
+        *,
+        registry: JobRegistry = job_registry,
+        concurrency: int = JOB_WORKER_CONCURRENCY,
+        poll_interval: float = JOB_POLL_INTERVAL_SECONDS,
+        lock_timeout: float = JOB_LOCK_TIMEOUT_SECONDS,
+    ) -> None:
+        self.db = db
+        self.registry = registry
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.lock_timeout = lock_timeout
+        self.jobs_repo = JobsRepository(db)
+        self._stopping: Optional[asyncio.Event] = None
+
+    async def run(self) -> None:
+        self._stopping = asyncio.Event()
+        logger.info(
+            "Worker started with concurrency=%s for tasks %s",
+            self.concurrency,
+            self.registry.tasks,
+        )
+        for task in self.registry.periodic_tasks:
+            await self.jobs_repo.schedule_job_once(new_job=JobCreate(task=task))
+        consumers = [
+            asyncio.create_task(self._consume()) for _ in range(self.concurrency)
+        ]
+        reporter = asyncio.create_task(self._report())
+        try:
+            await asyncio.gather(*consumers)
+        finally:
+            reporter.cancel()
+
+    def stop(self) -> None:
+        if self._stopping is not None:
+            self._stopping.set()
+
+    async def run_once(self) -> bool:
+        job = await self.jobs_repo.claim_next_job(
+            tasks=self.registry.tasks, lock_timeout=self.lock_timeout
+        )
+        if not job:
+            return False
+        await self.process_job(job=job)
+        return True
+
+    async def process_job(self, *, job: JobInDB) -> None:
+        handler = self.registry.get(job.task)
+        if job.locked_at:
+            metrics.histogram("jobs.queue_latency_seconds").observe(
+                max(0.0, (job.locked_at - job.run_at).total_seconds())
+            )
+        try:
+            if handler is None:
+                raise LookupError(f"No handler registered for task {job.task!r}.")
+            with metrics.timer("jobs.run_seconds"):
+                await handler(db=self.db, job=job)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            if job.attempts < job.max_attempts:
+                delay = get_retry_delay(job.attempts)
+                await self.jobs_repo.retry_job(job=job, error=error, delay=delay)
+                metrics.counter("jobs.retried").inc()
+                logger.warning(
+                    "Job %s (%s) failed on attempt %s, retrying in %.1fs: %s",
+                    job.id, job.task, job.attempts, delay, error,
+                )
+            else:
+                await self.jobs_repo.fail_job(job=job, error=error)
+                metrics.counter("jobs.failed").inc()
+                logger.error(
+                    "Job %s (%s) failed permanently after %s attempts: %s",
+                    job.id, job.task, job.attempts, error,
+                )
+        else:
+            await self.jobs_repo.complete_job(job=job)
+            metrics.counter("jobs.completed").inc()
+
+        interval = self.registry.interval(job.task)
+        if interval is not None:
+            # A no-op while this run is queued again for a retry.
+            await self.jobs_repo.schedule_job_once(
+                new_job=JobCreate(
+                    task=job.task,
+                    run_at=datetime.now(timezone.utc) + timedelta(seconds=interval),
+                )
+            )
+
+    async def _consume(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                ran = await self.run_once()
+            except Exception as e:
+                logger.warning("--- JOB CLAIM ERROR ---")
+                logger.warning(e)
+                ran = False
+            if not ran:
+                try:
+                    await asyncio.wait_for(
+                        self._stopping.wait(), timeout=self.poll_interval
+                    )
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _report(self) -> None:
+        completed = metrics.counter("jobs.completed")
+        last_count, last_time = completed.value, time.monotonic()
+        while True:
+            await asyncio.sleep(JOB_METRICS_LOG_INTERVAL_SECONDS)
+            now = time.monotonic()
+            throughput = (completed.value - last_count) / (now - last_time)
+            latency = metrics.histogram("jobs.queue_latency_seconds").snapshot()
+            logger.info(
+                "Jobs: %.2f/s completed, queue latency p50=%.3fs p95=%.3fs, %s",
+                throughput,
+                latency["p50"],
+                latency["p95"],
+                metrics.snapshot(prefix="jobs."),
+            )
+            last_count, last_time = completed.value, now
+
+
+async def run_worker(concurrency: int, poll_interval: float) -> None:
+    database = create_database(
+        get_database_url(), min_size=1, max_size=concurrency + 1
+    )
+    await database.connect()
+    shards = await connect_shards(database, SHARD_DATABASE_URLS)
+    worker = Worker(database, concurrency=concurrency, poll_interval=poll_interval)
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, worker.stop)
+    try:
+        await worker.run()
+    finally:
+        await mail_service.close()
+        await disconnect_shards(shards)
+        await database.disconnect()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the background job worker.")
+    parser.add_argument("--concurrency", type=int, default=JOB_WORKER_CONCURRENCY)
+    parser.add_argument(
+        "--poll-interval", type=float, default=JOB_POLL_INTERVAL_SECONDS
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(run_worker(args.concurrency, args.poll_interval))
+
+
+if __name__ == "__main__":
+    main()
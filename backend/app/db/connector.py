@@ -0,0 +1,205 @@
+"""
+Primary database (and shards) lifecycle, with a circuit breaker.
+
+The app never depends on Postgres being up when it starts. `DatabaseConnector`
+creates the primary database object straight away, so `app.state._db` always
+exists, and connects it in the background if the first attempt fails.
+
+While the database is unavailable the breaker is open: `check()` fails
+requests fast with a 503 instead of letting each of them queue for a
+connection that will not come. A single background task retries with
+exponential backoff (connect if we never have, then `SELECT 1` on every
+database) and closes the breaker once everything answers again.
+
+The breaker opens when connecting fails, or after
+DATABASE_BREAKER_FAILURE_THRESHOLD connection errors in a row are reported
+through `record_failure`. A shard layout that disagrees with the databases is
+not retried: it fails startup, or leaves the breaker open if found later.
+"""
+
+import asyncio
+import inspect
+import logging
+import math
+from typing import Any, Callable, List, Optional, Sequence
+
+import asyncpg
+from app.core.config import (
+    DATABASE_BREAKER_FAILURE_THRESHOLD,
+    DATABASE_RECONNECT_MAX_SECONDS,
+    DATABASE_RECONNECT_SECONDS,
+)
+from app.core.metrics import metrics
+from app.db.drivers import create_database
+from app.db.registry import compile_query
+from app.db.shards import (
+    ShardLayoutError,
+    ShardRouter,
+    connect_shards,
+    disconnect_shards,
+)
+from databases import DatabaseURL
+from fastapi import HTTPException, status
+
+logger = logging.getLogger(__name__)
+
+PING_QUERY = compile_query("SELECT 1", name="connector.ping")
+
+# What a request sees when the database, rather than the query, is the problem.
+CONNECTION_ERRORS = (
+    OSError,
+    asyncio.TimeoutError,
+    asyncpg.exceptions.InterfaceError,
+    asyncpg.exceptions.PostgresConnectionError,
+    asyncpg.exceptions.CannotConnectNowError,
+    asyncpg.exceptions.AdminShutdownError,
+)
+
+
+def is_connection_error(error: BaseException) -> bool:
+    return isinstance(error, CONNECTION_ERRORS)
+
+
+class DatabaseConnector:
+    def __init__(
+        self,
+        url: DatabaseURL,
+        *,
+        shard_urls: Sequence[str] = (),
+        min_size: int = 2,
+        max_size: int = 5,
+        failure_threshold: int = DATABASE_BREAKER_FAILURE_THRESHOLD,
+        reconnect_delay: float = DATABASE_RECONNECT_SECONDS,
+        reconnect_max_delay: float = DATABASE_RECONNECT_MAX_SECONDS,
+    ) -> None:
+        self.database = create_database(url, min_size=min_size, max_size=max_size)
+        self.shard_urls = list(shard_urls)
+        self.shards: Optional[ShardRouter] = None
+        self.failure_threshold = failure_threshold
+        self.reconnect_delay = reconnect_delay
+        self.reconnect_max_delay = reconnect_max_delay
+        self.available = False
+        self.failures = 0
+        self.last_error: Optional[str] = None
+        self._retry_delay = reconnect_delay
+        self._recover_handlers: List[Callable[[], Any]] = []
+        self._task: Optional[asyncio.Task] = None
+        self._available = metrics.gauge("db.available")
+
+    @property
+    def status(self) -> str:
+        return "ok" if self.available else "degraded"
+
+    def on_recover(self, handler: Callable[[], Any]) -> None:
+        """
+        Handlers (sync or async) run each time the database comes back after
+        being unavailable, including when it first comes up late.
+        """
+        if handler not in self._recover_handlers:
+            self._recover_handlers.append(handler)
+
+    async def start(self) -> None:
+        try:
+            await self._connect()
+        except ShardLayoutError:
+            raise
+        except Exception as e:
+            logger.warn("--- DATABASE CONNECTION ERROR ---")
+            logger.warn(e)
+            logger.warn("--- DATABASE CONNECTION ERROR ---")
+            self._trip(e)
+            return
+        self._close()
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.available = False
+        self._available.set(0)
+        if self.shards is not None:
+            await disconnect_shards(self.shards)
+            self.shards = None
+        if self.database.is_connected:
+            await self.database.disconnect()
+
+    def check(self) -> None:
+        if self.available:
+            return
+        metrics.counter("db.breaker.rejected").inc()
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="The database is unavailable, try again shortly.",
+            headers={"Retry-After": str(math.ceil(self._retry_delay))},
+        )
+
+    def record_success(self) -> None:
+        self.failures = 0
+
+    def record_failure(self, error: BaseException) -> None:
+        self.failures += 1
+        self.last_error = str(error)
+        if self.available and self.failures >= self.failure_threshold:
+            logger.warn("--- DATABASE UNAVAILABLE ---")
+            logger.warn(error)
+            logger.warn("--- DATABASE UNAVAILABLE ---")
+            self._trip(error)
+
+    async def _connect(self) -> None:
+        if not self.database.is_connected:
+            await self.database.connect()
+        if self.shards is None:
+            self.shards = await connect_shards(self.database, self.shard_urls)
+        for db in self.shards.databases:
+            await db.fetch_val(query=PING_QUERY)
+
+    def _trip(self, error: BaseException) -> None:
+        self.available = False
+        self.last_error = str(error)
+        self._available.set(0)
+        metrics.counter("db.breaker.opened").inc()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._recover())
+
+    def _close(self) -> None:
+        self.available = True
+        self.failures = 0
+        self.last_error = None
+        self._retry_delay = self.reconnect_delay
+        self._available.set(1)
+
+    async def _recover(self) -> None:
+        self._retry_delay = self.reconnect_delay
+        while True:
+            await asyncio.sleep(self._retry_delay)
+            metrics.counter("db.reconnect.attempts").inc()
+            try:
+                await self._connect()
+            except ShardLayoutError as e:
+                logger.warn("--- SHARD LAYOUT ERROR ---")
+                logger.warn(e)
+                logger.warn("--- SHARD LAYOUT ERROR ---")
+                self.last_error = str(e)
+                return
+            except Exception as e:
+                self.last_error = str(e)
+                self._retry_delay = min(
+                    self._retry_delay * 2, self.reconnect_max_delay
+                )
+                continue
+            break
+        logger.info("Database available again")
+        self._close()
+        for handler in list(self._recover_handlers):
+            try:
+                result = handler()
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                logger.warn("--- DATABASE RECOVER HANDLER ERROR ---")
+                logger.warn(e)
+                logger.warn("--- DATABASE RECOVER HANDLER ERROR ---")
@@ -0,0 +1,429 @@
+"""
+Database drivers.
+
+Repositories talk to a `databases.Database`. DATABASE_DRIVER chooses what
+backs it:
+
+- "databases" (default): the `databases` wrapper. Raw SQL strings go through
+  SQLAlchemy `text()` on every call as before. Queries compiled by the
+  registry (`app.db.registry`) run on the wrapper's asyncpg connection as
+  they are.
+- "asyncpg": `AsyncpgDatabase`, an asyncpg pool behind the same
+  fetch_one/fetch_all/fetch_val/execute/transaction API. asyncpg prepares
+  each statement on first use and caches it per connection, so constant
+  queries skip parsing and planning after that. Records are asyncpg's own
+  and go straight into the models.
+
+Both drivers time every query as `db.query.<driver>.<name>`. Here `<name>` is
+the query's registry name, e.g. `hedgehogs.get_hedgehog_by_id`. Inside a
+read-only unit of work they also bound each query by the time its deadline
+leaves (see `query_deadline`).
+"""
+
+import asyncio
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Union
+
+import asyncpg
+from app.core.config import DATABASE_DRIVER, DATABASE_STATEMENT_CACHE_SIZE
+from app.core.metrics import metrics
+from app.db.registry import CompiledQuery, query_registry
+from app.db.unit_of_work import StatementTimeoutError, query_timeout
+from databases import Database, DatabaseURL
+
+# Raw SQL, or a query compiled by the registry.
+Statement = Union[str, CompiledQuery]
+
+
+@contextmanager
+def query_timer(driver: str, name: str) -> Iterator[None]:
+    with metrics.timer(f"db.query.{driver}.{name}"):
+        yield
+
+
+@contextmanager
+def query_deadline() -> Iterator[Optional[float]]:
+    """
+    The per-query timeout for asyncpg from the current unit of work, if any.
+    asyncpg cancels the statement on the server when it runs out; the timeout
+    is raised as StatementTimeoutError so it isn't taken for a lost connection.
+    """
+    timeout = query_timeout()
+    try:
+        yield timeout
+    except asyncio.TimeoutError:
+        if timeout is None:
+            raise
+        raise StatementTimeoutError(
+            f"Query cancelled after {timeout:.3f}s, its deadline passed."
+        ) from None
+
+
+def query_label(query: Any) -> str:
+    if isinstance(query, CompiledQuery):
+        return query.name
+    if isinstance(query, str):
+        return query_registry.name_of(query)
+    return "unnamed"
+
+
+class InstrumentedDatabase(Database):
+    """
+    The `databases` driver, with per-query timings and a fast path for
+    compiled queries.
+    """
+
+    driver = "databases"
+
+    @property
+    def pool(self) -> Optional[asyncpg.Pool]:
+        return getattr(self._backend, "_pool", None)
+
+    @asynccontextmanager
+    async def _raw_connection(self) -> AsyncIterator[asyncpg.Connection]:
+        async with self.connection() as connection:
+            # The wrapper serialises queries on a shared connection with this
+            # lock; going around it would let two tasks interleave.
+            async with connection._query_lock:
+                yield connection.raw_connection
+
+    async def fetch_all(
+        self, query: Statement, values: Optional[dict] = None
+    ) -> List[Any]:
+        with query_timer(self.driver, query_label(query)), query_deadline() as timeout:
+            if not isinstance(query, CompiledQuery):
+                return await asyncio.wait_for(super().fetch_all(query, values), timeout)
+            async with self._raw_connection() as connection:
+                return await connection.fetch(
+                    query.sql, *query.bind(values), timeout=timeout
+                )
+
+    async def fetch_one(self, query: Statement, values: Optional[dict] = None) -> Any:
+        with query_timer(self.driver, query_label(query)), query_deadline() as timeout:
+            if not isinstance(query, CompiledQuery):
+                return await asyncio.wait_for(super().fetch_one(query, values), timeout)
+            async with self._raw_connection() as connection:
+                return await connection.fetchrow(
+                    query.sql, *query.bind(values), timeout=timeout
+                )
+
+    async def fetch_val(
+        self, query: Statement, values: Optional[dict] = None, column: Any = 0
+    ) -> Any:
+        with query_timer(self.driver, query_label(query)), query_deadline() as timeout:
+            if not isinstance(query, CompiledQuery):
+                return await asyncio.wait_for(
+                    super().fetch_val(query, values, column=column), timeout
+                )
+            async with self._raw_connection() as connection:
+                record = await connection.fetchrow(
+                    query.sql, *query.bind(values), timeout=timeout
+                )
+        return None if record is None else record[column]
+
+    async def execute(self, query: Statement, values: Optional[dict] = None) -> Any:
+        with query_timer(self.driver, query_label(query)), query_deadline() as timeout:
+            if not isinstance(query, CompiledQuery):
+                return await asyncio.wait_for(super().execute(query, values), timeout)
+            # `databases` returns the first value of the first row.
+            async with self._raw_connection() as connection:
+                return await connection.fetchval(
+                    query.sql, *query.bind(values), timeout=timeout
+                )
+
+    async def execute_many(self, query: Statement, values: list) -> None:
+        with query_timer(self.driver, query_label(query)), query_deadline() as timeout:
+            if not isinstance(query, CompiledQuery):
+                return await asyncio.wait_for(
+                    super().execute_many(query, values), timeout
+                )
+            async with self._raw_connection() as connection:
+                await connection.executemany(
+                    query.sql, [query.bind(item) for item in values], timeout=timeout
+                )
+
+
+class PinnedConnection:
+    """
+    A pooled connection shared by a task and the tasks it starts, released
+    when the last of them is done with it. Queries take turns through `lock`.
+    """
+
+    def __init__(self, pool: asyncpg.Pool) -> None:
+        self.pool = pool
+        self.connection: Optional[asyncpg.Connection] = None
+        self.users = 0
+        self.lock = asyncio.Lock()
+
+    async def __aenter__(self) -> asyncpg.Connection:
+        self.users += 1
+        if self.connection is None:
+            try:
+                self.connection = await self.pool.acquire()
+            except BaseException:
+                self.users -= 1
+                raise
+        return self.connection
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        self.users -= 1
+        if self.users == 0:
+            connection, self.connection = self.connection, None
+            await self.pool.release(connection)
+
+
+class AsyncpgTransaction:
+    """
+    Usable as `async with db.transaction():` or started and finished by hand,
+    like the `databases` Transaction.
+    """
+
+    def __init__(self, database: "AsyncpgDatabase") -> None:
+        self.database = database
+
+    async def __aenter__(self) -> "AsyncpgTransaction":
+        return await self.start()
+
+    async def __aexit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        if exc_type is None:
+            await self.commit()
+        else:
+            await self.rollback()
+
+    async def start(self) -> "AsyncpgTransaction":
+        self._scope = self.database.connection()
+        connection = await self._scope.__aenter__()
+        try:
+            self._transaction = connection.transaction()
+            await self._transaction.start()
+        except BaseException:
+            await self._scope.__aexit__(None, None, None)
+            raise
+        return self
+
+    async def commit(self) -> None:
+        try:
+            await self._transaction.commit()
+        finally:
+            await self._scope.__aexit__(None, None, None)
+
+    async def rollback(self) -> None:
+        try:
+            await self._transaction.rollback()
+        finally:
+            await self._scope.__aexit__(None, None, None)
+
+
+class AsyncpgDatabase:
+    """
+    An asyncpg pool with the parts of the `databases.Database` API the app
+    uses. Like `databases`, the connection a task is using lives in a context
+    variable. Queries inside `connection()` or `transaction()` run on the
+    same connection, and nested transactions become savepoints.
+    """
+
+    driver = "asyncpg"
+
+    def __init__(
+        self, url: Union[str, DatabaseURL], *, min_size: int = 2, max_size: int = 5
+    ) -> None:
+        self.url = DatabaseURL(str(url))
+        self.min_size = min_size
+        self.max_size = max_size
+        self._pool: Optional[asyncpg.Pool] = None
+        self._connection_context: ContextVar[Optional[PinnedConnection]] = (
+            ContextVar("connection_context", default=None)
+        )
+
+    @property
+    def is_connected(self) -> bool:
+        return self._pool is not None
+
+    @property
+    def pool(self) -> Optional[asyncpg.Pool]:
+        return self._pool
+
+    async def connect(self) -> None:
+        if self._pool is not None:
+            return
+        self._pool = await asyncpg.create_pool(
+            str(self.url),
+            min_size=self.min_size,
+            max_size=self.max_size,
+            statement_cache_size=DATABASE_STATEMENT_CACHE_SIZE,
+        )
+
+    async def disconnect(self) -> None:
+        pool, self._pool = self._pool, None
+        if pool is not None:
+            await pool.close()
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[asyncpg.Connection]:
+        pinned = self._connection_context.get()
+        token = None
+        if pinned is None or pinned.users == 0:
+            # Nothing pinned here, or a pin inherited from a scope that has
+            # since finished.
+            assert self._pool is not None, "DatabaseBackend is not running"
+            pinned = PinnedConnection(self._pool)
+            token = self._connection_context.set(pinned)
+        try:
+            async with pinned as connection:
+                yield connection
+        finally:
+            if token is not None:
+                self._connection_context.reset(token)
+
+    @asynccontextmanager
+    async def _locked_connection(self) -> AsyncIterator[asyncpg.Connection]:
+        async with self.connection() as connection:
+            async with self._connection_context.get().lock:
+                yield connection
+
+    def transaction(self) -> AsyncpgTransaction:
+        return AsyncpgTransaction(self)
+
+    async def fetch_all(
+        self, query: Statement, values: Optional[Dict[str, Any]] = None
+    ) -> List[asyncpg.Record]:
+        compiled = to_compiled(query)
+        with query_timer(self.driver, compiled.name), query_deadline() as timeout:
+            async with self._locked_connection() as connection:
+                return await connection.fetch(
+                    compiled.sql, *compiled.bind(values), timeout=timeout
+                )
+
+    async def fetch_one(
+        self, query: Statement, values: Optional[Dict[str, Any]] = None
+    ) -> Optional[asyncpg.Record]:
+        compiled = to_compiled(query)
+        with query_timer(self.driver, compiled.name), query_deadline() as timeout:
+            async with self._locked_connection() as connection:
+                return await connection.fetchrow(
+                    compiled.sql, *compiled.bind(values), timeout=timeout
+                )
+
+    async def fetch_val(
+        self, query: Statement, values: Optional[Dict[str, Any]] = None, column: Any = 0
+    ) -> Any:
+        compiled = to_compiled(query)
+        with query_timer(self.driver, compiled.name), query_deadline() as timeout:
+            async with self._locked_connection() as connection:
+                record = await connection.fetchrow(
+                    compiled.sql, *compiled.bind(values), timeout=timeout
+                )
+        return None if record is None else record[column]
+
+    async def execute(
+        self, query: Statement, values: Optional[Dict[str, Any]] = None
+    ) -> Any:
+        # `databases` returns the first value of the first row; so does this.
+        compiled = to_compiled(query)
+        with query_timer(self.driver, compiled.name), query_deadline() as timeout:
+            async with self._locked_connection() as connection:
+                return await connection.fetchval(
+                    compiled.sql, *compiled.bind(values), timeout=timeout
+                )
+
+    async def execute_many(
+        self, query: Statement, values: Sequence[Dict[str, Any]]
+    ) -> None:
+        compiled = to_compiled(query)
+        with query_timer(self.driver, compiled.name), query_deadline() as timeout:
+            async with self._locked_connection() as connection:
+                await connection.executemany(
+                    compiled.sql,
+                    [compiled.bind(item) for item in values],
+                    timeout=timeout,
+                )
+
+
+def to_compiled(query: Statement) -> CompiledQuery:
+    if isinstance(query, CompiledQuery):
+        return query
+    return query_registry.lookup(query)
+
+
+def pool_stats(db: Any) -> Optional[Dict[str, int]]:
+    """
+    Connection counts for a database's pool, None when it isn't connected.
+    """
+    pool = getattr(db, "pool", None)
+    if pool is None:
+        return None
+    size, idle = pool.get_size(), pool.get_idle_size()
+    return {
+        "size": size,
+        "idle": idle,
+        "in_use": size - idle,
+        "min_size": pool.get_min_size(),
+        "max_size": pool.get_max_size(),
+    }
+
+
+async def warm_pool(
+    db: Any, *, size: int, statements: Sequence[CompiledQuery] = ()
+) -> int:
+    """
+    Fill the pool up to `size` connections and prepare `statements` on each
+    of them, so neither connection setup nor parse/plan lands on the first
+    requests. The statements go into asyncpg's per-connection cache, which
+    both drivers use for compiled queries, and survive the reset on release.
+
+    Only takes connections nobody is using: idle ones, and room the pool has
+    not opened yet. It never queues behind a request, but holds what it took
+    while preparing, so run it before traffic arrives. Returns how many
+    connections were warmed.
+    """
+    pool = getattr(db, "pool", None)
+    if pool is None:
+        return 0
+    in_use = pool.get_size() - pool.get_idle_size()
+    free = min(size, pool.get_max_size()) - in_use
+    results = await asyncio.gather(
+        *(pool.acquire() for _ in range(max(free, 0))), return_exceptions=True
+    )
+    connections = [c for c in results if not isinstance(c, BaseException)]
+    try:
+        await asyncio.gather(
+            *(prepare_statements(c, statements) for c in connections)
+        )
+    finally:
+        for connection in connections:
+            await pool.release(connection)
+    for error in results:
+        if isinstance(error, BaseException):
+            raise error
+    return len(connections)
+
+
+async def prepare_statements(
+    connection: Any, statements: Sequence[CompiledQuery]
+) -> None:
+    for statement in statements:
+        # What `fetch` does on a cache miss, minus running the query. The
+        # public `prepare` bypasses the statement cache and a wrapping
+        # `LIMIT 0` would cache different SQL, hence the private call; asyncpg
+        # is pinned in requirements.txt for it.
+        await connection._prepare(statement.sql, use_cache=True)
+
+
+DRIVERS = {
+    InstrumentedDatabase.driver: InstrumentedDatabase,
+    AsyncpgDatabase.driver: AsyncpgDatabase,
+}
+
+
+def create_database(
+    url: Union[str, DatabaseURL], *, min_size: int, max_size: int
+) -> Union[InstrumentedDatabase, AsyncpgDatabase]:
+    try:
+        driver = DRIVERS[DATABASE_DRIVER]
+    except KeyError:
+        raise ValueError(
+            f"Unknown DATABASE_DRIVER {DATABASE_DRIVER!r}, "
+            f"expected one of {', '.join(sorted(DRIVERS))}."
+        )
+    return driver(url, min_size=min_size, max_size=max_size)
@@ -0,0 +1,190 @@
+"""
+Cross-worker change events.
+
+Triggers on users, profiles and hedgehogs `NOTIFY` a compact JSON payload on
+the `table_changes` channel. Each worker keeps one `LISTEN` connection per
+database, the primary and every hedgehog shard, and dispatches the events to
+whatever registered interest in a table, typically in-process caches that need
+to drop stale entries.
+"""
+
+import asyncio
+import inspect
+import logging
+from collections import defaultdict
+from typing import Any, Callable, DefaultDict, Dict, List, Optional
+
+import asyncpg
+from app.core.config import (
+    CHANGE_LISTENER_KEEPALIVE_SECONDS,
+    CHANGE_LISTENER_RECONNECT_MAX_SECONDS,
+    CHANGE_LISTENER_RECONNECT_SECONDS,
+)
+from app.core.metrics import metrics
+from app.models.event import ChangeEvent
+from pydantic import ValidationError
+
+logger = logging.getLogger(__name__)
+
+CHANGE_EVENTS_CHANNEL = "table_changes"
+
+ChangeHandler = Callable[[ChangeEvent], Any]
+FlushHandler = Callable[[], Any]
+
+
+class ChangeListener:
+    def __init__(
+        self,
+        *,
+        channel: str = CHANGE_EVENTS_CHANNEL,
+        keepalive: float = CHANGE_LISTENER_KEEPALIVE_SECONDS,
+        reconnect_delay: float = CHANGE_LISTENER_RECONNECT_SECONDS,
+        reconnect_max_delay: float = CHANGE_LISTENER_RECONNECT_MAX_SECONDS,
+    ) -> None:
+        self.channel = channel
+        self.keepalive = keepalive
+        self.reconnect_delay = reconnect_delay
+        self.reconnect_max_delay = reconnect_max_delay
+        self._handlers: DefaultDict[str, List[ChangeHandler]] = defaultdict(list)
+        self._flush_handlers: List[FlushHandler] = []
+        self._dsns: List[str] = []
+        self._connections: Dict[str, asyncpg.Connection] = {}
+        self._tasks: List[asyncio.Task] = []
+
+    def subscribe(self, table: str, handler: ChangeHandler) -> None:
+        if handler not in self._handlers[table]:
+            self._handlers[table].append(handler)
+
+    def unsubscribe(self, table: str, handler: ChangeHandler) -> None:
+        if handler in self._handlers[table]:
+            self._handlers[table].remove(handler)
+
+    def on_flush(self, handler: FlushHandler) -> None:
+        """
+        Flush handlers run whenever events may have been missed (the listener
+        connection dropped) and everything derived from the tables is suspect.
+        """
+        if handler not in self._flush_handlers:
+            self._flush_handlers.append(handler)
+
+    def remove_flush_handler(self, handler: FlushHandler) -> None:
+        if handler in self._flush_handlers:
+            self._flush_handlers.remove(handler)
+
+    def register_cache(self, cache: Any, *tables: str) -> None:
+        """
+        Shorthand for caches exposing `invalidate(event)` and `clear()`.
+        """
+        for table in tables:
+            self.subscribe(table, cache.invalidate)
+        self.on_flush(cache.clear)
+
+    @property
+    def connected(self) -> bool:
+        """
+        Listening on every database it was started with.
+        """
+        return bool(self._dsns) and all(
+            dsn in self._connections for dsn in self._dsns
+        )
+
+    @property
+    def server_pid(self) -> Optional[int]:
+        """
+        The backend pid of the first database's (the primary's) connection.
+        """
+        connection = self._connections.get(self._dsns[0]) if self._dsns else None
+        if connection is None or connection.is_closed():
+            return None
+        return connection.get_server_pid()
+
+    async def start(self, *dsns: str) -> None:
+        if self._tasks:
+            return
+        self._dsns = list(dsns)
+        self._tasks = [asyncio.create_task(self._run(dsn)) for dsn in dsns]
+
+    async def stop(self) -> None:
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        for task in tasks:
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        self._dsns = []
+
+    def dispatch(self, event: ChangeEvent) -> None:
+        metrics.counter("events.received").inc()
+        for handler in list(self._handlers[event.table]):
+            self._call(handler, event)
+
+    def flush(self) -> None:
+        metrics.counter("events.flushes").inc()
+        for handler in list(self._flush_handlers):
+            self._call(handler)
+
+    def _call(self, handler: Callable, *args: Any) -> None:
+        try:
+            result = handler(*args)
+            if inspect.isawaitable(result):
+                asyncio.ensure_future(result)
+        except Exception as e:
+            logger.warning("--- CHANGE EVENT HANDLER ERROR ---")
+            logger.warning(e)
+
+    def _on_notification(
+        self, connection: asyncpg.Connection, pid: int, channel: str, payload: str
+    ) -> None:
+        try:
+            event = ChangeEvent.parse_raw(payload)
+        except ValidationError:
+            logger.warning("Unreadable change event %r, flushing caches", payload)
+            self.flush()
+            return
+        self.dispatch(event)
+
+    async def _run(self, dsn: str) -> None:
+        """
+        Listen on one database. Losing any of them flushes everything: a
+        handler can't tell which database an entry it derived came from.
+        """
+        delay = self.reconnect_delay
+        has_connected = False
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(dsn)
+                await connection.add_listener(self.channel, self._on_notification)
+                self._connections[dsn] = connection
+                delay = self.reconnect_delay
+                if has_connected:
+                    # Anything written while we were away was never delivered.
+                    self.flush()
+                has_connected = True
+                while True:
+                    await asyncio.sleep(self.keepalive)
+                    await connection.fetchval("SELECT 1")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning("--- CHANGE LISTENER CONNECTION ERROR ---")
+                logger.warning(e)
+                if dsn in self._connections:
+                    self.flush()
+            finally:
+                self._connections.pop(dsn, None)
+                if connection is not None:
+                    await self._close_connection(connection)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self.reconnect_max_delay)
+
+    async def _close_connection(self, connection: asyncpg.Connection) -> None:
+        try:
+            await asyncio.wait_for(connection.close(), timeout=self.keepalive)
+        except Exception:
+            connection.terminate()
+
+
+change_listener = ChangeListener()
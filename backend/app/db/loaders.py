@@ -0,0 +1,70 @@
+"""
+Request-scoped batch loading.
+
+Resolving a reference per row (a hedgehog's owner, say) turns one list query
+into N+1. A `BatchLoader` collects every key asked for during the same tick of
+the event loop and resolves them with a single call to its batch function,
+typically one `WHERE id = ANY(:ids)` query. Results are remembered for the
+lifetime of the loader, which is meant to be a single request.
+"""
+
+import asyncio
+from typing import (
+    Awaitable,
+    Callable,
+    Dict,
+    Generic,
+    Hashable,
+    Iterable,
+    List,
+    Optional,
+    TypeVar,
+)
+
+from app.core.metrics import metrics
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+BatchFunction = Callable[[List[K]], Awaitable[Dict[K, V]]]
+
+
+class BatchLoader(Generic[K, V]):
+    def __init__(self, name: str, batch_fn: BatchFunction) -> None:
+        self.name = name
+        self.batch_fn = batch_fn
+        self._results: Dict[K, asyncio.Future] = {}
+        self._pending: List[K] = []
+        self._batches = metrics.counter(f"loaders.{name}.batches")
+        self._batch_size = metrics.histogram(f"loaders.{name}.batch_size")
+
+    def load(self, key: K) -> Awaitable[Optional[V]]:
+        result = self._results.get(key)
+        if result is None:
+            result = asyncio.get_running_loop().create_future()
+            self._results[key] = result
+            self._pending.append(key)
+            if len(self._pending) == 1:
+                # Runs after everything already scheduled on the loop, so loads
+                # from sibling tasks started alongside this one join the batch.
+                asyncio.ensure_future(self._dispatch())
+        return result
+
+    async def load_many(self, keys: Iterable[K]) -> Dict[K, Optional[V]]:
+        keys = list(dict.fromkeys(keys))
+        values = await asyncio.gather(*(self.load(key) for key in keys))
+        return dict(zip(keys, values))
+
+    async def _dispatch(self) -> None:
+        keys, self._pending = self._pending, []
+        self._batches.inc()
+        self._batch_size.observe(len(keys))
+        try:
+            values = await self.batch_fn(keys)
+        except Exception as e:
+            for key in keys:
+                # Forget failures so a later load can try again.
+                self._results.pop(key).set_exception(e)
+            return
+        for key in keys:
+            self._results[key].set_result(values.get(key))
@@ -0,0 +1,73 @@
+"""
+Database maintenance commands.
+
+    python -m app.db.maintenance check-stats
+    python -m app.db.maintenance rebuild-stats
+
+`check-stats` compares the trigger-maintained user_stats table with a full
+recomputation from hedgehogs and exits non-zero when they disagree;
+`rebuild-stats` recomputes the table while briefly blocking hedgehog writes.
+"""
+
+import argparse
+import asyncio
+import logging
+import sys
+
+from app.core.config import SHARD_DATABASE_URLS
+from app.db.drivers import create_database
+from app.db.repositories.user_stats import UserStatsRepository
+from app.db.shards import connect_shards, disconnect_shards
+from app.db.tasks import get_database_url
+from databases import Database
+
+logger = logging.getLogger(__name__)
+
+
+async def check_stats(db: Database) -> int:
+    inconsistent = await UserStatsRepository(db).find_inconsistent_stats()
+    if not inconsistent:
+        logger.info("user_stats is consistent with hedgehogs")
+        return 0
+    logger.warning(
+        "user_stats differs from hedgehogs for %d users: %s",
+        len(inconsistent),
+        ", ".join(str(user_id) for user_id in inconsistent[:50]),
+    )
+    return 1
+
+
+async def rebuild_stats(db: Database) -> int:
+    rows = await UserStatsRepository(db).rebuild_stats()
+    logger.info("Rebuilt user_stats, %d rows", rows)
+    return 0
+
+
+COMMANDS = {
+    "check-stats": check_stats,
+    "rebuild-stats": rebuild_stats,
+}
+
+
+async def run(command: str) -> int:
+    database = create_database(get_database_url(), min_size=1, max_size=1)
+    await database.connect()
+    shards = await connect_shards(database, SHARD_DATABASE_URLS)
+    try:
+        return await COMMANDS[command](database)
+    finally:
+        await disconnect_shards(shards)
+        await database.disconnect()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Database maintenance commands.")
+    parser.add_argument("command", choices=sorted(COMMANDS))
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    sys.exit(asyncio.run(run(args.command)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""add_hedgehog_search
+
+Revision ID: 3f7b2c9e4a18
+Revises: 8d41e6b0a7c2
+Create Date: 2026-10-19 14:22:05.671843
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic
+revision = "3f7b2c9e4a18"
+down_revision = "8d41e6b0a7c2"
+branch_labels = None
+depends_on = None
+
+
+def add_search_vector_column() -> None:
+    # Names weigh more than descriptions when ranking. Generated, so every
+    # write path keeps it current without application code.
+    op.execute(
+        """
+        ALTER TABLE hedgehogs
+            ADD COLUMN search_vector tsvector
+            GENERATED ALWAYS AS (
+                setweight(to_tsvector('english', coalesce(name, '')), 'A') ||
+                setweight(to_tsvector('english', coalesce(description, '')), 'B')
+            ) STORED;
+        """
+    )
+    op.execute(
+        """
+        CREATE INDEX ix_hedgehogs_search_vector
+            ON hedgehogs
+            USING GIN (search_vector);
+        """
+    )
+
+
+def add_name_trigram_index() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute(
+        """
+        CREATE INDEX ix_hedgehogs_name_trgm
+            ON hedgehogs
+            USING GIN (name gin_trgm_ops);
+        """
+    )
+
+
+def upgrade() -> None:
+    add_search_vector_column()
+    add_name_trigram_index()
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX ix_hedgehogs_name_trgm")
+    op.execute("DROP INDEX ix_hedgehogs_search_vector")
+    op.execute("ALTER TABLE hedgehogs DROP COLUMN search_vector")
@@ -0,0 +1,79 @@
+"""create_jobs_table
+
+Revision ID: 5c2f8a91d3e7
+Revises: 12056735bd4e
+Create Date: 2026-10-19 09:12:41.518204
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects.postgresql import JSONB
+
+# revision identifiers, used by Alembic
+revision = "5c2f8a91d3e7"
+down_revision = "12056735bd4e"
+branch_labels = None
+depends_on = None
+
+
+def create_jobs_table() -> None:
+    op.create_table(
+        "jobs",
+        sa.Column("id", sa.BigInteger, primary_key=True),
+        sa.Column("task", sa.Text, nullable=False),
+        sa.Column("payload", JSONB, nullable=False, server_default="{}"),
+        sa.Column("status", sa.Text, nullable=False, server_default="queued"),
+        sa.Column("attempts", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("max_attempts", sa.Integer, nullable=False, server_default="5"),
+        sa.Column(
+            "run_at",
+            sa.TIMESTAMP(timezone=True),
+            server_default=sa.func.now(),
+            nullable=False,
+        ),
+        sa.Column("locked_at", sa.TIMESTAMP(timezone=True), nullable=True),
+        sa.Column("last_error", sa.Text, nullable=True),
+        sa.Column(
+            "created_at",
+            sa.TIMESTAMP(timezone=True),
+            server_default=sa.func.now(),
+            nullable=False,
+        ),
+        sa.Column(
+            "updated_at",
+            sa.TIMESTAMP(timezone=True),
+            server_default=sa.func.now(),
+            nullable=False,
+        ),
+        sa.CheckConstraint(
+            "status IN ('queued', 'running', 'done', 'failed')",
+            name="ck_jobs_status",
+        ),
+    )
+    # Workers only ever scan jobs that still need running, so keep that index
+    # small by leaving finished jobs out of it.
+    op.execute(
+        """
+        CREATE INDEX ix_jobs_pending_run_at
+            ON jobs (run_at)
+            WHERE status IN ('queued', 'running');
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER update_jobs_modtime
+            BEFORE UPDATE
+            ON jobs
+            FOR EACH ROW
+        EXECUTE PROCEDURE update_updated_at_column();
+        """
+    )
+
+
+def upgrade() -> None:
+    create_jobs_table()
+
+
+def downgrade() -> None:
+    op.drop_table("jobs")
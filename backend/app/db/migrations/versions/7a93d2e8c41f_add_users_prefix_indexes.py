@@ -0,0 +1,30 @@
+"""add_users_prefix_indexes
+
+Revision ID: 7a93d2e8c41f
+Revises: e42a7c15b9d8
+Create Date: 2026-10-19 19:31:44.517032
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic
+revision = "7a93d2e8c41f"
+down_revision = "e42a7c15b9d8"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # The existing unique indexes use the database collation, which LIKE
+    # 'prefix%' cannot use unless the collation is C. text_pattern_ops
+    # indexes compare byte-wise and serve the admin prefix searches.
+    op.execute(
+        "CREATE INDEX ix_users_username_pattern ON users (username text_pattern_ops)"
+    )
+    op.execute("CREATE INDEX ix_users_email_pattern ON users (email text_pattern_ops)")
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX ix_users_email_pattern")
+    op.execute("DROP INDEX ix_users_username_pattern")
@@ -0,0 +1,78 @@
+"""add_change_notify_triggers
+
+Revision ID: 8d41e6b0a7c2
+Revises: 5c2f8a91d3e7
+Create Date: 2026-10-19 11:03:27.904116
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic
+revision = "8d41e6b0a7c2"
+down_revision = "5c2f8a91d3e7"
+branch_labels = None
+depends_on = None
+
+# table name -> column identifying the user a row belongs to
+NOTIFY_TABLES = {
+    "users": "id",
+    "profiles": "user_id",
+    "hedgehogs": "owner",
+}
+
+
+def create_notify_table_change_function() -> None:
+    # Payloads stay compact on purpose: NOTIFY is limited to 8000 bytes and
+    # listeners only need to know which row (and whose) changed.
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION notify_table_change()
+            RETURNS TRIGGER AS
+        $$
+        DECLARE
+            row_data JSONB;
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                row_data = to_jsonb(OLD);
+            ELSE
+                row_data = to_jsonb(NEW);
+            END IF;
+            PERFORM pg_notify(
+                'table_changes',
+                json_build_object(
+                    't', TG_TABLE_NAME,
+                    'op', left(TG_OP, 1),
+                    'id', (row_data ->> 'id')::bigint,
+                    'o', (row_data ->> TG_ARGV[0])::bigint
+                )::text
+            );
+            RETURN NULL;
+        END;
+        $$ language 'plpgsql';
+        """
+    )
+
+
+def create_notify_triggers() -> None:
+    for table, owner_column in NOTIFY_TABLES.items():
+        op.execute(
+            f"""
+            CREATE TRIGGER notify_{table}_change
+                AFTER INSERT OR UPDATE OR DELETE
+                ON {table}
+                FOR EACH ROW
+            EXECUTE PROCEDURE notify_table_change('{owner_column}');
+            """
+        )
+
+
+def upgrade() -> None:
+    create_notify_table_change_function()
+    create_notify_triggers()
+
+
+def downgrade() -> None:
+    for table in NOTIFY_TABLES:
+        op.execute(f"DROP TRIGGER notify_{table}_change ON {table}")
+    op.execute("DROP FUNCTION notify_table_change")
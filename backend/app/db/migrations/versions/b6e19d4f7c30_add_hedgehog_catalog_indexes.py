@@ -0,0 +1,28 @@
+"""add_hedgehog_catalog_indexes
+
+Revision ID: b6e19d4f7c30
+Revises: 3f7b2c9e4a18
+Create Date: 2026-10-19 16:40:12.093317
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic
+revision = "b6e19d4f7c30"
+down_revision = "3f7b2c9e4a18"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # The catalog filters on colour with an optional age range and pages by id
+    # descending. With the equality column first, (color_type, id) returns one
+    # colour's rows already in page order, so a page stops after LIMIT rows;
+    # the age range is checked on those. Age-only and unfiltered pages walk the
+    # primary key backwards. Name filters use the trigram index.
+    op.create_index("ix_hedgehogs_color_type_id", "hedgehogs", ["color_type", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_hedgehogs_color_type_id", table_name="hedgehogs")
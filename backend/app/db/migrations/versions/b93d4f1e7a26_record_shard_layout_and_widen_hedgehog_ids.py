@@ -0,0 +1,56 @@
+"""record_shard_layout_and_widen_hedgehog_ids
+
+Revision ID: b93d4f1e7a26
+Revises: d27b5e9c1a40
+Create Date: 2026-10-20 16:05:12.340718
+
+Hedgehog ids are `nextval * shard_count + shard_index`, so they are only
+unique while every worker agrees on the shard layout. `shard_layout` records
+it in each database the first time the app connects; later connections with a
+different SHARD_DATABASE_URLS are refused (see `app.db.shards`).
+
+Multiplying the sequence by the shard count also runs out of INTEGER ids that
+many times sooner, so hedgehog ids become BIGINT. Changing the column type
+rewrites the tables, so on large installs run it in a maintenance window.
+
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic
+revision = "b93d4f1e7a26"
+down_revision = "d27b5e9c1a40"
+branch_labels = None
+depends_on = None
+
+# Tables keyed by hedgehog id. Partitioned ones pass the change to partitions.
+HEDGEHOG_ID_TABLES = ("hedgehogs", "hedgehog_owners", "hedgehogs_archive")
+
+
+def create_shard_layout_table() -> None:
+    # A single row, claimed by the first connection.
+    op.execute(
+        """
+        CREATE TABLE shard_layout (
+            singleton   BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (singleton),
+            shard_count INTEGER NOT NULL CHECK (shard_count > 0),
+            shard_index INTEGER NOT NULL
+                        CHECK (shard_index >= 0 AND shard_index < shard_count),
+            created_at  TIMESTAMPTZ NOT NULL DEFAULT now()
+        );
+        """
+    )
+
+
+def upgrade() -> None:
+    create_shard_layout_table()
+    op.execute("ALTER SEQUENCE hedgehogs_id_seq AS BIGINT")
+    for table in HEDGEHOG_ID_TABLES:
+        op.execute(f"ALTER TABLE {table} ALTER COLUMN id TYPE BIGINT")
+
+
+def downgrade() -> None:
+    for table in HEDGEHOG_ID_TABLES:
+        op.execute(f"ALTER TABLE {table} ALTER COLUMN id TYPE INTEGER")
+    op.execute("ALTER SEQUENCE hedgehogs_id_seq AS INTEGER")
+    op.execute("DROP TABLE shard_layout")
@@ -0,0 +1,32 @@
+"""add_job_progress_and_owner_index
+
+Revision ID: c5d8f0a2e6b4
+Revises: 7a93d2e8c41f
+Create Date: 2026-10-19 21:12:08.640395
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects.postgresql import JSONB
+
+# revision identifiers, used by Alembic
+revision = "c5d8f0a2e6b4"
+down_revision = "7a93d2e8c41f"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "jobs",
+        sa.Column("progress", JSONB, nullable=False, server_default="{}"),
+    )
+    # Account deletion removes an owner's hedgehogs in batches; without this
+    # every batch (and every owner listing) scans the whole table.
+    op.create_index("ix_hedgehogs_owner", "hedgehogs", ["owner"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_hedgehogs_owner", table_name="hedgehogs")
+    op.drop_column("jobs", "progress")
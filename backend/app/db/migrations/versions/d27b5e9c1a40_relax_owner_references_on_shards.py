@@ -0,0 +1,46 @@
+"""relax_owner_references_on_shards
+
+Revision ID: d27b5e9c1a40
+Revises: a84e2b7c6f13
+Create Date: 2026-10-20 13:42:05.881902
+
+Shard databases hold hedgehogs and user_stats for users that only exist on the
+primary, so there the references to users cannot be enforced. Run against a
+shard with `alembic -x shard=true upgrade head`; on the primary this is a
+no-op.
+
+"""
+
+from alembic import context, op
+
+# revision identifiers, used by Alembic
+revision = "d27b5e9c1a40"
+down_revision = "a84e2b7c6f13"
+branch_labels = None
+depends_on = None
+
+# table -> (constraint, column) referencing users.id
+USER_REFERENCES = {
+    "hedgehogs": ("hedgehogs_owner_fkey", "owner"),
+    "user_stats": ("user_stats_user_id_fkey", "user_id"),
+}
+
+
+def is_shard() -> bool:
+    return context.get_x_argument(as_dictionary=True).get("shard") == "true"
+
+
+def upgrade() -> None:
+    if not is_shard():
+        return
+    for table, (constraint, _) in USER_REFERENCES.items():
+        op.drop_constraint(constraint, table, type_="foreignkey")
+
+
+def downgrade() -> None:
+    if not is_shard():
+        return
+    for table, (constraint, column) in USER_REFERENCES.items():
+        op.create_foreign_key(
+            constraint, table, "users", [column], ["id"], ondelete="CASCADE"
+        )
@@ -0,0 +1,128 @@
+"""create_user_stats_table
+
+Revision ID: e42a7c15b9d8
+Revises: b6e19d4f7c30
+Create Date: 2026-10-19 18:05:51.284960
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects.postgresql import JSONB
+
+# revision identifiers, used by Alembic
+revision = "e42a7c15b9d8"
+down_revision = "b6e19d4f7c30"
+branch_labels = None
+depends_on = None
+
+
+def create_user_stats_table() -> None:
+    op.create_table(
+        "user_stats",
+        sa.Column(
+            "user_id",
+            sa.Integer,
+            sa.ForeignKey("users.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+        sa.Column("hedgehog_count", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("total_age", sa.Numeric(14, 2), nullable=False, server_default="0"),
+        sa.Column("color_counts", JSONB, nullable=False, server_default="{}"),
+        sa.Column(
+            "updated_at",
+            sa.TIMESTAMP(timezone=True),
+            server_default=sa.func.now(),
+            nullable=False,
+        ),
+    )
+
+
+def create_apply_hedgehog_stats_function() -> None:
+    # Adds (delta = 1) or removes (delta = -1) one hedgehog's contribution to
+    # its owner's row, creating the row on first use.
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION apply_hedgehog_stats(
+            owner_id INTEGER, color TEXT, age NUMERIC, delta INTEGER
+        ) RETURNS VOID AS
+        $$
+        BEGIN
+            IF owner_id IS NULL THEN
+                RETURN;
+            END IF;
+            INSERT INTO user_stats (user_id, hedgehog_count, total_age, color_counts)
+            VALUES (owner_id, delta, delta * age, jsonb_build_object(color, delta))
+            ON CONFLICT (user_id) DO UPDATE
+            SET hedgehog_count = user_stats.hedgehog_count + delta,
+                total_age      = user_stats.total_age + delta * age,
+                color_counts   = user_stats.color_counts || jsonb_build_object(
+                    color,
+                    coalesce((user_stats.color_counts ->> color)::integer, 0) + delta
+                ),
+                updated_at     = now();
+        END;
+        $$ language 'plpgsql';
+        """
+    )
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION maintain_user_stats()
+            RETURNS TRIGGER AS
+        $$
+        BEGIN
+            IF TG_OP = 'UPDATE'
+                AND NEW.owner IS NOT DISTINCT FROM OLD.owner
+                AND NEW.color_type = OLD.color_type
+                AND NEW.age = OLD.age THEN
+                RETURN NULL;
+            END IF;
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                PERFORM apply_hedgehog_stats(OLD.owner, OLD.color_type, OLD.age, -1);
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                PERFORM apply_hedgehog_stats(NEW.owner, NEW.color_type, NEW.age, 1);
+            END IF;
+            RETURN NULL;
+        END;
+        $$ language 'plpgsql';
+        """
+    )
+    op.execute(
+        """
+        CREATE TRIGGER maintain_user_stats
+            AFTER INSERT OR UPDATE OR DELETE
+            ON hedgehogs
+            FOR EACH ROW
+        EXECUTE PROCEDURE maintain_user_stats();
+        """
+    )
+
+
+def backfill_user_stats() -> None:
+    op.execute(
+        """
+        INSERT INTO user_stats (user_id, hedgehog_count, total_age, color_counts)
+        SELECT owner, sum(count), sum(total_age), jsonb_object_agg(color_type, count)
+        FROM (
+            SELECT owner, color_type, count(*) AS count, sum(age) AS total_age
+            FROM hedgehogs
+            WHERE owner IS NOT NULL
+            GROUP BY owner, color_type
+        ) AS by_color
+        GROUP BY owner;
+        """
+    )
+
+
+def upgrade() -> None:
+    create_user_stats_table()
+    create_apply_hedgehog_stats_function()
+    backfill_user_stats()
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER maintain_user_stats ON hedgehogs")
+    op.execute("DROP FUNCTION maintain_user_stats")
+    op.execute("DROP FUNCTION apply_hedgehog_stats")
+    op.drop_table("user_stats")
@@ -0,0 +1,186 @@
+"""soft_delete_hedgehogs
+
+Revision ID: f1c6a3d8b925
+Revises: c5d8f0a2e6b4
+Create Date: 2026-10-19 22:31:47.518230
+
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic
+revision = "f1c6a3d8b925"
+down_revision = "c5d8f0a2e6b4"
+branch_labels = None
+depends_on = None
+
+LIVE = "deleted_at IS NULL"
+
+# index name -> definition, rebuilt to cover live rows only
+LIVE_INDEXES = {
+    "ix_hedgehogs_owner": "(owner)",
+    "ix_hedgehogs_color_type_id": "(color_type, id)",
+    "ix_hedgehogs_search_vector": "USING GIN (search_vector)",
+    "ix_hedgehogs_name_trgm": "USING GIN (name gin_trgm_ops)",
+}
+
+
+def rebuild_indexes(where: str = "") -> None:
+    for name, definition in LIVE_INDEXES.items():
+        op.execute(f"DROP INDEX {name}")
+        op.execute(f"CREATE INDEX {name} ON hedgehogs {definition} {where}")
+
+
+def create_archive_table() -> None:
+    # Partitioned by month of deletion, so old history is dropped or detached a
+    # partition at a time instead of with a large DELETE.
+    op.execute(
+        """
+        CREATE TABLE hedgehogs_archive (
+            id          INTEGER NOT NULL,
+            name        TEXT NOT NULL,
+            description TEXT,
+            age         NUMERIC(10, 2) NOT NULL,
+            color_type  TEXT NOT NULL,
+            owner       INTEGER,
+            created_at  TIMESTAMPTZ NOT NULL,
+            updated_at  TIMESTAMPTZ NOT NULL,
+            deleted_at  TIMESTAMPTZ NOT NULL,
+            PRIMARY KEY (id, deleted_at)
+        ) PARTITION BY RANGE (deleted_at);
+        """
+    )
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION create_hedgehogs_archive_partition(
+            month TIMESTAMPTZ
+        ) RETURNS VOID AS
+        $$
+        DECLARE
+            start_at TIMESTAMPTZ := date_trunc('month', month AT TIME ZONE 'UTC')
+                AT TIME ZONE 'UTC';
+        BEGIN
+            EXECUTE format(
+                'CREATE TABLE IF NOT EXISTS %I PARTITION OF hedgehogs_archive '
+                'FOR VALUES FROM (%L) TO (%L)',
+                'hedgehogs_archive_' || to_char(start_at AT TIME ZONE 'UTC', 'YYYY_MM'),
+                start_at,
+                start_at + interval '1 month'
+            );
+        END;
+        $$ language 'plpgsql';
+        """
+    )
+
+
+def replace_stats_trigger_function(live_only: bool) -> None:
+    # Soft-deleted rows no longer count towards their owner's stats, so setting
+    # deleted_at removes the contribution and archiving them later is a no-op.
+    old_counted = "OLD.deleted_at IS NULL" if live_only else "TRUE"
+    new_counted = "NEW.deleted_at IS NULL" if live_only else "TRUE"
+    unchanged_deleted_at = (
+        "AND NEW.deleted_at IS NOT DISTINCT FROM OLD.deleted_at" if live_only else ""
+    )
+    op.execute(
+        f"""
+        CREATE OR REPLACE FUNCTION maintain_user_stats()
+            RETURNS TRIGGER AS
+        $$
+        BEGIN
+            IF TG_OP = 'UPDATE'
+                AND NEW.owner IS NOT DISTINCT FROM OLD.owner
+                AND NEW.color_type = OLD.color_type
+                AND NEW.age = OLD.age
+                {unchanged_deleted_at} THEN
+                RETURN NULL;
+            END IF;
+            IF TG_OP IN ('UPDATE', 'DELETE') AND {old_counted} THEN
+                PERFORM apply_hedgehog_stats(OLD.owner, OLD.color_type, OLD.age, -1);
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') AND {new_counted} THEN
+                PERFORM apply_hedgehog_stats(NEW.owner, NEW.color_type, NEW.age, 1);
+            END IF;
+            RETURN NULL;
+        END;
+        $$ language 'plpgsql';
+        """
+    )
+
+
+def replace_notify_function(soft_delete: bool) -> None:
+    # Listeners see a soft delete as a delete. Rows that were already
+    # soft-deleted leave silently when they are archived.
+    soft_delete_checks = (
+        """
+            IF TG_OP = 'DELETE' AND row_data ->> 'deleted_at' IS NOT NULL THEN
+                RETURN NULL;
+            END IF;
+            IF TG_OP = 'UPDATE'
+                AND to_jsonb(OLD) ->> 'deleted_at' IS NULL
+                AND row_data ->> 'deleted_at' IS NOT NULL THEN
+                op = 'D';
+            END IF;
+        """
+        if soft_delete
+        else ""
+    )
+    op.execute(
+        f"""
+        CREATE OR REPLACE FUNCTION notify_table_change()
+            RETURNS TRIGGER AS
+        $$
+        DECLARE
+            row_data JSONB;
+            op TEXT := left(TG_OP, 1);
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                row_data = to_jsonb(OLD);
+            ELSE
+                row_data = to_jsonb(NEW);
+            END IF;
+            {soft_delete_checks}
+            PERFORM pg_notify(
+                'table_changes',
+                json_build_object(
+                    't', TG_TABLE_NAME,
+                    'op', op,
+                    'id', (row_data ->> 'id')::bigint,
+                    'o', (row_data ->> TG_ARGV[0])::bigint
+                )::text
+            );
+            RETURN NULL;
+        END;
+        $$ language 'plpgsql';
+        """
+    )
+
+
+def upgrade() -> None:
+    op.add_column(
+        "hedgehogs", sa.Column("deleted_at", sa.TIMESTAMP(timezone=True), nullable=True)
+    )
+    rebuild_indexes(where=f"WHERE {LIVE}")
+    # Only the archive job looks for deleted rows.
+    op.execute(
+        """
+        CREATE INDEX ix_hedgehogs_deleted_at
+            ON hedgehogs (deleted_at)
+            WHERE deleted_at IS NOT NULL;
+        """
+    )
+    create_archive_table()
+    replace_stats_trigger_function(live_only=True)
+    replace_notify_function(soft_delete=True)
+
+
+def downgrade() -> None:
+    # Deleted before the triggers change back, so stats and listeners ignore it.
+    op.execute("DELETE FROM hedgehogs WHERE deleted_at IS NOT NULL")
+    replace_notify_function(soft_delete=False)
+    replace_stats_trigger_function(live_only=False)
+    op.execute("DROP FUNCTION create_hedgehogs_archive_partition")
+    op.execute("DROP TABLE hedgehogs_archive")
+    op.execute("DROP INDEX ix_hedgehogs_deleted_at")
+    rebuild_indexes()
+    op.drop_column("hedgehogs", "deleted_at")
@@ -0,0 +1,114 @@
+"""
+Compiled queries.
+
+Every `*_QUERY` constant in `app.db.repositories.queries` is compiled once, at
+import, into driver-ready SQL: asyncpg's positional `$n` parameters plus the
+order to bind the named values in. Repositories call them by name, as
+`<module>.<constant without _QUERY, lowercased>`, e.g.
+`self.fetch_one("users.get_user_by_email", values={"email": email})`. Neither
+driver then parses or compiles anything per call.
+
+Templates finished with `.format()` at call time can't be compiled ahead.
+Pass them through `compile_query(sql, name=...)`, which caches by the
+formatted text.
+"""
+
+import re
+from functools import lru_cache
+from string import Formatter
+from types import ModuleType
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from app.db.repositories.queries import hedgehogs, jobs, profiles, user_stats, users
+
+# Same rule as SQLAlchemy's text(): `::` casts and `\:` are not parameters.
+NAMED_PARAMETER = re.compile(r"(?<![:\w\\]):(\w+)(?!:)")
+
+
+class CompiledQuery(NamedTuple):
+    name: str
+    sql: str
+    params: Tuple[str, ...]
+
+    def bind(self, values: Optional[Dict[str, Any]] = None) -> List[Any]:
+        values = values or {}
+        return [values[param] for param in self.params]
+
+
+@lru_cache(maxsize=1024)
+def compile_query(text: str, name: str = "unnamed") -> CompiledQuery:
+    """
+    `:named` parameters to `$n`, numbered in order of first appearance.
+    """
+    params: List[str] = []
+
+    def to_positional(match: "re.Match[str]") -> str:
+        param = match.group(1)
+        if param not in params:
+            params.append(param)
+        return f"${params.index(param) + 1}"
+
+    sql = NAMED_PARAMETER.sub(to_positional, text).replace("\\:", ":")
+    return CompiledQuery(name=name, sql=sql, params=tuple(params))
+
+
+# A registered query's name, or a query compiled at call time.
+Query = Union[str, CompiledQuery]
+
+
+def is_template(text: str) -> bool:
+    return any(field for _, field, _, _ in Formatter().parse(text))
+
+
+class QueryRegistry:
+    def __init__(self) -> None:
+        self._by_name: Dict[str, CompiledQuery] = {}
+        self._by_text: Dict[str, CompiledQuery] = {}
+
+    def register_module(self, module: ModuleType) -> None:
+        prefix = module.__name__.rsplit(".", 1)[-1]
+        for attr, text in vars(module).items():
+            if not attr.endswith("_QUERY") or not isinstance(text, str):
+                continue
+            if is_template(text):
+                continue
+            name = f"{prefix}.{attr[: -len('_QUERY')].lower()}"
+            self._by_name[name] = self._by_text[text] = compile_query(text, name)
+
+    def __getitem__(self, name: str) -> CompiledQuery:
+        return self._by_name[name]
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._by_name
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._by_name)
+
+    def __len__(self) -> int:
+        return len(self._by_name)
+
+    def resolve(self, query: Union[str, CompiledQuery]) -> CompiledQuery:
+        """
+        A registered query by name; compiled queries pass through.
+        """
+        if isinstance(query, CompiledQuery):
+            return query
+        return self[query]
+
+    def name_of(self, text: str) -> str:
+        compiled = self._by_text.get(text)
+        return "unnamed" if compiled is None else compiled.name
+
+    def lookup(self, text: str) -> CompiledQuery:
+        """
+        The compiled form of raw SQL, for callers that still pass strings.
+        """
+        compiled = self._by_text.get(text)
+        if compiled is None:
+            compiled = compile_query(text)
+        return compiled
+
+
+query_registry = QueryRegistry()
+for module in (hedgehogs, jobs, profiles, user_stats, users):
+    query_registry.register_module(module)
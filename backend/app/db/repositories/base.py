@@ -1,6 +1,95 @@
+from typing import Any, Dict, List, Optional
+
+from app.db.drivers import query_deadline
+from app.db.registry import Query, query_registry
+from app.db.singleflight import freeze_values, single_flight
+from app.db.unit_of_work import in_transaction
 from databases import Database
 
 
 class BaseRepository:
+    """
+    Queries are called by their registry name (see `app.db.registry`), or as a
+    `CompiledQuery` for SQL put together at call time. `db` overrides the
+    repository's database, e.g. with the shard a row lives on.
+    """
+
     def __init__(self, db: Database) -> None:
         self.db = db
+
+    async def fetch_one(
+        self,
+        query: Query,
+        values: Optional[Dict[str, Any]] = None,
+        *,
+        db: Optional[Database] = None,
+    ) -> Any:
+        return await (db or self.db).fetch_one(
+            query=query_registry.resolve(query), values=values
+        )
+
+    async def fetch_all(
+        self,
+        query: Query,
+        values: Optional[Dict[str, Any]] = None,
+        *,
+        db: Optional[Database] = None,
+    ) -> List[Any]:
+        return await (db or self.db).fetch_all(
+            query=query_registry.resolve(query), values=values
+        )
+
+    async def fetch_val(
+        self,
+        query: Query,
+        values: Optional[Dict[str, Any]] = None,
+        *,
+        db: Optional[Database] = None,
+    ) -> Any:
+        return await (db or self.db).fetch_val(
+            query=query_registry.resolve(query), values=values
+        )
+
+    async def execute(
+        self,
+        query: Query,
+        values: Optional[Dict[str, Any]] = None,
+        *,
+        db: Optional[Database] = None,
+    ) -> Any:
+        return await (db or self.db).execute(
+            query=query_registry.resolve(query), values=values
+        )
+
+    async def fetch_one_coalesced(
+        self,
+        query: Query,
+        values: Optional[Dict[str, Any]] = None,
+        *,
+        db: Optional[Database] = None,
+    ) -> Any:
+        """
+        `fetch_one` for hot public reads: concurrent calls with the same query
+        and values share one round trip. The shared query runs on a connection
+        of its own and can't see uncommitted writes, so inside a unit of
+        work's transaction this is a plain `fetch_one`; don't use it in other
+        transactions. Each caller still waits no longer than its deadline.
+        """
+        if in_transaction():
+            return await self.fetch_one(query, values, db=db)
+        db = db or self.db
+        compiled = query_registry.resolve(query)
+        key = (id(db), compiled.sql, freeze_values(values))
+        with query_deadline() as timeout:
+            return await single_flight.do(
+                key,
+                lambda: db.fetch_one(query=compiled, values=values),
+                timeout=timeout,
+            )
+
+
+def escape_like(value: str) -> str:
+    """
+    Escape LIKE wildcards in user input that is meant to match literally.
+    """
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
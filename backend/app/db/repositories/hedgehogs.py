@@ -1,41 +1,214 @@
-from typing import List
+import json
+from datetime import datetime
+from itertools import chain
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 import app.db.repositories.queries.hedgehogs as query
-from app.db.repositories.base import BaseRepository
-from app.models.hedgehog import HedgehogCreate, HedgehogInDB, HedgehogUpdate
+from app.db.repositories.base import BaseRepository, escape_like
+from app.core.config import CATALOG_EXACT_COUNT_THRESHOLD
+from app.db.pagination import decode_cursor, encode_cursor
+from app.db.registry import Query, compile_query
+from app.db.shards import ShardRouter, get_shard_router
+from app.models.core import prune_model
+from app.models.hedgehog import (
+    ColorType,
+    HedgehogCatalogPage,
+    HedgehogCreate,
+    HedgehogInDB,
+    HedgehogSearchPage,
+    HedgehogSearchResult,
+    HedgehogUpdate,
+)
 from app.models.user import UserInDB
+from databases import Database
 from fastapi import HTTPException, status
 
 
 class HedgehogsRepository(BaseRepository):
+    """
+    Queries go to the shard of the hedgehog's owner; the ones spanning owners
+    fan out to every shard and merge the results.
+    """
+
+    def __init__(self, db: Database, shards: Optional[ShardRouter] = None) -> None:
+        super().__init__(db)
+        self.shards = shards or get_shard_router(db)
+
     async def create_hedgehog(
         self, *, new_hedgehog: HedgehogCreate, requesting_user: UserInDB
     ) -> HedgehogInDB:
-        hedgehog = await self.db.fetch_one(
-            query=query.CREATE_HEDGEHOG_QUERY,
-            values={**new_hedgehog.dict(), "owner": requesting_user.id},
+        hedgehog = await self.fetch_one(
+            "hedgehogs.create_hedgehog",
+            values={
+                **new_hedgehog.dict(),
+                "owner": requesting_user.id,
+                "shard_count": self.shards.count,
+                "shard_index": self.shards.shard_for_owner(requesting_user.id),
+            },
+            db=self.shards.for_owner(requesting_user.id),
         )
         return HedgehogInDB(**hedgehog)
 
     async def get_hedgehog_by_id(
         self, *, id: int, requesting_user: UserInDB
     ) -> HedgehogInDB:
-        hedgehog = await self.db.fetch_one(
-            query=query.GET_HEDGEHOG_BY_ID_QUERY, values={"id": id}
+        hedgehog = await self.fetch_one_coalesced(
+            "hedgehogs.get_hedgehog_by_id",
+            values={"id": id},
+            db=self.shards.for_hedgehog(id),
         )
         if not hedgehog:
             return None
         return HedgehogInDB(**hedgehog)
 
     async def list_all_user_hedgehogs(
-        self, requesting_user: UserInDB
+        self, requesting_user: UserInDB, fields: Optional[Sequence[str]] = None
     ) -> List[HedgehogInDB]:
-        hedgehog_records = await self.db.fetch_all(
-            query=query.LIST_ALL_USER_HEDGEHOGS_QUERY,
+        if fields:
+            return await self.list_user_hedgehog_columns(
+                requesting_user=requesting_user, fields=fields
+            )
+        hedgehog_records = await self.fetch_all(
+            "hedgehogs.list_all_user_hedgehogs",
             values={"owner": requesting_user.id},
+            db=self.shards.for_owner(requesting_user.id),
         )
         return [HedgehogInDB(**item) for item in hedgehog_records]
 
+    async def list_user_hedgehog_columns(
+        self, *, requesting_user: UserInDB, fields: Sequence[str]
+    ) -> List[HedgehogInDB]:
+        """
+        Only the requested columns, as instances of a pruned HedgehogInDB.
+        """
+        columns = tuple(name for name in query.HEDGEHOG_COLUMNS if name in fields)
+        hedgehog_records = await self.fetch_all(
+            compile_query(
+                query.LIST_USER_HEDGEHOG_COLUMNS_QUERY.format(
+                    columns=", ".join(columns)
+                ),
+                name="hedgehogs.list_user_hedgehog_columns",
+            ),
+            values={"owner": requesting_user.id},
+            db=self.shards.for_owner(requesting_user.id),
+        )
+        model = prune_model(HedgehogInDB, columns)
+        return [model(**item) for item in hedgehog_records]
+
+    async def search_hedgehogs(
+        self, *, term: str, limit: int, cursor: Optional[str] = None
+    ) -> HedgehogSearchPage:
+        after_rank, after_id = decode_cursor(cursor, size=2) if cursor else (None, None)
+        values = {
+            "term": term,
+            "after_rank": after_rank,
+            "after_id": after_id,
+            # One extra row tells whether there is a next page.
+            "limit": limit + 1,
+        }
+        hedgehog_records = await self.fetch_all_merged(
+            query="hedgehogs.search_hedgehogs",
+            values=values,
+            key=lambda record: (record["rank"], record["id"]),
+            limit=limit + 1,
+        )
+        results = [HedgehogSearchResult(**item) for item in hedgehog_records[:limit]]
+        next_cursor = None
+        if len(hedgehog_records) > limit:
+            next_cursor = encode_cursor(results[-1].rank, results[-1].id)
+        return HedgehogSearchPage(results=results, next_cursor=next_cursor)
+
+    async def browse_catalog(
+        self,
+        *,
+        limit: int,
+        cursor: Optional[str] = None,
+        color_type: Optional[ColorType] = None,
+        min_age: Optional[float] = None,
+        max_age: Optional[float] = None,
+        name: Optional[str] = None,
+    ) -> HedgehogCatalogPage:
+        filters = {
+            "color_type": color_type.value if color_type else None,
+            "min_age": min_age,
+            "max_age": max_age,
+            "name": f"%{escape_like(name)}%" if name else None,
+        }
+        filters = {key: value for key, value in filters.items() if value is not None}
+        where = [query.CATALOG_FILTERS[key] for key in filters]
+
+        page_where, page_values = list(where), dict(filters)
+        if cursor:
+            (page_values["after_id"],) = decode_cursor(cursor, size=1)
+            page_where.append("id < :after_id")
+        hedgehog_records = await self.fetch_all_merged(
+            query=compile_query(
+                query.BROWSE_CATALOG_QUERY.format(where=join_filters(page_where)),
+                name="hedgehogs.browse_catalog",
+            ),
+            # One extra row tells whether there is a next page.
+            values={**page_values, "limit": limit + 1},
+            key=lambda record: record["id"],
+            limit=limit + 1,
+        )
+        results = [HedgehogInDB(**item) for item in hedgehog_records[:limit]]
+        next_cursor = None
+        if len(hedgehog_records) > limit:
+            next_cursor = encode_cursor(results[-1].id)
+
+        total, is_estimate = await self.count_catalog(where=where, values=filters)
+        return HedgehogCatalogPage(
+            results=results,
+            next_cursor=next_cursor,
+            total=total,
+            total_is_estimate=is_estimate,
+        )
+
+    async def count_catalog(
+        self, *, where: List[str], values: Dict[str, Any]
+    ) -> Tuple[int, bool]:
+        counts = await self.shards.fan_out(
+            lambda db: self.count_catalog_on_shard(db, where=where, values=values)
+        )
+        return (
+            sum(total for total, _ in counts),
+            any(is_estimate for _, is_estimate in counts),
+        )
+
+    async def count_catalog_on_shard(
+        self, db: Database, *, where: List[str], values: Dict[str, Any]
+    ) -> Tuple[int, bool]:
+        """
+        Planner estimate of the matching rows; only small results, where the
+        estimate is least reliable and counting is cheap, are counted exactly.
+        """
+        estimate = None
+        if not where:
+            estimate = await self.fetch_val("hedgehogs.estimate_hedgehogs", db=db)
+        if not estimate or estimate <= 0:
+            plan = await self.fetch_val(
+                compile_query(
+                    query.ESTIMATE_CATALOG_QUERY.format(where=join_filters(where)),
+                    name="hedgehogs.estimate_catalog",
+                ),
+                values=values,
+                db=db,
+            )
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            estimate = plan[0]["Plan"]["Plan Rows"]
+        if estimate >= CATALOG_EXACT_COUNT_THRESHOLD:
+            return int(estimate), True
+        total = await self.fetch_val(
+            compile_query(
+                query.COUNT_CATALOG_QUERY.format(where=join_filters(where)),
+                name="hedgehogs.count_catalog",
+            ),
+            values=values,
+            db=db,
+        )
+        return total, False
+
     async def update_hedgehog(
         self, *, hedgehog: HedgehogInDB, hedgehog_update: HedgehogUpdate
     ) -> HedgehogInDB:
@@ -47,15 +220,87 @@ class HedgehogsRepository(BaseRepository):
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Invalid hedgehog type. Cannot be None.",
             )
-        updated_hedgehog = await self.db.fetch_one(
-            query=query.UPDATE_HEDGEHOG_BY_ID_QUERY,
-            values=hedgehog_update_params.dict(
-                exclude={"owner", "created_at", "updated_at"}
-            ),
+        updated_hedgehog = await self.fetch_one(
+            "hedgehogs.update_hedgehog_by_id",
+            values=hedgehog_update_params.dict(exclude={"created_at", "updated_at"}),
+            db=self.shards.for_owner(hedgehog.owner),
         )
         return HedgehogInDB(**updated_hedgehog)
 
     async def delete_hedgehog_by_id(self, *, hedgehog: HedgehogInDB) -> int:
-        return await self.db.execute(
-            query=query.DELETE_HEDGEHOG_BY_ID_QUERY, values={"id": hedgehog.id}
+        return await self.execute(
+            "hedgehogs.delete_hedgehog_by_id",
+            values={"id": hedgehog.id, "owner": hedgehog.owner},
+            db=self.shards.for_owner(hedgehog.owner),
         )
+
+    async def delete_inactive_owner_hedgehogs_batch(
+        self, *, owner: int, limit: int
+    ) -> int:
+        """
+        Hard-delete up to `limit` of a deactivated owner's hedgehogs,
+        soft-deleted ones included. Returns how many were removed, 0 once the
+        owner is active again. The owner's row stays share-locked while the
+        batch runs, so reactivating the account waits for it.
+        """
+        values = {"owner": owner, "limit": limit}
+        shard = self.shards.for_owner(owner)
+        if shard is self.shards.primary:
+            return await self.fetch_val(
+                "hedgehogs.delete_owner_hedgehogs_batch", values=values
+            )
+        async with self.db.transaction():
+            if not await self.fetch_val(
+                "hedgehogs.lock_inactive_owner", values={"owner": owner}
+            ):
+                return 0
+            return await self.fetch_val(
+                "hedgehogs.delete_shard_owner_hedgehogs_batch", values=values, db=shard
+            )
+
+    async def archive_deleted_hedgehogs(
+        self, *, deleted_before: datetime, batch_size: int
+    ) -> int:
+        archived = await self.shards.fan_out(
+            lambda db: self.archive_deleted_hedgehogs_on_shard(
+                db, deleted_before=deleted_before, batch_size=batch_size
+            )
+        )
+        return sum(archived)
+
+    async def archive_deleted_hedgehogs_on_shard(
+        self, db: Database, *, deleted_before: datetime, batch_size: int
+    ) -> int:
+        """
+        Move rows soft-deleted before `deleted_before` into hedgehogs_archive,
+        one short transaction per batch. Returns how many rows were moved.
+        """
+        values = {"deleted_before": deleted_before}
+        await self.execute("hedgehogs.create_archive_partitions", values, db=db)
+        archived = 0
+        while True:
+            async with db.transaction():
+                count = await self.fetch_val(
+                    "hedgehogs.archive_deleted_hedgehogs",
+                    values={**values, "limit": batch_size},
+                    db=db,
+                )
+            archived += count
+            if count < batch_size:
+                return archived
+
+    async def fetch_all_merged(
+        self, *, query: Query, values: Dict[str, Any], key: Any, limit: int
+    ) -> List[Any]:
+        """
+        Run a query ordered by `key` descending on every shard and keep the
+        first `limit` rows overall.
+        """
+        records = await self.shards.fan_out(
+            lambda db: self.fetch_all(query, values, db=db)
+        )
+        return sorted(chain.from_iterable(records), key=key, reverse=True)[:limit]
+
+
+def join_filters(where: List[str]) -> str:
+    return " AND ".join([query.CATALOG_LIVE_FILTER, *where])
@@ -0,0 +1,84 @@
+import json
+from typing import Any, Dict, List, Optional
+
+from app.core.config import JOB_MAX_ATTEMPTS
+from app.db.repositories.base import BaseRepository
+from app.models.job import JobCreate, JobInDB
+
+
+class JobsRepository(BaseRepository):
+    """
+    Jobs are plain rows, so enqueueing inside `async with db.transaction():`
+    commits or rolls back together with the writes that produced them.
+    """
+
+    async def enqueue_job(self, *, new_job: JobCreate) -> JobInDB:
+        job = await self.fetch_one(
+            "jobs.enqueue_job",
+            values={
+                "task": new_job.task,
+                "payload": json.dumps(new_job.payload, default=str),
+                "run_at": new_job.run_at,
+                "max_attempts": new_job.max_attempts or JOB_MAX_ATTEMPTS,
+            },
+        )
+        return JobInDB(**job)
+
+    async def schedule_job_once(self, *, new_job: JobCreate) -> Optional[JobInDB]:
+        """
+        Enqueue `new_job` unless a run of the same task is already queued or
+        running, in which case nothing is scheduled and None is returned.
+        """
+        async with self.db.transaction():
+            await self.execute("jobs.lock_job_task", values={"task": new_job.task})
+            job = await self.fetch_one(
+                "jobs.schedule_job_once",
+                values={
+                    "task": new_job.task,
+                    "payload": json.dumps(new_job.payload, default=str),
+                    "run_at": new_job.run_at,
+                    "max_attempts": new_job.max_attempts or JOB_MAX_ATTEMPTS,
+                },
+            )
+        if not job:
+            return None
+        return JobInDB(**job)
+
+    async def get_job_by_id(self, *, id: int) -> Optional[JobInDB]:
+        job = await self.fetch_one("jobs.get_job_by_id", values={"id": id})
+        if not job:
+            return None
+        return JobInDB(**job)
+
+    async def claim_next_job(
+        self, *, tasks: List[str], lock_timeout: float
+    ) -> Optional[JobInDB]:
+        job = await self.fetch_one(
+            "jobs.claim_next_job",
+            values={"tasks": tasks, "lock_timeout": float(lock_timeout)},
+        )
+        if not job:
+            return None
+        return JobInDB(**job)
+
+    async def complete_job(self, *, job: JobInDB) -> int:
+        return await self.execute("jobs.complete_job", values={"id": job.id})
+
+    async def retry_job(self, *, job: JobInDB, error: str, delay: float) -> int:
+        return await self.execute(
+            "jobs.retry_job",
+            values={"id": job.id, "delay": float(delay), "last_error": error},
+        )
+
+    async def fail_job(self, *, job: JobInDB, error: str) -> int:
+        return await self.execute(
+            "jobs.fail_job", values={"id": job.id, "last_error": error}
+        )
+
+    async def update_job_progress(
+        self, *, job: JobInDB, progress: Dict[str, Any]
+    ) -> Optional[int]:
+        return await self.execute(
+            "jobs.update_job_progress",
+            values={"id": job.id, "progress": json.dumps(progress, default=str)},
+        )
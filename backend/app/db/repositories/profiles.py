@@ -1,77 +1,89 @@
+from typing import List, Optional, Sequence
+
+import app.db.repositories.queries.profiles as query
+from app.db.registry import compile_query
 from app.db.repositories.base import BaseRepository
+from app.db.unit_of_work import after_commit
+from app.models.core import prune_model
 from app.models.profile import ProfileCreate, ProfileInDB, ProfileUpdate
 from app.models.user import UserInDB
-
-CREATE_PROFILE_FOR_USER_QUERY = """
-    INSERT INTO profiles (full_name, phone_number, bio, image, user_id)
-    VALUES (:full_name, :phone_number, :bio, :image, :user_id)
-    RETURNING id, full_name, phone_number, bio, image, user_id, created_at, updated_at;
-"""
-GET_PROFILE_BY_USER_ID_QUERY = """
-    SELECT id, full_name, phone_number, bio, image, user_id, created_at, updated_at
-    FROM profiles
-    WHERE user_id = :user_id;
-"""
-GET_PROFILE_BY_USERNAME_QUERY = """
-    SELECT p.id,
-           u.email AS email,
-           u.username AS username,
-           full_name,
-           phone_number,
-           bio,
-           image,
-           user_id,
-           p.created_at,
-           p.updated_at
-    FROM profiles p
-        INNER JOIN users u
-        ON p.user_id = u.id
-    WHERE user_id = (SELECT id FROM users WHERE username = :username);
-"""
-UPDATE_PROFILE_QUERY = """
-    UPDATE profiles
-    SET full_name    = :full_name,
-        phone_number = :phone_number,
-        bio          = :bio,
-        image        = :image
-    WHERE user_id = :user_id
-    RETURNING id, full_name, phone_number, bio, image, user_id, created_at, updated_at;
-"""
+from app.services import profile_cache
+from app.services.cache import user_tag
 
 
 class ProfilesRepository(BaseRepository):
     async def create_profile_for_user(
         self, *, profile_create: ProfileCreate
     ) -> ProfileInDB:
-        created_profile = await self.db.fetch_one(
-            query=CREATE_PROFILE_FOR_USER_QUERY, values=profile_create.dict()
+        created_profile = await self.fetch_one(
+            "profiles.create_profile_for_user", values=profile_create.dict()
         )
         return created_profile
 
     async def get_profile_by_user_id(self, *, user_id: int) -> ProfileInDB:
-        profile_record = await self.db.fetch_one(
-            query=GET_PROFILE_BY_USER_ID_QUERY, values={"user_id": user_id}
+        profile_record = await self.fetch_one(
+            "profiles.get_profile_by_user_id", values={"user_id": user_id}
         )
         if not profile_record:
             return None
         return ProfileInDB(**profile_record)
 
-    async def get_profile_by_username(self, *, username: str) -> ProfileInDB:
-        profile_record = await self.db.fetch_one(
-            query=GET_PROFILE_BY_USERNAME_QUERY, values={"username": username}
+    async def get_profile_by_username(
+        self, *, username: str, fields: Optional[Sequence[str]] = None
+    ) -> ProfileInDB:
+        if fields:
+            return await self.get_profile_columns_by_username(
+                username=username, fields=fields
+            )
+        profile_record = await self.fetch_one_coalesced(
+            "profiles.get_profile_by_username", values={"username": username}
         )
         if profile_record:
             return ProfileInDB(**profile_record)
 
+    async def get_profile_columns_by_username(
+        self, *, username: str, fields: Sequence[str]
+    ) -> Optional[ProfileInDB]:
+        """
+        Only the requested columns, as an instance of a pruned ProfileInDB.
+        """
+        columns = tuple(name for name in query.PROFILE_COLUMNS if name in fields)
+        profile_record = await self.fetch_one_coalesced(
+            compile_query(
+                query.GET_PROFILE_COLUMNS_BY_USERNAME_QUERY.format(
+                    columns=", ".join(
+                        f"{query.PROFILE_COLUMNS[name]} AS {name}" for name in columns
+                    )
+                ),
+                name="profiles.get_profile_columns_by_username",
+            ),
+            values={"username": username},
+        )
+        if profile_record:
+            return prune_model(ProfileInDB, columns)(**profile_record)
+
+    async def list_recently_updated_profiles(self, *, limit: int) -> List[ProfileInDB]:
+        """
+        Active users' profiles, most recently updated first. Used to preload
+        the profile cache at startup.
+        """
+        profile_records = await self.fetch_all(
+            "profiles.list_recently_updated_profiles", values={"limit": limit}
+        )
+        return [ProfileInDB(**record) for record in profile_records]
+
     async def update_profile(
         self, *, profile_update: ProfileUpdate, requesting_user: UserInDB
     ) -> ProfileInDB:
         profile = await self.get_profile_by_user_id(user_id=requesting_user.id)
         update_params = profile.copy(update=profile_update.dict(exclude_unset=True))
-        updated_profile = await self.db.fetch_one(
-            query=UPDATE_PROFILE_QUERY,
+        updated_profile = await self.fetch_one(
+            "profiles.update_profile",
             values=update_params.dict(
                 exclude={"id", "created_at", "updated_at", "username", "email"}
             ),
         )
+        await after_commit(
+            lambda: profile_cache.invalidate_tags(user_tag(requesting_user.id))
+        )
         return ProfileInDB(**updated_profile)
@@ -1,19 +1,47 @@
+HEDGEHOG_COLUMNS = (
+    "id",
+    "name",
+    "description",
+    "age",
+    "color_type",
+    "owner",
+    "created_at",
+    "updated_at",
+)
+
+# Ids encode the shard: shard i of n only hands out ids with id % n == i.
 CREATE_HEDGEHOG_QUERY = """
-    INSERT INTO hedgehogs (name, description, age, color_type, owner)
-    VALUES (:name, :description, :age, :color_type, :owner)
+    INSERT INTO hedgehogs (id, name, description, age, color_type, owner)
+    VALUES (
+        nextval('hedgehogs_id_seq') * :shard_count + :shard_index,
+        :name, :description, :age, :color_type, :owner
+    )
     RETURNING id, name, description, age, color_type, owner, created_at, updated_at;
 """
 
+# hedgehogs is partitioned by owner; resolving the owner from the id first
+# lets the executor skip every other partition.
 GET_HEDGEHOG_BY_ID_QUERY = """
     SELECT id, name, description, age, color_type, owner, created_at, updated_at
     FROM hedgehogs
-    WHERE id = :id;
+    WHERE id = :id
+      AND owner = (SELECT owner FROM hedgehog_owners WHERE id = :id)
+      AND deleted_at IS NULL;
 """
 
 LIST_ALL_USER_HEDGEHOGS_QUERY = """
     SELECT id, name, description, age, color_type, owner, created_at, updated_at
     FROM hedgehogs
-    WHERE owner = :owner;
+    WHERE owner = :owner
+      AND deleted_at IS NULL;
+"""
+
+# Column names are interpolated from HEDGEHOG_COLUMNS only, never from input.
+LIST_USER_HEDGEHOG_COLUMNS_QUERY = """
+    SELECT {columns}
+    FROM hedgehogs
+    WHERE owner = :owner
+      AND deleted_at IS NULL;
 """
 
 UPDATE_HEDGEHOG_BY_ID_QUERY = """
@@ -23,11 +51,176 @@ UPDATE_HEDGEHOG_BY_ID_QUERY = """
         age           = :age,
         color_type    = :color_type
     WHERE id = :id
+      AND owner = :owner
+      AND deleted_at IS NULL
     RETURNING id, name, description, age, color_type, owner, created_at, updated_at;
 """
 
+# Deleted rows stay in place, invisible to every query here, until the archive
+# job moves them out.
 DELETE_HEDGEHOG_BY_ID_QUERY = """
-    DELETE FROM hedgehogs
+    UPDATE hedgehogs
+    SET deleted_at = now()
     WHERE id = :id
+      AND owner = :owner
+      AND deleted_at IS NULL
     RETURNING id;
 """
+
+# Removes a deactivated owner's rows, live ones first, each branch through its
+# own index. Deletes nothing once the owner is active again; the share lock
+# makes a reactivation wait for the batch instead of racing it.
+DELETE_OWNER_HEDGEHOGS_BATCH_QUERY = """
+    WITH deleted AS (
+        DELETE FROM hedgehogs
+        WHERE owner = :owner
+          AND id IN (
+              SELECT id
+              FROM (
+                  (SELECT id FROM hedgehogs
+                   WHERE owner = :owner AND deleted_at IS NULL
+                   LIMIT :limit)
+                  UNION ALL
+                  (SELECT id FROM hedgehogs
+                   WHERE owner = :owner AND deleted_at IS NOT NULL
+                   LIMIT :limit)
+              ) AS batch
+              LIMIT :limit
+          )
+          AND EXISTS (
+              SELECT 1 FROM users WHERE id = :owner AND NOT is_active FOR SHARE
+          )
+        RETURNING id
+    )
+    SELECT count(*) FROM deleted;
+"""
+# Users only live on the primary, so on other shards the batch runs while the
+# primary holds LOCK_INACTIVE_OWNER in an open transaction instead.
+DELETE_SHARD_OWNER_HEDGEHOGS_BATCH_QUERY = """
+    WITH deleted AS (
+        DELETE FROM hedgehogs
+        WHERE owner = :owner
+          AND id IN (
+              SELECT id
+              FROM (
+                  (SELECT id FROM hedgehogs
+                   WHERE owner = :owner AND deleted_at IS NULL
+                   LIMIT :limit)
+                  UNION ALL
+                  (SELECT id FROM hedgehogs
+                   WHERE owner = :owner AND deleted_at IS NOT NULL
+                   LIMIT :limit)
+              ) AS batch
+              LIMIT :limit
+          )
+        RETURNING id
+    )
+    SELECT count(*) FROM deleted;
+"""
+LOCK_INACTIVE_OWNER_QUERY = """
+    SELECT TRUE FROM users WHERE id = :owner AND NOT is_active FOR SHARE;
+"""
+
+# Matches either the full-text vector or, for typos, the name's trigrams.
+# Ordered by (rank, id) descending so pages can continue from the last row seen.
+SEARCH_HEDGEHOGS_QUERY = """
+    WITH matches AS (
+        SELECT h.id, h.name, h.description, h.age, h.color_type, h.owner,
+               h.created_at, h.updated_at,
+               (ts_rank(h.search_vector, q.query) + similarity(h.name, :term))::real
+                   AS rank
+        FROM hedgehogs h,
+             websearch_to_tsquery('english', :term) AS q(query)
+        WHERE h.deleted_at IS NULL
+          AND (h.search_vector @@ q.query OR h.name % :term)
+    )
+    SELECT id, name, description, age, color_type, owner, created_at, updated_at,
+           rank
+    FROM matches
+    WHERE CAST(:after_rank AS real) IS NULL
+       OR (rank, id) < (CAST(:after_rank AS real), CAST(:after_id AS integer))
+    ORDER BY rank DESC, id DESC
+    LIMIT :limit;
+"""
+
+# Every catalog query is restricted to live rows, matching the partial indexes.
+CATALOG_LIVE_FILTER = "deleted_at IS NULL"
+
+# Catalog filters by parameter name. Only these fragments are ever joined into
+# the WHERE clause of the catalog queries below.
+CATALOG_FILTERS = {
+    "color_type": "color_type = :color_type",
+    "min_age": "age >= :min_age",
+    "max_age": "age <= :max_age",
+    "name": "name ILIKE :name",
+}
+
+BROWSE_CATALOG_QUERY = """
+    SELECT id, name, description, age, color_type, owner, created_at, updated_at
+    FROM hedgehogs
+    WHERE {where}
+    ORDER BY id DESC
+    LIMIT :limit;
+"""
+
+COUNT_CATALOG_QUERY = """
+    SELECT count(*)
+    FROM hedgehogs
+    WHERE {where};
+"""
+
+# The planner's row estimate for the filtered scan, read from the top plan node.
+ESTIMATE_CATALOG_QUERY = """
+    EXPLAIN (FORMAT JSON)
+    SELECT 1
+    FROM hedgehogs
+    WHERE {where};
+"""
+
+# The owner index is partial and holds every live row, so the size of its
+# partitions adds up to the number of live hedgehogs rather than the table's.
+ESTIMATE_HEDGEHOGS_QUERY = """
+    SELECT sum(c.reltuples)::bigint
+    FROM pg_inherits i
+        JOIN pg_class c
+        ON c.oid = i.inhrelid
+    WHERE i.inhparent = 'ix_hedgehogs_owner'::regclass;
+"""
+
+# Month partitions for every row the next archive run may move.
+CREATE_ARCHIVE_PARTITIONS_QUERY = """
+    SELECT create_hedgehogs_archive_partition(month)
+    FROM (
+        SELECT DISTINCT
+            date_trunc('month', deleted_at AT TIME ZONE 'UTC') AT TIME ZONE 'UTC'
+                AS month
+        FROM hedgehogs
+        WHERE deleted_at < :deleted_before
+    ) AS months;
+"""
+
+ARCHIVE_DELETED_HEDGEHOGS_QUERY = """
+    WITH moved AS (
+        DELETE FROM hedgehogs
+        WHERE id IN (
+            SELECT id
+            FROM hedgehogs
+            WHERE deleted_at < :deleted_before
+            ORDER BY deleted_at
+            LIMIT :limit
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING id, name, description, age, color_type, owner, created_at,
+                  updated_at, deleted_at
+    ), archived AS (
+        INSERT INTO hedgehogs_archive (
+            id, name, description, age, color_type, owner, created_at, updated_at,
+            deleted_at
+        )
+        SELECT id, name, description, age, color_type, owner, created_at,
+               updated_at, deleted_at
+        FROM moved
+        RETURNING 1
+    )
+    SELECT count(*) FROM archived;
+"""
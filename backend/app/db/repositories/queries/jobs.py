@@ -0,0 +1,94 @@
+ENQUEUE_JOB_QUERY = """
+    INSERT INTO jobs (task, payload, run_at, max_attempts)
+    VALUES (:task, CAST(:payload AS jsonb), COALESCE(:run_at, now()), :max_attempts)
+    RETURNING id, task, payload, progress, status, attempts, max_attempts, run_at,
+              locked_at, last_error, created_at, updated_at;
+"""
+
+# Periodic tasks keep at most one pending run. The advisory lock, taken by the
+# caller in the same transaction, serialises concurrent workers scheduling it.
+LOCK_JOB_TASK_QUERY = """
+    SELECT pg_advisory_xact_lock(hashtext(:task));
+"""
+
+SCHEDULE_JOB_ONCE_QUERY = """
+    INSERT INTO jobs (task, payload, run_at, max_attempts)
+    SELECT :task, CAST(:payload AS jsonb), COALESCE(:run_at, now()), :max_attempts
+    WHERE NOT EXISTS (
+        SELECT 1
+        FROM jobs
+        WHERE task = :task
+          AND status IN ('queued', 'running')
+    )
+    RETURNING id, task, payload, progress, status, attempts, max_attempts, run_at,
+              locked_at, last_error, created_at, updated_at;
+"""
+
+GET_JOB_BY_ID_QUERY = """
+    SELECT id, task, payload, progress, status, attempts, max_attempts, run_at,
+           locked_at, last_error, created_at, updated_at
+    FROM jobs
+    WHERE id = :id;
+"""
+
+CLAIM_NEXT_JOB_QUERY = """
+    UPDATE jobs
+    SET status    = 'running',
+        attempts  = attempts + 1,
+        locked_at = now()
+    WHERE id = (
+        SELECT id
+        FROM jobs
+        WHERE task = ANY(:tasks)
+          AND (
+                (status = 'queued' AND run_at <= now())
+                OR (
+                    status = 'running'
+                    AND locked_at < now() - make_interval(secs => :lock_timeout)
+                )
+          )
+        ORDER BY run_at
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING id, task, payload, progress, status, attempts, max_attempts, run_at,
+              locked_at, last_error, created_at, updated_at;
+"""
+
+COMPLETE_JOB_QUERY = """
+    UPDATE jobs
+    SET status     = 'done',
+        locked_at  = NULL,
+        last_error = NULL
+    WHERE id = :id
+    RETURNING id;
+"""
+
+RETRY_JOB_QUERY = """
+    UPDATE jobs
+    SET status     = 'queued',
+        run_at     = now() + make_interval(secs => :delay),
+        locked_at  = NULL,
+        last_error = :last_error
+    WHERE id = :id
+    RETURNING id;
+"""
+
+FAIL_JOB_QUERY = """
+    UPDATE jobs
+    SET status     = 'failed',
+        locked_at  = NULL,
+        last_error = :last_error
+    WHERE id = :id
+    RETURNING id;
+"""
+
+# Also refreshes locked_at, so long running jobs reporting progress are not
+# mistaken for abandoned ones and claimed again.
+UPDATE_JOB_PROGRESS_QUERY = """
+    UPDATE jobs
+    SET progress  = progress || CAST(:progress AS jsonb),
+        locked_at = now()
+    WHERE id = :id AND status = 'running'
+    RETURNING id;
+"""
@@ -0,0 +1,73 @@
+CREATE_PROFILE_FOR_USER_QUERY = """
+    INSERT INTO profiles (full_name, phone_number, bio, image, user_id)
+    VALUES (:full_name, :phone_number, :bio, :image, :user_id)
+    RETURNING id, full_name, phone_number, bio, image, user_id, created_at, updated_at;
+"""
+GET_PROFILE_BY_USER_ID_QUERY = """
+    SELECT id, full_name, phone_number, bio, image, user_id, created_at, updated_at
+    FROM profiles
+    WHERE user_id = :user_id;
+"""
+GET_PROFILE_BY_USERNAME_QUERY = """
+    SELECT p.id,
+           u.email AS email,
+           u.username AS username,
+           full_name,
+           phone_number,
+           bio,
+           image,
+           user_id,
+           p.created_at,
+           p.updated_at
+    FROM profiles p
+        INNER JOIN users u
+        ON p.user_id = u.id
+    WHERE user_id = (SELECT id FROM users WHERE username = :username);
+"""
+LIST_RECENTLY_UPDATED_PROFILES_QUERY = """
+    SELECT p.id,
+           u.email AS email,
+           u.username AS username,
+           full_name,
+           phone_number,
+           bio,
+           image,
+           user_id,
+           p.created_at,
+           p.updated_at
+    FROM profiles p
+        INNER JOIN users u
+        ON p.user_id = u.id
+    WHERE u.is_active
+    ORDER BY p.updated_at DESC
+    LIMIT :limit;
+"""
+# Public profile field -> SQL expression, for sparse fieldsets.
+PROFILE_COLUMNS = {
+    "id": "p.id",
+    "full_name": "p.full_name",
+    "phone_number": "p.phone_number",
+    "bio": "p.bio",
+    "image": "p.image",
+    "user_id": "p.user_id",
+    "username": "u.username",
+    "email": "u.email",
+    "created_at": "p.created_at",
+    "updated_at": "p.updated_at",
+}
+GET_PROFILE_COLUMNS_BY_USERNAME_QUERY = """
+    SELECT {columns}
+    FROM profiles p
+        INNER JOIN users u
+        ON p.user_id = u.id
+    WHERE u.username = :username;
+"""
+UPDATE_PROFILE_QUERY = """
+    UPDATE profiles
+    SET full_name    = :full_name,
+        phone_number = :phone_number,
+        bio          = :bio,
+        image        = :image
+    WHERE user_id = :user_id
+    RETURNING id, full_name, phone_number, bio, image, user_id, created_at, updated_at;
+"""
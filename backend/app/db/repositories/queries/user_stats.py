@@ -0,0 +1,73 @@
+GET_USER_STATS_QUERY = """
+    SELECT user_id, hedgehog_count, total_age, color_counts, updated_at
+    FROM user_stats
+    WHERE user_id = :user_id;
+"""
+
+# What user_stats should contain, computed from scratch.
+EXPECTED_USER_STATS = """
+    SELECT owner AS user_id,
+           sum(count)::integer AS hedgehog_count,
+           sum(total_age)::numeric(14, 2) AS total_age,
+           jsonb_object_agg(color_type, count) AS color_counts
+    FROM (
+        SELECT owner, color_type, count(*) AS count, sum(age) AS total_age
+        FROM hedgehogs
+        WHERE owner IS NOT NULL
+          AND deleted_at IS NULL
+        GROUP BY owner, color_type
+    ) AS by_color
+    GROUP BY owner
+"""
+
+# Rows that differ from the expected values. Colours counted as zero are
+# ignored, the triggers leave them behind when the last one goes.
+FIND_INCONSISTENT_USER_STATS_QUERY = f"""
+    WITH expected AS ({EXPECTED_USER_STATS}),
+    actual AS (
+        SELECT user_id, hedgehog_count, total_age,
+               coalesce(
+                   (SELECT jsonb_object_agg(key, value)
+                    FROM jsonb_each(color_counts)
+                    WHERE value::integer <> 0),
+                   '{{}}'::jsonb
+               ) AS color_counts
+        FROM user_stats
+    )
+    SELECT coalesce(e.user_id, a.user_id) AS user_id,
+           a.hedgehog_count AS actual_count,
+           e.hedgehog_count AS expected_count
+    FROM expected e
+        FULL OUTER JOIN actual a
+        ON a.user_id = e.user_id
+    WHERE a.user_id IS NULL AND e.hedgehog_count <> 0
+       OR e.user_id IS NULL AND a.hedgehog_count <> 0
+       OR a.hedgehog_count <> e.hedgehog_count
+       OR a.total_age <> e.total_age
+       OR a.color_counts <> e.color_counts
+    ORDER BY 1;
+"""
+
+# Keeps writers out while the table is recomputed, so no trigger update is lost.
+LOCK_HEDGEHOGS_FOR_STATS_QUERY = """
+    LOCK TABLE hedgehogs IN SHARE MODE;
+"""
+
+DELETE_USER_STATS_QUERY = """
+    DELETE FROM user_stats;
+"""
+
+REBUILD_USER_STATS_QUERY = f"""
+    INSERT INTO user_stats (user_id, hedgehog_count, total_age, color_counts)
+    {EXPECTED_USER_STATS};
+"""
+
+COUNT_USER_STATS_QUERY = """
+    SELECT count(*)
+    FROM user_stats;
+"""
+
+DELETE_USER_STATS_BY_USER_ID_QUERY = """
+    DELETE FROM user_stats
+    WHERE user_id = :user_id;
+"""
@@ -0,0 +1,114 @@
+GET_USER_BY_EMAIL_QUERY = """
+    SELECT
+        id, username, email, email_verified, password,
+        salt, is_active, is_superuser, created_at, updated_at
+    FROM
+        users
+    WHERE
+        email = :email;
+"""
+GET_USER_BY_USERNAME_QUERY = """
+    SELECT
+        id, username, email, email_verified, password,
+        salt, is_active, is_superuser, created_at, updated_at
+    FROM
+        users
+    WHERE
+        username = :username;
+"""
+REGISTER_NEW_USER_QUERY = """
+    INSERT INTO users
+        (username, email, password, salt)
+    VALUES
+        (:username, :email, :password, :salt)
+    RETURNING
+        id, username, email, email_verified, password,
+        salt, is_active, is_superuser, created_at, updated_at;
+"""
+VERIFY_USER_EMAIL_QUERY = """
+    UPDATE users
+    SET
+        email_verified = TRUE
+    WHERE
+        email = :email AND username = :username
+    RETURNING
+        id, username, email, email_verified, password,
+        salt, is_active, is_superuser, created_at, updated_at;
+"""
+GET_PUBLIC_USERS_BY_IDS_QUERY = """
+    SELECT
+        u.id, u.username, u.email, u.email_verified, u.is_active,
+        u.is_superuser, u.created_at, u.updated_at,
+        p.id AS profile_id, p.full_name, p.phone_number, p.bio, p.image,
+        p.created_at AS profile_created_at, p.updated_at AS profile_updated_at
+    FROM
+        users u
+        LEFT JOIN profiles p
+        ON p.user_id = u.id
+    WHERE
+        u.id = ANY(:ids);
+"""
+LIST_ACTIVE_USERNAMES_QUERY = """
+    SELECT
+        id, username
+    FROM
+        users
+    WHERE
+        is_active;
+"""
+GET_ACTIVE_USERNAME_BY_ID_QUERY = """
+    SELECT
+        username
+    FROM
+        users
+    WHERE
+        id = :id AND is_active;
+"""
+# Admin listing filters by parameter name. Only these fragments are ever joined
+# into the WHERE clause of LIST_USERS_QUERY.
+USER_LIST_FILTERS = {
+    "email_prefix": "email LIKE :email_prefix",
+    "username_prefix": "username LIKE :username_prefix",
+    "is_active": "is_active = :is_active",
+    "created_after": "created_at >= :created_after",
+    "created_before": "created_at < :created_before",
+    "after_id": "id < :after_id",
+}
+LIST_USERS_QUERY = """
+    SELECT
+        id, username, email, email_verified, is_active,
+        is_superuser, created_at, updated_at
+    FROM
+        users
+    WHERE
+        {where}
+    ORDER BY
+        id DESC
+    LIMIT
+        :limit;
+"""
+SET_USERS_ACTIVE_QUERY = """
+    UPDATE users
+    SET
+        is_active = :is_active
+    WHERE
+        id = ANY(:ids) AND is_active <> :is_active
+    RETURNING
+        id;
+"""
+DEACTIVATE_USER_QUERY = """
+    UPDATE users
+    SET
+        is_active = FALSE
+    WHERE
+        id = :id
+    RETURNING
+        id;
+"""
+DELETE_INACTIVE_USER_QUERY = """
+    DELETE FROM users
+    WHERE
+        id = :id AND NOT is_active
+    RETURNING
+        id;
+"""
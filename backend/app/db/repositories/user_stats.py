@@ -0,0 +1,58 @@
+from typing import List, Optional
+
+from app.db.repositories.base import BaseRepository
+from app.db.shards import ShardRouter, get_shard_router
+from app.models.user_stats import UserStats, UserStatsInDB
+from databases import Database
+
+
+class UserStatsRepository(BaseRepository):
+    """
+    Stats are maintained next to the hedgehogs they summarise, so they live on
+    the owner's shard.
+    """
+
+    def __init__(self, db: Database, shards: Optional[ShardRouter] = None) -> None:
+        super().__init__(db)
+        self.shards = shards or get_shard_router(db)
+
+    async def get_user_stats(self, *, user_id: int) -> UserStats:
+        stats_record = await self.fetch_one(
+            "user_stats.get_user_stats",
+            values={"user_id": user_id},
+            db=self.shards.for_owner(user_id),
+        )
+        if not stats_record:
+            return UserStats()
+        return UserStatsInDB(**stats_record).to_public()
+
+    async def delete_user_stats(self, *, user_id: int) -> None:
+        await self.execute(
+            "user_stats.delete_user_stats_by_user_id",
+            values={"user_id": user_id},
+            db=self.shards.for_owner(user_id),
+        )
+
+    async def find_inconsistent_stats(self) -> List[int]:
+        """
+        Ids of users whose stored stats do not match their hedgehogs.
+        """
+        records = await self.shards.fan_out(
+            lambda db: self.fetch_all("user_stats.find_inconsistent_user_stats", db=db)
+        )
+        return sorted(record["user_id"] for shard in records for record in shard)
+
+    async def rebuild_stats(self) -> int:
+        rows = await self.shards.fan_out(self.rebuild_stats_on_shard)
+        return sum(rows)
+
+    async def rebuild_stats_on_shard(self, db: Database) -> int:
+        """
+        Recompute every row from the hedgehogs table. Writes to hedgehogs wait
+        until it commits.
+        """
+        async with db.transaction():
+            await self.execute("user_stats.lock_hedgehogs_for_stats", db=db)
+            await self.execute("user_stats.delete_user_stats", db=db)
+            await self.execute("user_stats.rebuild_user_stats", db=db)
+            return await self.fetch_val("user_stats.count_user_stats", db=db)
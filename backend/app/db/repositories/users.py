@@ -1,54 +1,37 @@
-from typing import Optional
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
 
-from app.db.repositories.base import BaseRepository
+from app.core.config import SECRET_KEY
+import app.db.repositories.queries.users as query
+from app.db.pagination import decode_cursor, encode_cursor
+from app.db.registry import compile_query
+from app.db.repositories.base import BaseRepository, escape_like
+from app.db.repositories.jobs import JobsRepository
 from app.db.repositories.profiles import ProfilesRepository
+from app.db.unit_of_work import after_commit
+from app.models.job import JobCreate, JobInDB
 from app.models.profile import ProfileCreate, ProfilePublic
-from app.models.user import UserCreate, UserInDB, UserPublic
-from app.services import auth_service
+from app.models.user import AdminUserPage, UserCreate, UserInDB, UserPublic
+from app.services import auth_service, profile_cache, username_index
+from app.services.cache import user_tag
+from app.services.jobs import DELETE_ACCOUNT_TASK, SEND_VERIFICATION_EMAIL_TASK
 from databases import Database
 from fastapi import HTTPException, status
 from pydantic import EmailStr
 
-GET_USER_BY_EMAIL_QUERY = """
-    SELECT
-        id, username, email, email_verified, password,
-        salt, is_active, is_superuser, created_at, updated_at
-    FROM
-        users
-    WHERE
-        email = :email;
-"""
-GET_USER_BY_USERNAME_QUERY = """
-    SELECT
-        id, username, email, email_verified, password,
-        salt, is_active, is_superuser, created_at, updated_at
-    FROM
-        users
-    WHERE
-        username = :username;
-"""
-REGISTER_NEW_USER_QUERY = """
-    INSERT INTO users
-        (username, email, password, salt)
-    VALUES
-        (:username, :email, :password, :salt)
-    RETURNING
-        id, username, email, email_verified, password,
-        salt, is_active, is_superuser, created_at, updated_at;
-"""
-
 
 class UsersRepository(BaseRepository):
     def __init__(self, db: Database) -> None:
         super().__init__(db)
         self.auth_service = auth_service
         self.profiles_repo = ProfilesRepository(db)
+        self.jobs_repo = JobsRepository(db)
 
     async def get_user_by_email(
         self, *, email: EmailStr, populate: bool = True
     ) -> UserInDB:
-        user_record = await self.db.fetch_one(
-            query=GET_USER_BY_EMAIL_QUERY, values={"email": email}
+        user_record = await self.fetch_one(
+            "users.get_user_by_email", values={"email": email}
         )
         if user_record:
             user = UserInDB(**user_record)
@@ -59,8 +42,8 @@ class UsersRepository(BaseRepository):
     async def get_user_by_username(
         self, *, username: str, populate: bool = True
     ) -> UserInDB:
-        user_record = await self.db.fetch_one(
-            query=GET_USER_BY_USERNAME_QUERY, values={"username": username}
+        user_record = await self.fetch_one(
+            "users.get_user_by_username", values={"username": username}
         )
         if user_record:
             user = UserInDB(**user_record)
@@ -82,14 +65,34 @@ class UsersRepository(BaseRepository):
             plaintext_password=new_user.password
         )
         new_user_params = new_user.copy(update=user_password_update.dict())
-        created_user = await self.db.fetch_one(
-            query=REGISTER_NEW_USER_QUERY, values=new_user_params.dict()
-        )
+        async with self.db.transaction():
+            created_user = await self.fetch_one(
+                "users.register_new_user", values=new_user_params.dict()
+            )
+            await self.profiles_repo.create_profile_for_user(
+                profile_create=ProfileCreate(user_id=created_user["id"])
+            )
+            await self.jobs_repo.enqueue_job(
+                new_job=JobCreate(
+                    task=SEND_VERIFICATION_EMAIL_TASK,
+                    payload={
+                        "email": created_user["email"],
+                        "username": created_user["username"],
+                    },
+                )
+            )
+        return await self.populate_user(user=UserInDB(**created_user))
 
-        await self.profiles_repo.create_profile_for_user(
-            profile_create=ProfileCreate(user_id=created_user["id"])
+    async def verify_email(self, *, token: str) -> Optional[UserInDB]:
+        creds = self.auth_service.get_creds_from_email_verification_token(
+            token=token, secret_key=str(SECRET_KEY)
         )
-        return await self.populate_user(user=UserInDB(**created_user))
+        user_record = await self.fetch_one(
+            "users.verify_user_email",
+            values={"email": creds.sub, "username": creds.username},
+        )
+        if user_record:
+            return await self.populate_user(user=UserInDB(**user_record))
 
     async def authenticate_user(
         self, *, email: EmailStr, password: str
@@ -106,8 +109,144 @@ class UsersRepository(BaseRepository):
             return None
         return user
 
+    async def get_public_users_by_ids(
+        self, *, ids: List[int]
+    ) -> Dict[int, UserPublic]:
+        """
+        Users and their profiles in one query, keyed by id. Meant as the batch
+        function behind a `BatchLoader`.
+        """
+        user_records = await self.fetch_all(
+            "users.get_public_users_by_ids", values={"ids": list(ids)}
+        )
+        users = {}
+        for record in user_records:
+            profile = None
+            if record["profile_id"] is not None:
+                profile = ProfilePublic(
+                    id=record["profile_id"],
+                    user_id=record["id"],
+                    username=record["username"],
+                    email=record["email"],
+                    full_name=record["full_name"],
+                    phone_number=record["phone_number"],
+                    bio=record["bio"],
+                    image=record["image"],
+                    created_at=record["profile_created_at"],
+                    updated_at=record["profile_updated_at"],
+                )
+            users[record["id"]] = UserPublic(
+                id=record["id"],
+                username=record["username"],
+                email=record["email"],
+                email_verified=record["email_verified"],
+                is_active=record["is_active"],
+                is_superuser=record["is_superuser"],
+                created_at=record["created_at"],
+                updated_at=record["updated_at"],
+                profile=profile,
+            )
+        return users
+
+    async def list_active_usernames(self) -> List[Tuple[int, str]]:
+        user_records = await self.fetch_all("users.list_active_usernames")
+        return [(record["id"], record["username"]) for record in user_records]
+
+    async def get_active_username_by_id(self, *, id: int) -> Optional[str]:
+        return await self.fetch_val(
+            "users.get_active_username_by_id", values={"id": id}
+        )
+
+    async def list_users(
+        self,
+        *,
+        limit: int,
+        cursor: Optional[str] = None,
+        email_prefix: Optional[str] = None,
+        username_prefix: Optional[str] = None,
+        is_active: Optional[bool] = None,
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None,
+    ) -> AdminUserPage:
+        filters = {
+            "email_prefix": f"{escape_like(email_prefix)}%" if email_prefix else None,
+            "username_prefix": f"{escape_like(username_prefix)}%"
+            if username_prefix
+            else None,
+            "is_active": is_active,
+            "created_after": created_after,
+            "created_before": created_before,
+            "after_id": decode_cursor(cursor, size=1)[0] if cursor else None,
+        }
+        filters = {key: value for key, value in filters.items() if value is not None}
+        where = " AND ".join(query.USER_LIST_FILTERS[key] for key in filters) or "TRUE"
+        user_records = await self.fetch_all(
+            compile_query(
+                query.LIST_USERS_QUERY.format(where=where), name="users.list_users"
+            ),
+            # One extra row tells whether there is a next page.
+            values={**filters, "limit": limit + 1},
+        )
+        users = [UserPublic(**record) for record in user_records[:limit]]
+        next_cursor = None
+        if len(user_records) > limit:
+            next_cursor = encode_cursor(users[-1].id)
+        return AdminUserPage(results=users, next_cursor=next_cursor)
+
+    async def set_users_active(self, *, ids: List[int], is_active: bool) -> List[int]:
+        """
+        Flip the active flag for many users in one statement. Returns the ids
+        that actually changed. This worker's caches are invalidated once the
+        change commits, other workers follow through the change listener.
+        """
+        user_records = await self.fetch_all(
+            "users.set_users_active",
+            values={"ids": list(ids), "is_active": is_active},
+        )
+        updated = [record["id"] for record in user_records]
+        if updated:
+            await after_commit(
+                lambda: forget_users(updated, deactivated=not is_active)
+            )
+        return updated
+
+    async def schedule_account_deletion(self, *, user: UserInDB) -> JobInDB:
+        """
+        Deactivate the account now and leave removing its rows to a background
+        job, which deletes them in small batches.
+        """
+        async with self.db.transaction():
+            await self.execute("users.deactivate_user", values={"id": user.id})
+            job = await self.jobs_repo.enqueue_job(
+                new_job=JobCreate(
+                    task=DELETE_ACCOUNT_TASK, payload={"user_id": user.id}
+                )
+            )
+        await after_commit(lambda: forget_users([user.id], deactivated=True))
+        return job
+
+    async def delete_inactive_user(self, *, id: int) -> bool:
+        """
+        Remove the user row, cascading to the profile and stats, unless the
+        account was reactivated in the meantime.
+        """
+        deleted = await self.fetch_val(
+            "users.delete_inactive_user", values={"id": id}
+        )
+        return deleted is not None
+
     async def populate_user(self, *, user: UserInDB) -> UserInDB:
         return UserPublic(
             **user.dict(),
             profile=await self.profiles_repo.get_profile_by_user_id(user_id=user.id)
         )
+
+
+async def forget_users(ids: List[int], *, deactivated: bool) -> None:
+    """
+    Drop this worker's cached views of the users.
+    """
+    await profile_cache.invalidate_tags(*(user_tag(id) for id in ids))
+    if deactivated:
+        for id in ids:
+            username_index.remove(id)
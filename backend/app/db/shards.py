@@ -0,0 +1,157 @@
+"""
+Owner-based sharding.
+
+Hedgehogs, and the per-owner stats derived from them, are spread over several
+Postgres databases by owner. Users, profiles and jobs stay on the primary,
+which is also shard 0. Shard databases run the same migrations with
+`alembic -x shard=true upgrade head`, which leaves out the foreign keys that
+point at users.
+
+A hedgehog's id encodes its shard: shard i of n only hands out ids with
+`id % n == i`, so detail reads go straight to the right database. The shard
+count is therefore fixed once hedgehogs exist; changing it needs a rebalance.
+Each database records the layout it was first connected with, and
+`connect_shards` refuses to go on when SHARD_DATABASE_URLS disagrees.
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, List, Sequence, TypeVar
+
+from app.core.config import SHARD_DATABASE_URLS
+from app.core.metrics import metrics
+from app.db.drivers import create_database
+from app.db.registry import compile_query
+from databases import Database
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# The recorded layout; recorded first if the database has none yet.
+CLAIM_SHARD_LAYOUT_QUERY = compile_query(
+    """
+    WITH claimed AS (
+        INSERT INTO shard_layout (shard_count, shard_index)
+        VALUES (:shard_count, :shard_index)
+        ON CONFLICT (singleton) DO NOTHING
+        RETURNING shard_count, shard_index
+    )
+    SELECT shard_count, shard_index FROM claimed
+    UNION ALL
+    SELECT shard_count, shard_index FROM shard_layout
+    LIMIT 1;
+    """,
+    name="shards.claim_shard_layout",
+)
+
+
+class ShardLayoutError(RuntimeError):
+    """
+    The configured shards don't match the layout the databases were first
+    used with. Retrying can't fix it; the configuration has to.
+    """
+
+
+class ShardsNotConnectedError(RuntimeError):
+    """
+    Shards are configured, but none were connected for the database asked for.
+    """
+
+
+class ShardRouter:
+    def __init__(self, databases: Sequence[Database]) -> None:
+        if not databases:
+            raise ValueError("A shard router needs at least one database.")
+        self.databases = list(databases)
+
+    @property
+    def primary(self) -> Database:
+        return self.databases[0]
+
+    @property
+    def count(self) -> int:
+        return len(self.databases)
+
+    def shard_for_owner(self, owner: int) -> int:
+        return owner % self.count
+
+    def for_owner(self, owner: int) -> Database:
+        return self.databases[self.shard_for_owner(owner)]
+
+    def for_hedgehog(self, id: int) -> Database:
+        return self.databases[id % self.count]
+
+    async def fan_out(self, query: Callable[[Database], Awaitable[T]]) -> List[T]:
+        """
+        Run `query` against every shard concurrently, results in shard order.
+        """
+        if self.count > 1:
+            metrics.counter("shards.fan_outs").inc()
+        return list(await asyncio.gather(*(query(db) for db in self.databases)))
+
+
+# Routers by the primary they were built around, so repositories constructed
+# with just the primary still find every shard.
+_routers: Dict[int, ShardRouter] = {}
+
+
+def get_shard_router(db: Database) -> ShardRouter:
+    """
+    The router registered for `db` by `connect_shards`. Without shards
+    configured, `db` is the only shard; with them, a missing router raises
+    rather than writing every owner's hedgehogs to the primary.
+    """
+    router = _routers.get(id(db))
+    if router is not None:
+        return router
+    if SHARD_DATABASE_URLS:
+        raise ShardsNotConnectedError(
+            "SHARD_DATABASE_URLS is set but no shards were connected for this "
+            "database; connect it through connect_shards first."
+        )
+    return ShardRouter([db])
+
+
+async def connect_shards(primary: Database, urls: Sequence[str]) -> ShardRouter:
+    shards = [create_database(url, min_size=2, max_size=5) for url in urls]
+    router = ShardRouter([primary, *shards])
+    try:
+        for shard in shards:
+            await shard.connect()
+        await check_shard_layout(router)
+    except Exception:
+        # Don't leave the pools that did connect behind; the caller retries.
+        for shard in shards:
+            if shard.is_connected:
+                await shard.disconnect()
+        raise
+    _routers[id(primary)] = router
+    if shards:
+        logger.info("Routing hedgehogs over %d shards", router.count)
+    return router
+
+
+async def check_shard_layout(router: ShardRouter) -> None:
+    """
+    Record the layout in databases that have none, and raise ShardLayoutError
+    if one was first used with another shard count or position.
+    """
+    for index, db in enumerate(router.databases):
+        recorded = await db.fetch_one(
+            query=CLAIM_SHARD_LAYOUT_QUERY,
+            values={"shard_count": router.count, "shard_index": index},
+        )
+        if (recorded["shard_count"], recorded["shard_index"]) != (router.count, index):
+            raise ShardLayoutError(
+                f"Database {index} was set up as shard {recorded['shard_index']} "
+                f"of {recorded['shard_count']}, but {router.count} shards are "
+                "configured. Hedgehog ids would collide; restore the original "
+                "SHARD_DATABASE_URLS or rebalance first."
+            )
+
+
+async def disconnect_shards(router: ShardRouter) -> None:
+    _routers.pop(id(router.primary), None)
+    for shard in router.databases[1:]:
+        await shard.disconnect()
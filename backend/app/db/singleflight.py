@@ -0,0 +1,71 @@
+"""
+Single-flight coalescing for identical concurrent reads.
+
+The first caller for a key runs the query; anyone asking for the same key while
+it is in flight awaits the same result instead of issuing another round trip.
+Nothing is remembered once the query finishes, so this is not a cache: it only
+flattens bursts of identical requests into one query per distinct key.
+
+The shared query runs in an empty context, so it belongs to none of its callers:
+it takes its own pooled connection and carries no caller's unit of work or
+deadline. Each caller instead waits at most its own `timeout`.
+"""
+
+import asyncio
+import contextvars
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from app.core.metrics import metrics
+
+
+class SingleFlight:
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._in_flight = metrics.gauge(f"{name}.in_flight")
+        self._executed = metrics.counter(f"{name}.executed")
+        self._coalesced = metrics.counter(f"{name}.coalesced")
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    async def do(
+        self,
+        key: Hashable,
+        fn: Callable[[], Awaitable[Any]],
+        *,
+        timeout: Optional[float] = None,
+    ) -> Any:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop, self._calls = loop, {}
+
+        call = self._calls.get(key)
+        if call is None:
+            call = contextvars.Context().run(loop.create_task, fn())
+            self._calls[key] = call
+            self._in_flight.set(len(self._calls))
+            self._executed.inc()
+            call.add_done_callback(lambda _: self._forget(key, call))
+        else:
+            self._coalesced.inc()
+        # Shielded so a caller that goes away (client disconnect, timeout) does
+        # not cancel the query out from under everyone else waiting on it.
+        return await asyncio.wait_for(asyncio.shield(call), timeout)
+
+    def _forget(self, key: Hashable, call: asyncio.Future) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        self._in_flight.set(len(self._calls))
+        if not call.cancelled():
+            # Mark the exception retrieved even if every waiter was cancelled.
+            call.exception()
+
+
+def freeze_values(values: Optional[Dict[str, Any]]) -> Hashable:
+    return tuple(sorted((values or {}).items()))
+
+
+single_flight = SingleFlight("db.single_flight")
@@ -1,30 +1,33 @@
 import logging
 import os
 
-from app.core.config import DATABASE_URL
-from databases import Database
+from app.core.config import DATABASE_URL, SHARD_DATABASE_URLS
+from app.db.connector import DatabaseConnector
+from databases import DatabaseURL
 from fastapi import FastAPI
 
 logger = logging.getLogger(__name__)
 
 
-async def connect_to_db(app: FastAPI) -> None:
+def get_database_url() -> DatabaseURL:
     CONTAINER_DSN = os.environ.get('CONTAINER_DSN', '')
-    DB_URL = CONTAINER_DSN if CONTAINER_DSN else DATABASE_URL
-    database = Database(DB_URL, min_size=2, max_size=5)
+    return DatabaseURL(CONTAINER_DSN) if CONTAINER_DSN else DATABASE_URL
 
-    try:
-        await database.connect()
-        app.state._db = database
-    except Exception as e:
-        logger.warn("--- DATABASE CONNECTION ERROR ---")
-        logger.warn(e)
-        logger.warn("--- DATABASE CONNECTION ERROR ---")
+
+async def connect_to_db(app: FastAPI) -> None:
+    # The database objects exist even when Postgres is down; the connector
+    # keeps retrying in the background and requests get a 503 meanwhile.
+    connector = DatabaseConnector(
+        get_database_url(), shard_urls=SHARD_DATABASE_URLS, min_size=2, max_size=5
+    )
+    app.state._db_connector = connector
+    app.state._db = connector.database
+    await connector.start()
 
 
 async def close_db_connection(app: FastAPI) -> None:
     try:
-        await app.state._db.disconnect()
+        await app.state._db_connector.stop()
     except Exception as e:
         logger.warn("--- DATABASEDISCONNECT ERROR ---")
         logger.warn(e)
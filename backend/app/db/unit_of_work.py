@@ -0,0 +1,158 @@
+"""
+Request-scoped unit of work.
+
+A `UnitOfWork` pins one pooled connection for its duration. Every query made
+inside it, from dependencies, repositories and nested `db.transaction()`
+blocks, then shares that connection instead of acquiring one per statement.
+A transactional unit also runs everything in one transaction. It commits when
+the unit exits cleanly and rolls back on an exception or after
+`set_rollback_only()`. Nested transactions become savepoints.
+
+Given a `statement_timeout`, a transactional unit sets Postgres'
+`statement_timeout` for its transaction only, right after BEGIN. A read-only
+unit sends nothing extra: the drivers pass the time left as asyncpg's
+per-query `timeout` instead (see `query_timeout`), which cancels the statement
+on the server and raises `StatementTimeoutError`.
+
+Side effects that must not be seen before the data is, like dropping this
+worker's cache entries, go through `after_commit`. Inside a transactional
+unit they run once it has committed; anywhere else they run right away.
+"""
+
+import asyncio
+import inspect
+import logging
+from contextlib import AsyncExitStack
+from contextvars import ContextVar
+from typing import Any, Callable, List, Optional
+
+from app.core.metrics import metrics
+from app.db.registry import compile_query
+from databases import Database
+
+logger = logging.getLogger(__name__)
+
+_current: ContextVar[Optional["UnitOfWork"]] = ContextVar(
+    "unit_of_work", default=None
+)
+
+# SET LOCAL, which can't take a parameter: ends with the transaction.
+SET_STATEMENT_TIMEOUT_QUERY = compile_query(
+    "SELECT set_config('statement_timeout', :timeout, true)",
+    name="unit_of_work.set_statement_timeout",
+)
+
+
+class StatementTimeoutError(Exception):
+    """
+    A query outlived its unit of work's deadline and was cancelled.
+    """
+
+
+class UnitOfWork:
+    def __init__(
+        self,
+        db: Database,
+        *,
+        transactional: bool,
+        statement_timeout: Optional[float] = None,
+    ) -> None:
+        self.db = db
+        self.transactional = transactional
+        self.statement_timeout = statement_timeout
+        self.rollback_only = False
+        self._after_commit: List[Callable[[], Any]] = []
+        self._stack = AsyncExitStack()
+        self._transaction: Any = None
+        self._deadline: Optional[float] = None
+
+    async def __aenter__(self) -> "UnitOfWork":
+        await self._stack.enter_async_context(self.db.connection())
+        try:
+            if self.transactional:
+                self._transaction = self.db.transaction()
+                await self._transaction.start()
+                if self.statement_timeout is not None:
+                    milliseconds = max(1, int(self.statement_timeout * 1000))
+                    await self.db.execute(
+                        query=SET_STATEMENT_TIMEOUT_QUERY,
+                        values={"timeout": f"{milliseconds}ms"},
+                    )
+            elif self.statement_timeout is not None:
+                loop = asyncio.get_running_loop()
+                self._deadline = loop.time() + self.statement_timeout
+        except BaseException:
+            try:
+                if self._transaction is not None:
+                    await self._transaction.rollback()
+            finally:
+                await self._stack.aclose()
+            raise
+        self._token = _current.set(self)
+        return self
+
+    async def __aexit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        _current.reset(self._token)
+        committed = False
+        try:
+            if self._transaction is not None:
+                if exc_type is None and not self.rollback_only:
+                    await self._transaction.commit()
+                    committed = True
+                    metrics.counter("db.unit_of_work.commits").inc()
+                else:
+                    await self._transaction.rollback()
+                    metrics.counter("db.unit_of_work.rollbacks").inc()
+        finally:
+            await self._stack.aclose()
+        if committed:
+            for callback in self._after_commit:
+                await run_callback(callback)
+
+    def set_rollback_only(self) -> None:
+        self.rollback_only = True
+
+
+def current_unit_of_work() -> Optional[UnitOfWork]:
+    return _current.get()
+
+
+def query_timeout() -> Optional[float]:
+    """
+    Seconds a query may still take in the current read-only unit of work, for
+    asyncpg's per-query `timeout`. None when there is no deadline to enforce
+    on the client, transactional units included.
+    """
+    unit_of_work = _current.get()
+    if unit_of_work is None or unit_of_work._deadline is None:
+        return None
+    remaining = unit_of_work._deadline - asyncio.get_running_loop().time()
+    return max(remaining, 0.001)
+
+
+def in_transaction() -> bool:
+    unit_of_work = _current.get()
+    return unit_of_work is not None and unit_of_work.transactional
+
+
+async def after_commit(callback: Callable[[], Any]) -> None:
+    """
+    Run `callback` (sync or async) once the current unit of work commits, or
+    now when there is no transaction to wait for. Dropped on rollback.
+    """
+    unit_of_work = _current.get()
+    if unit_of_work is not None and unit_of_work.transactional:
+        unit_of_work._after_commit.append(callback)
+        return
+    await run_callback(callback)
+
+
+async def run_callback(callback: Callable[[], Any]) -> None:
+    try:
+        result = callback()
+        if inspect.isawaitable(result):
+            await result
+    except Exception as e:
+        logger.warn("--- AFTER COMMIT CALLBACK ERROR ---")
+        logger.warn(e)
+        logger.warn("--- AFTER COMMIT CALLBACK ERROR ---")
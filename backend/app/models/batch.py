@@ -0,0 +1,29 @@
+from enum import Enum
+from typing import Any, Optional
+
+from app.models.core import CoreModel
+from pydantic import validator
+
+
+class BatchMethod(str, Enum):
+    get = "GET"
+    post = "POST"
+    put = "PUT"
+    delete = "DELETE"
+
+
+class BatchRequestItem(CoreModel):
+    method: BatchMethod = BatchMethod.get
+    url: str
+    body: Optional[Any]
+
+    @validator("url")
+    def url_is_a_local_path(cls, value: str) -> str:
+        if not value.startswith("/") or value.startswith("//"):
+            raise ValueError("url must be a path on this API, e.g. /api/users/me/")
+        return value
+
+
+class BatchResponseItem(CoreModel):
+    status: int
+    body: Any
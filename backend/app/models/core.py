@@ -1,6 +1,7 @@
-from typing import Optional
+from functools import lru_cache
+from typing import Optional, Tuple, Type
 from datetime import datetime, timedelta, timezone
-from pydantic import BaseModel, validator
+from pydantic import BaseModel, create_model, validator
 
 
 JST = timezone(timedelta(hours=+9), 'JST')
@@ -20,3 +21,19 @@ class DateTimeModelMixin(BaseModel):
 
 class IDModelMixin(BaseModel):
     id: int
+
+
+@lru_cache(maxsize=256)
+def prune_model(model: Type[BaseModel], fields: Tuple[str, ...]) -> Type[BaseModel]:
+    """
+    A copy of `model` with only `fields`, all optional, used to validate and
+    serialize sparse fieldsets. Cached, so each combination is built once.
+    """
+    return create_model(
+        f"{model.__name__}Fields",
+        __base__=CoreModel,
+        **{
+            name: (Optional[model.__fields__[name].outer_type_], None)
+            for name in fields
+        },
+    )
@@ -0,0 +1,21 @@
+from enum import Enum
+from typing import Optional
+
+from app.models.core import CoreModel
+from pydantic import Field
+
+
+class ChangeOperation(str, Enum):
+    insert = "I"
+    update = "U"
+    delete = "D"
+
+
+class ChangeEvent(CoreModel):
+    table: str = Field(..., alias="t")
+    op: ChangeOperation
+    id: int
+    owner: Optional[int] = Field(None, alias="o")
+
+    class Config:
+        allow_population_by_field_name = True
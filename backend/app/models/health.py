@@ -0,0 +1,40 @@
+from typing import Any, Dict, List, Optional
+
+from app.models.core import CoreModel
+
+
+class Liveness(CoreModel):
+    status: str
+
+
+class Readiness(CoreModel):
+    status: str
+    database: str
+    ping_ms: Optional[float]
+    detail: Optional[str]
+
+
+class PoolStats(CoreModel):
+    size: int
+    idle: int
+    in_use: int
+    min_size: int
+    max_size: int
+
+
+class EventLoopLag(CoreModel):
+    current_ms: float
+    p99_ms: float
+    max_ms: float
+
+
+class WorkerStats(CoreModel):
+    pid: int
+    in_flight_requests: int
+    event_loop_lag: EventLoopLag
+    database: str
+    # Primary first, then shards in shard order; None while not connected.
+    pools: List[Optional[PoolStats]]
+    caches: Dict[str, Dict[str, Any]]
+    single_flight_in_flight: int
+    autocomplete_entries: int
@@ -1,5 +1,5 @@
 from enum import Enum
-from typing import Optional, Union
+from typing import List, Optional, Union
 
 from app.models.core import CoreModel, DateTimeModelMixin, IDModelMixin
 from app.models.user import UserPublic
@@ -11,6 +11,10 @@ class ColorType(str, Enum):
     chocolate = "CHOCOLATE"
 
 
+class HedgehogExpansion(str, Enum):
+    owner = "owner"
+
+
 class HedgehogBase(CoreModel):
     name: Optional[str]
     description: Optional[str]
@@ -36,3 +40,19 @@ class HedgehogInDB(IDModelMixin, DateTimeModelMixin, HedgehogBase):
 
 class HedgehogPublic(IDModelMixin, DateTimeModelMixin, HedgehogBase):
     owner: Union[int, UserPublic]
+
+
+class HedgehogSearchResult(HedgehogPublic):
+    rank: float
+
+
+class HedgehogSearchPage(CoreModel):
+    results: List[HedgehogSearchResult]
+    next_cursor: Optional[str]
+
+
+class HedgehogCatalogPage(CoreModel):
+    results: List[HedgehogPublic]
+    next_cursor: Optional[str]
+    total: int
+    total_is_estimate: bool
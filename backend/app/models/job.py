@@ -0,0 +1,50 @@
+import json
+from datetime import datetime
+from enum import Enum
+from typing import Any, Dict, Optional
+
+from app.models.core import CoreModel, DateTimeModelMixin, IDModelMixin
+from pydantic import validator
+
+
+class JobStatus(str, Enum):
+    queued = "queued"
+    running = "running"
+    done = "done"
+    failed = "failed"
+
+
+class JobBase(CoreModel):
+    task: Optional[str]
+    payload: Dict[str, Any] = {}
+
+    @validator("payload", "progress", pre=True, check_fields=False)
+    def decode_payload(cls, value: Any) -> Any:
+        if isinstance(value, (str, bytes)):
+            return json.loads(value)
+        return value or {}
+
+
+class JobCreate(JobBase):
+    task: str
+    run_at: Optional[datetime]
+    max_attempts: Optional[int]
+
+
+class JobInDB(IDModelMixin, DateTimeModelMixin, JobBase):
+    task: str
+    progress: Dict[str, Any] = {}
+    status: JobStatus
+    attempts: int
+    max_attempts: int
+    run_at: datetime
+    locked_at: Optional[datetime]
+    last_error: Optional[str]
+
+
+class JobPublic(IDModelMixin, DateTimeModelMixin, CoreModel):
+    task: str
+    status: JobStatus
+    progress: Dict[str, Any] = {}
+    attempts: int
+    last_error: Optional[str]
@@ -1,9 +1,10 @@
-from typing import Optional
+from typing import List, Optional
 
 from app.models.core import CoreModel, DateTimeModelMixin, IDModelMixin
 from app.models.profile import ProfilePublic
 from app.models.token import AccessToken
-from pydantic import EmailStr, constr
+from app.models.user_stats import UserStats
+from pydantic import EmailStr, conlist, constr
 
 
 class UserBase(CoreModel):
@@ -38,3 +39,18 @@ class UserInDB(IDModelMixin, DateTimeModelMixin, UserBase):
 class UserPublic(IDModelMixin, DateTimeModelMixin, UserBase):
     access_token: Optional[AccessToken]
     profile: Optional[ProfilePublic]
+    stats: Optional[UserStats]
+
+
+class AdminUserPage(CoreModel):
+    results: List[UserPublic]
+    next_cursor: Optional[str]
+
+
+class UsersActivation(CoreModel):
+    user_ids: conlist(int, min_items=1, max_items=1000)
+    is_active: bool
+
+
+class UsersActivationResult(CoreModel):
+    updated: List[int]
@@ -0,0 +1,37 @@
+import json
+from typing import Any, Dict, Optional
+
+from app.models.core import CoreModel
+from pydantic import validator
+
+
+class UserStats(CoreModel):
+    hedgehog_count: int = 0
+    hedgehogs_by_color: Dict[str, int] = {}
+    average_age: Optional[float]
+
+
+class UserStatsInDB(CoreModel):
+    user_id: int
+    hedgehog_count: int
+    total_age: float
+    color_counts: Dict[str, int]
+
+    @validator("color_counts", pre=True)
+    def decode_color_counts(cls, value: Any) -> Any:
+        if isinstance(value, (str, bytes)):
+            return json.loads(value)
+        return value
+
+    def to_public(self) -> UserStats:
+        average_age = None
+        if self.hedgehog_count:
+            average_age = round(self.total_age / self.hedgehog_count, 2)
+        return UserStats(
+            hedgehog_count=self.hedgehog_count,
+            # The triggers keep colours at zero once their last hedgehog goes.
+            hedgehogs_by_color={
+                color: count for color, count in self.color_counts.items() if count
+            },
+            average_age=average_age,
+        )
@@ -1,4 +1,12 @@
 from app.services.authentication import AuthService
+from app.services.autocomplete import UsernameIndex
+from app.services.cache import create_cache
+from app.services.jobs import JobRegistry
+from app.services.mail import MailService
 
 
 auth_service = AuthService()
+job_registry = JobRegistry()
+mail_service = MailService()
+profile_cache = create_cache("profiles")
+username_index = UsernameIndex()
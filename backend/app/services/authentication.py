@@ -5,6 +5,8 @@ import bcrypt
 import jwt
 from app.core.config import (
     ACCESS_TOKEN_EXPIRE_MINUTES,
+    EMAIL_VERIFICATION_AUDIENCE,
+    EMAIL_VERIFICATION_EXPIRE_MINUTES,
     JWT_ALGORITHM,
     JWT_AUDIENCE,
     JWT_TOKEN_PREFIX,
@@ -85,3 +87,35 @@ class AuthService:
                 headers={"WWW-Authenticate": "Bearer"},
             )
         return payload.username
+
+    def create_email_verification_token_for_user(
+        self,
+        *,
+        user: Type[UserBase],
+        secret_key: str = str(SECRET_KEY),
+        expires_in: int = EMAIL_VERIFICATION_EXPIRE_MINUTES,
+    ) -> str:
+        return self.create_access_token_for_user(
+            user=user,
+            secret_key=secret_key,
+            audience=EMAIL_VERIFICATION_AUDIENCE,
+            expires_in=expires_in,
+        )
+
+    def get_creds_from_email_verification_token(
+        self, *, token: str, secret_key: str
+    ) -> JWTCreds:
+        try:
+            decoded_token = jwt.decode(
+                token,
+                str(secret_key),
+                audience=EMAIL_VERIFICATION_AUDIENCE,
+                algorithms=[JWT_ALGORITHM],
+            )
+            payload = JWTPayload(**decoded_token)
+        except (jwt.PyJWTError, ValidationError):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid or expired email verification token.",
+            )
+        return JWTCreds(sub=payload.sub, username=payload.username)
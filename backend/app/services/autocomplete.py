@@ -0,0 +1,108 @@
+"""
+Per-worker username index for autocomplete.
+
+Usernames are kept in a sorted list of `(lowercased, username)` pairs, so a
+prefix lookup is two binary searches and a slice, without a round trip to
+Postgres per keystroke. The index is built at startup and kept current from
+the change listener's `users` events.
+"""
+
+import logging
+import time
+from bisect import bisect_left, insort
+from typing import TYPE_CHECKING, Awaitable, Dict, List, Optional, Set, Tuple
+
+from app.core.config import AUTOCOMPLETE_MAX_RESULTS
+from app.core.metrics import metrics
+from app.models.event import ChangeEvent, ChangeOperation
+
+if TYPE_CHECKING:
+    from app.db.repositories.users import UsersRepository
+
+logger = logging.getLogger(__name__)
+
+
+class UsernameIndex:
+    def __init__(self, *, max_results: int = AUTOCOMPLETE_MAX_RESULTS) -> None:
+        self.max_results = max_results
+        self.ready = False
+        self._entries: List[Tuple[str, str]] = []
+        self._usernames: Dict[int, str] = {}
+        self._users_repo: Optional["UsersRepository"] = None
+        # Ids changed while a rebuild is reading the table, re-read afterwards.
+        self._changed_during_build: Optional[Set[int]] = None
+        self._lookup_time = metrics.histogram("autocomplete.lookup_seconds")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def build(self, users_repo: "UsersRepository") -> None:
+        self._users_repo = users_repo
+        self._changed_during_build = set()
+        start = time.perf_counter()
+        try:
+            users = await users_repo.list_active_usernames()
+            self._usernames = dict(users)
+            self._entries = sorted(
+                (username.lower(), username) for username in self._usernames.values()
+            )
+            changed, self._changed_during_build = self._changed_during_build, None
+            for user_id in changed:
+                await self.refresh(user_id)
+        finally:
+            self._changed_during_build = None
+        self.ready = True
+        metrics.gauge("autocomplete.entries").set(len(self._entries))
+        logger.info(
+            "Built username index with %d entries in %.3fs",
+            len(self._entries),
+            time.perf_counter() - start,
+        )
+
+    async def rebuild(self) -> None:
+        if self._users_repo is not None:
+            await self.build(self._users_repo)
+
+    def complete(self, prefix: str, *, limit: Optional[int] = None) -> List[str]:
+        start = time.perf_counter()
+        limit = min(limit or self.max_results, self.max_results)
+        key = prefix.lower()
+        first = bisect_left(self._entries, (key,))
+        # U+10FFFF sorts after any character that can follow the prefix.
+        end = bisect_left(self._entries, (key + "\U0010ffff",), first)
+        last = min(end, first + limit)
+        matches = [username for _, username in self._entries[first:last]]
+        self._lookup_time.observe(time.perf_counter() - start)
+        return matches
+
+    def add(self, user_id: int, username: str) -> None:
+        self.remove(user_id)
+        self._usernames[user_id] = username
+        insort(self._entries, (username.lower(), username))
+
+    def remove(self, user_id: int) -> None:
+        username = self._usernames.pop(user_id, None)
+        if username is None:
+            return
+        index = bisect_left(self._entries, (username.lower(), username))
+        if index < len(self._entries) and self._entries[index][1] == username:
+            del self._entries[index]
+
+    async def refresh(self, user_id: int) -> None:
+        username = await self._users_repo.get_active_username_by_id(id=user_id)
+        if username is None:
+            self.remove(user_id)
+        else:
+            self.add(user_id, username)
+
+    def apply(self, event: ChangeEvent) -> Optional[Awaitable[None]]:
+        """
+        Change listener handler for `users`. Events only carry the id, so
+        inserts and updates re-read the row to pick up the new username.
+        """
+        if self._changed_during_build is not None:
+            self._changed_during_build.add(event.id)
+        if event.op == ChangeOperation.delete:
+            self.remove(event.id)
+        elif self._users_repo is not None:
+            return self.refresh(event.id)
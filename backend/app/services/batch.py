@@ -0,0 +1,109 @@
+"""
+In-process dispatch of batched sub-requests.
+
+Each sub-request is turned into an ASGI scope and run through the application
+itself, so routing, validation, dependencies and error handling behave exactly
+as for a regular request; only the network round trip is saved.
+"""
+
+import asyncio
+import json
+import logging
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from app.core.metrics import metrics
+from app.models.batch import BatchMethod, BatchRequestItem, BatchResponseItem
+from starlette.types import ASGIApp, Message, Scope
+
+logger = logging.getLogger(__name__)
+
+# Headers from the batch request that sub-requests inherit.
+FORWARDED_HEADERS = {b"authorization", b"accept-language", b"user-agent"}
+
+
+def group_requests(
+    requests: List[BatchRequestItem],
+) -> Iterator[List[Tuple[int, BatchRequestItem]]]:
+    """
+    Split the batch into groups that may run concurrently: runs of reads are
+    grouped together, while every write forms its own group so that writes
+    happen in order and reads after a write observe it.
+    """
+    group: List[Tuple[int, BatchRequestItem]] = []
+    for index, item in enumerate(requests):
+        if item.method == BatchMethod.get:
+            group.append((index, item))
+            continue
+        if group:
+            yield group
+            group = []
+        yield [(index, item)]
+    if group:
+        yield group
+
+
+def build_scope(
+    parent: Scope, item: BatchRequestItem, *, state: Dict[str, Any]
+) -> Scope:
+    url = urlsplit(item.url)
+    headers = [
+        (name, value) for name, value in parent["headers"] if name in FORWARDED_HEADERS
+    ]
+    if item.body is not None:
+        headers.append((b"content-type", b"application/json"))
+    return {
+        "type": "http",
+        "asgi": parent.get("asgi", {"version": "3.0"}),
+        "http_version": parent.get("http_version", "1.1"),
+        "method": item.method.value,
+        "scheme": parent.get("scheme", "http"),
+        "server": parent.get("server"),
+        "client": parent.get("client"),
+        "root_path": parent.get("root_path", ""),
+        "path": url.path,
+        "raw_path": url.path.encode(),
+        "query_string": url.query.encode(),
+        "headers": headers,
+        "state": dict(state),
+    }
+
+
+async def run_subrequest(
+    app: ASGIApp, scope: Scope, body: Optional[Any]
+) -> BatchResponseItem:
+    payload = b"" if body is None else json.dumps(body).encode()
+    sent = False
+    start: Dict[str, Any] = {}
+    chunks: List[bytes] = []
+
+    async def receive() -> Message:
+        nonlocal sent
+        if not sent:
+            sent = True
+            return {"type": "http.request", "body": payload, "more_body": False}
+        # Sub-requests never disconnect on their own.
+        await asyncio.Event().wait()
+
+    async def send(message: Message) -> None:
+        if message["type"] == "http.response.start":
+            start.update(message)
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    try:
+        await app(scope, receive, send)
+    except Exception as e:
+        # The error middleware has already sent a 500 if it could.
+        logger.warning("--- BATCH SUB-REQUEST ERROR ---")
+        logger.warning(e)
+
+    status_code = start.get("status", 500)
+    headers = dict(start.get("headers", []))
+    content = b"".join(chunks)
+    if content and headers.get(b"content-type", b"").startswith(b"application/json"):
+        response_body = json.loads(content)
+    else:
+        response_body = content.decode("utf-8", errors="replace") or None
+    metrics.counter(f"batch.responses.{status_code // 100}xx").inc()
+    return BatchResponseItem(status=status_code, body=response_body)
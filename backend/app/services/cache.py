@@ -0,0 +1,416 @@
+import asyncio
+import logging
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+from urllib.parse import urlparse
+
+from app.core.config import (
+    CACHE_BACKEND,
+    CACHE_MAX_ENTRIES,
+    REDIS_TIMEOUT_SECONDS,
+    REDIS_URL,
+)
+from app.core.metrics import metrics
+from app.models.event import ChangeEvent
+
+logger = logging.getLogger(__name__)
+
+# Both backends keep a tag's invalidation marker this long. It must outlive any
+# read that could still be loading data the invalidation replaced.
+INVALIDATION_MARKER_TTL_SECONDS = 600
+
+
+def user_tag(user_id: int) -> str:
+    """
+    Tag for every cache entry derived from a user's row or their profile, so
+    a change to either can drop them all without knowing the keys.
+    """
+    return f"user:{user_id}"
+
+
+class CacheBackend(ABC):
+    # Shared backends are visible to every worker, so there is nothing to
+    # invalidate locally when another worker writes.
+    shared = False
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._hits = metrics.counter(f"cache.{name}.hits")
+        self._misses = metrics.counter(f"cache.{name}.misses")
+        self._invalidations = metrics.counter(f"cache.{name}.invalidations")
+        self._stale_writes = metrics.counter(f"cache.{name}.stale_writes")
+
+    async def get(self, key: str) -> Optional[bytes]:
+        value = await self._get(key)
+        if value is None:
+            self._misses.inc()
+        else:
+            self._hits.inc()
+        return value
+
+    async def set(
+        self,
+        key: str,
+        value: bytes,
+        *,
+        ttl: float,
+        tags: Iterable[str] = (),
+        version: Optional[int] = None,
+    ) -> bool:
+        """
+        Store `value` under `key`. Pass the `version()` read before loading
+        the value to skip the write when one of `tags` was invalidated in the
+        meantime; otherwise a slow read could cache data an update replaced.
+        Returns whether the value was stored.
+        """
+        tags = tuple(tags)
+        if version is not None and await self._invalidated_since(version, tags):
+            self._stale_writes.inc()
+            return False
+        await self._set(key, value, ttl=ttl, tags=tags)
+        if version is not None and await self._invalidated_since(version, tags):
+            # Invalidated while we were writing, possibly before the entry
+            # existed for it to drop.
+            await self.delete(key)
+            self._stale_writes.inc()
+            return False
+        return True
+
+    @abstractmethod
+    async def version(self) -> int:
+        """Counter bumped by every tag invalidation."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete(self, *keys: str) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def invalidate_tags(self, *tags: str) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def clear(self) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def _get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def _set(
+        self, key: str, value: bytes, *, ttl: float, tags: Tuple[str, ...]
+    ) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def _invalidated_since(self, version: int, tags: Tuple[str, ...]) -> bool:
+        raise NotImplementedError
+
+    def invalidate(self, event: ChangeEvent) -> Any:
+        if event.owner is not None:
+            return self.invalidate_tags(user_tag(event.owner))
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self._hits.value + self._misses.value
+        return {
+            "backend": type(self).__name__,
+            "hits": self._hits.value,
+            "misses": self._misses.value,
+            "invalidations": self._invalidations.value,
+            "stale_writes": self._stale_writes.value,
+            "hit_ratio": self._hits.value / lookups if lookups else 0.0,
+        }
+
+
+class MemoryCache(CacheBackend):
+    """
+    Per-worker LRU cache with per-entry TTL. Other workers' writes reach it
+    through the change listener.
+    """
+
+    def __init__(self, name: str, *, max_entries: int = CACHE_MAX_ENTRIES) -> None:
+        super().__init__(name)
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, bytes, Tuple[str, ...]]]" = (
+            OrderedDict()
+        )
+        self._tags: Dict[str, Set[str]] = {}
+        self._version = 0
+        # Tag -> (marker expiry, version), oldest invalidation first.
+        self._invalidated_at: "OrderedDict[str, Tuple[float, int]]" = OrderedDict()
+        self._cleared_at = 0
+
+    async def _get(self, key: str) -> Optional[bytes]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value, _ = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def _set(
+        self, key: str, value: bytes, *, ttl: float, tags: Tuple[str, ...]
+    ) -> None:
+        self._remove(key)
+        self._entries[key] = (time.monotonic() + ttl, value, tags)
+        for tag in tags:
+            self._tags.setdefault(tag, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._remove(key)
+
+    async def invalidate_tags(self, *tags: str) -> None:
+        now = time.monotonic()
+        for tag in tags:
+            self._version += 1
+            self._invalidated_at.pop(tag, None)
+            self._invalidated_at[tag] = (
+                now + INVALIDATION_MARKER_TTL_SECONDS,
+                self._version,
+            )
+            for key in self._tags.pop(tag, ()):
+                self._remove(key)
+            self._invalidations.inc()
+        self._expire_markers(now)
+
+    async def version(self) -> int:
+        return self._version
+
+    async def _invalidated_since(self, version: int, tags: Tuple[str, ...]) -> bool:
+        if self._cleared_at > version:
+            return True
+        now = time.monotonic()
+        for tag in tags:
+            marker = self._invalidated_at.get(tag)
+            if marker is not None and marker[0] > now and marker[1] > version:
+                return True
+        return False
+
+    async def clear(self) -> None:
+        # Invalidations may have been missed (see ChangeListener.flush), so
+        # reads that started before this are stale whatever their tags.
+        self._version += 1
+        self._cleared_at = self._version
+        self._entries.clear()
+        self._tags.clear()
+        self._invalidated_at.clear()
+
+    def _expire_markers(self, now: float) -> None:
+        while self._invalidated_at:
+            tag, (expires_at, _) = next(iter(self._invalidated_at.items()))
+            if expires_at > now:
+                return
+            del self._invalidated_at[tag]
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._tags.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[tag]
+
+    def stats(self) -> Dict[str, Any]:
+        return {**super().stats(), "entries": len(self._entries)}
+
+
+class RedisError(Exception):
+    pass
+
+
+class RedisCache(CacheBackend):
+    """
+    Cache kept in Redis (or anything speaking RESP). Talks the protocol
+    directly over a single connection; a failing server degrades to cache
+    misses instead of failing requests.
+    """
+
+    shared = True
+
+    def __init__(
+        self,
+        name: str,
+        *,
+        url: str = REDIS_URL,
+        timeout: float = REDIS_TIMEOUT_SECONDS,
+    ) -> None:
+        super().__init__(name)
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.database = int(parsed.path.lstrip("/") or 0)
+        self.timeout = timeout
+        self.prefix = f"{name}:"
+        self._errors = metrics.counter(f"cache.{name}.errors")
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+
+    async def _get(self, key: str) -> Optional[bytes]:
+        return await self._safe_command("GET", self.prefix + key)
+
+    async def _set(
+        self, key: str, value: bytes, *, ttl: float, tags: Tuple[str, ...]
+    ) -> None:
+        ttl_ms = str(int(ttl * 1000))
+        await self._safe_command("SET", self.prefix + key, value, "PX", ttl_ms)
+        for tag in tags:
+            await self._safe_command("SADD", self._tag_key(tag), self.prefix + key)
+            await self._safe_command("PEXPIRE", self._tag_key(tag), ttl_ms)
+
+    async def delete(self, *keys: str) -> None:
+        if keys:
+            await self._safe_command("DEL", *(self.prefix + key for key in keys))
+
+    async def invalidate_tags(self, *tags: str) -> None:
+        marker_ttl_ms = str(INVALIDATION_MARKER_TTL_SECONDS * 1000)
+        for tag in tags:
+            # The marker goes first: a concurrent `set` either sees it or
+            # wrote its entry before the members below are dropped.
+            version = await self._safe_command("INCR", self._version_key)
+            if version is not None:
+                await self._safe_command(
+                    "SET", self._marker_key(tag), version, "PX", marker_ttl_ms
+                )
+            keys = await self._safe_command("SMEMBERS", self._tag_key(tag)) or []
+            await self._safe_command("DEL", self._tag_key(tag), *keys)
+            self._invalidations.inc()
+
+    async def version(self) -> int:
+        return int(await self._safe_command("GET", self._version_key) or 0)
+
+    async def _invalidated_since(self, version: int, tags: Tuple[str, ...]) -> bool:
+        if not tags:
+            return False
+        markers = await self._safe_command(
+            "MGET", *(self._marker_key(tag) for tag in tags)
+        )
+        if markers is None:
+            # Can't tell; not caching is the safe answer.
+            return True
+        return any(int(marker or 0) > version for marker in markers)
+
+    async def clear(self) -> None:
+        cursor = b"0"
+        while True:
+            reply = await self._safe_command(
+                "SCAN", cursor, "MATCH", f"{self.prefix}*", "COUNT", "500"
+            )
+            if not reply:
+                return
+            cursor, keys = reply
+            if keys:
+                await self._safe_command("DEL", *keys)
+            if cursor == b"0":
+                return
+
+    def _tag_key(self, tag: str) -> str:
+        return f"{self.prefix}tag:{tag}"
+
+    def _marker_key(self, tag: str) -> str:
+        return f"{self.prefix}invalidated:{tag}"
+
+    @property
+    def _version_key(self) -> str:
+        return f"{self.prefix}version"
+
+    async def _safe_command(self, *args: Any) -> Any:
+        try:
+            return await self.command(*args)
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError) as e:
+            self._errors.inc()
+            logger.warning("--- CACHE CONNECTION ERROR ---")
+            logger.warning(e)
+        except RedisError as e:
+            self._errors.inc()
+            logger.warning(e)
+        return None
+
+    async def command(self, *args: Any) -> Any:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop, self._lock = loop, asyncio.Lock()
+            self._reader = self._writer = None
+        async with self._lock:
+            try:
+                if self._writer is None:
+                    await self._connect()
+                return await asyncio.wait_for(self._execute(*args), self.timeout)
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError):
+                self._disconnect()
+                raise
+
+    async def _connect(self) -> None:
+        self._reader, self._writer = await asyncio.wait_for(
+            asyncio.open_connection(self.host, self.port), self.timeout
+        )
+        if self.password:
+            await self._execute("AUTH", self.password)
+        if self.database:
+            await self._execute("SELECT", str(self.database))
+
+    def _disconnect(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        self._reader = self._writer = None
+
+    async def _execute(self, *args: Any) -> Any:
+        self._writer.write(encode_command(*args))
+        await self._writer.drain()
+        return await read_reply(self._reader)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**super().stats(), "errors": self._errors.value}
+
+
+def encode_command(*args: Any) -> bytes:
+    parts = [f"*{len(args)}\r\n".encode()]
+    for arg in args:
+        if not isinstance(arg, bytes):
+            arg = str(arg).encode()
+        parts.append(b"$%d\r\n%s\r\n" % (len(arg), arg))
+    return b"".join(parts)
+
+
+async def read_reply(reader: asyncio.StreamReader) -> Any:
+    line = (await reader.readuntil(b"\r\n"))[:-2]
+    kind, rest = line[:1], line[1:]
+    if kind == b"+":
+        return rest.decode()
+    if kind == b"-":
+        raise RedisError(rest.decode())
+    if kind == b":":
+        return int(rest)
+    if kind == b"$":
+        length = int(rest)
+        if length == -1:
+            return None
+        return (await reader.readexactly(length + 2))[:-2]
+    if kind == b"*":
+        length = int(rest)
+        if length == -1:
+            return None
+        return [await read_reply(reader) for _ in range(length)]
+    raise RedisError(f"Unexpected reply {line!r}")
+
+
+def create_cache(name: str, backend: str = CACHE_BACKEND) -> CacheBackend:
+    if backend == "redis":
+        return RedisCache(name)
+    if backend == "memory":
+        return MemoryCache(name)
+    raise ValueError(f"Unknown cache backend {backend!r}.")
@@ -0,0 +1,101 @@
+"""
+Handlers run by the background worker. Importing this module registers them
+on `job_registry`.
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+
+from app.core.config import (
+    ACCOUNT_DELETION_BATCH_PAUSE_SECONDS,
+    ACCOUNT_DELETION_BATCH_SIZE,
+    EMAIL_VERIFICATION_URL,
+    HEDGEHOG_ARCHIVE_AFTER_DAYS,
+    HEDGEHOG_ARCHIVE_BATCH_SIZE,
+    HEDGEHOG_ARCHIVE_INTERVAL_SECONDS,
+    PROJECT_NAME,
+)
+from app.db.repositories.hedgehogs import HedgehogsRepository
+from app.db.repositories.jobs import JobsRepository
+from app.db.repositories.user_stats import UserStatsRepository
+from app.db.repositories.users import UsersRepository
+from app.models.job import JobInDB
+from app.models.user import UserBase
+from app.services import auth_service, job_registry, mail_service
+from app.services.jobs import (
+    ARCHIVE_DELETED_HEDGEHOGS_TASK,
+    DELETE_ACCOUNT_TASK,
+    SEND_VERIFICATION_EMAIL_TASK,
+)
+from databases import Database
+
+logger = logging.getLogger(__name__)
+
+
+@job_registry.task(SEND_VERIFICATION_EMAIL_TASK)
+async def send_verification_email(*, db: Database, job: JobInDB) -> None:
+    user = UserBase(email=job.payload["email"], username=job.payload["username"])
+    token = auth_service.create_email_verification_token_for_user(user=user)
+    message = mail_service.build_message(
+        to=user.email,
+        subject=f"Verify your {PROJECT_NAME} email address",
+        body=(
+            f"Hi {user.username},\n\n"
+            "Please confirm your email address by opening the link below:\n\n"
+            f"{EMAIL_VERIFICATION_URL.format(token=token)}\n"
+        ),
+    )
+    await mail_service.send(message)
+
+
+@job_registry.task(DELETE_ACCOUNT_TASK)
+async def delete_account(*, db: Database, job: JobInDB) -> None:
+    """
+    Each batch is its own short statement, so locks are held briefly and
+    regular traffic interleaves with the deletion. Safe to resume on retry.
+    """
+    users_repo = UsersRepository(db)
+    hedgehogs_repo = HedgehogsRepository(db)
+    jobs_repo = JobsRepository(db)
+    user_id = job.payload["user_id"]
+    deleted = job.progress.get("hedgehogs_deleted", 0)
+
+    # Batches come back empty as soon as the account is reactivated.
+    while True:
+        count = await hedgehogs_repo.delete_inactive_owner_hedgehogs_batch(
+            owner=user_id, limit=ACCOUNT_DELETION_BATCH_SIZE
+        )
+        if not count:
+            break
+        deleted += count
+        await jobs_repo.update_job_progress(
+            job=job, progress={"hedgehogs_deleted": deleted}
+        )
+        await asyncio.sleep(ACCOUNT_DELETION_BATCH_PAUSE_SECONDS)
+
+    user_deleted = await users_repo.delete_inactive_user(id=user_id)
+    if user_deleted:
+        # Only cascades on the primary, the owner's shard may be another one.
+        await UserStatsRepository(db).delete_user_stats(user_id=user_id)
+    await jobs_repo.update_job_progress(
+        job=job, progress={"hedgehogs_deleted": deleted, "user_deleted": user_deleted}
+    )
+    if not user_deleted:
+        logger.warning("Account %s was not deleted, it is active again", user_id)
+
+
+@job_registry.task(
+    ARCHIVE_DELETED_HEDGEHOGS_TASK, every=HEDGEHOG_ARCHIVE_INTERVAL_SECONDS
+)
+async def archive_deleted_hedgehogs(*, db: Database, job: JobInDB) -> None:
+    deleted_before = datetime.now(timezone.utc) - timedelta(
+        days=HEDGEHOG_ARCHIVE_AFTER_DAYS
+    )
+    archived = await HedgehogsRepository(db).archive_deleted_hedgehogs(
+        deleted_before=deleted_before, batch_size=HEDGEHOG_ARCHIVE_BATCH_SIZE
+    )
+    await JobsRepository(db).update_job_progress(
+        job=job, progress={"archived": archived}
+    )
+    logger.info("Archived %s hedgehogs deleted before %s", archived, deleted_before)
@@ -0,0 +1,59 @@
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from app.core.config import JOB_RETRY_BACKOFF_MAX_SECONDS, JOB_RETRY_BACKOFF_SECONDS
+
+JobHandler = Callable[..., Awaitable[None]]
+
+SEND_VERIFICATION_EMAIL_TASK = "users:send-verification-email"
+DELETE_ACCOUNT_TASK = "users:delete-account"
+ARCHIVE_DELETED_HEDGEHOGS_TASK = "hedgehogs:archive-deleted"
+
+
+class JobRegistry:
+    """
+    Maps task names to coroutine handlers. A handler is called as
+    `await handler(db=db, job=job)` and signals failure by raising.
+
+    Tasks registered with `every=<seconds>` are periodic: workers schedule a
+    first run on start and the next one whenever a run finishes.
+    """
+
+    def __init__(self) -> None:
+        self._handlers: Dict[str, JobHandler] = {}
+        self._intervals: Dict[str, float] = {}
+
+    def task(
+        self, name: str, *, every: Optional[float] = None
+    ) -> Callable[[JobHandler], JobHandler]:
+        def register(handler: JobHandler) -> JobHandler:
+            if name in self._handlers:
+                raise ValueError(f"Job task {name!r} is already registered.")
+            self._handlers[name] = handler
+            if every is not None:
+                self._intervals[name] = every
+            return handler
+
+        return register
+
+    def get(self, name: str) -> Optional[JobHandler]:
+        return self._handlers.get(name)
+
+    def interval(self, name: str) -> Optional[float]:
+        return self._intervals.get(name)
+
+    @property
+    def tasks(self) -> List[str]:
+        return sorted(self._handlers)
+
+    @property
+    def periodic_tasks(self) -> Dict[str, float]:
+        return dict(self._intervals)
+
+
+def get_retry_delay(
+    attempts: int,
+    *,
+    base: float = JOB_RETRY_BACKOFF_SECONDS,
+    cap: float = JOB_RETRY_BACKOFF_MAX_SECONDS,
+) -> float:
+    return min(cap, base * 2 ** max(attempts - 1, 0))
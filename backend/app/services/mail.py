@@ -0,0 +1,284 @@
+import asyncio
+import logging
+import queue
+import smtplib
+import time
+from email.message import EmailMessage
+from typing import List, Optional, Set, Tuple
+
+from app.core.config import (
+    MAIL_BATCH_SIZE,
+    MAIL_BATCH_WAIT_SECONDS,
+    MAIL_FROM,
+    MAIL_SMTP_POOL_SIZE,
+    SMTP_HOST,
+    SMTP_PASSWORD,
+    SMTP_PORT,
+    SMTP_TIMEOUT_SECONDS,
+    SMTP_USE_TLS,
+    SMTP_USERNAME,
+)
+from app.core.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Errors that only concern a single message; the SMTP session stays usable.
+MESSAGE_ERRORS = (
+    smtplib.SMTPRecipientsRefused,
+    smtplib.SMTPSenderRefused,
+    smtplib.SMTPDataError,
+)
+
+# Queued by `close` so the batcher delivers what is left and then stops.
+_CLOSE = object()
+
+
+class MailServiceClosed(RuntimeError):
+    pass
+
+
+class SMTPConnectionPool:
+    """
+    Blocking pool of open SMTP sessions. It is only touched from executor
+    threads; MailService bounds how many of them run at once.
+    """
+
+    def __init__(
+        self,
+        *,
+        host: str,
+        port: int,
+        username: str,
+        password: str,
+        use_tls: bool,
+        timeout: float,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.timeout = timeout
+        self._idle: "queue.LifoQueue[smtplib.SMTP]" = queue.LifoQueue()
+
+    def _connect(self) -> smtplib.SMTP:
+        connection = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.use_tls:
+            connection.starttls()
+        if self.username:
+            connection.login(self.username, self.password)
+        metrics.counter("mail.smtp_connections_opened").inc()
+        return connection
+
+    def acquire(self) -> smtplib.SMTP:
+        try:
+            connection = self._idle.get_nowait()
+        except queue.Empty:
+            return self._connect()
+        try:
+            if connection.noop()[0] == 250:
+                return connection
+        except (smtplib.SMTPException, OSError):
+            pass
+        self.discard(connection)
+        return self._connect()
+
+    def release(self, connection: smtplib.SMTP) -> None:
+        self._idle.put(connection)
+
+    def discard(self, connection: smtplib.SMTP) -> None:
+        try:
+            connection.close()
+        except OSError:
+            pass
+
+    def close(self) -> None:
+        while True:
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                connection.quit()
+            except (smtplib.SMTPException, OSError):
+                self.discard(connection)
+
+
+class MailService:
+    """
+    Queues outgoing messages and delivers them in batches. Messages sent
+    concurrently are grouped for up to `batch_wait` seconds (or `batch_size`
+    messages) and written over one pooled SMTP session instead of opening a
+    connection per message. `send` resolves once the message was accepted by
+    the server and raises if it was refused.
+    """
+
+    def __init__(
+        self,
+        *,
+        host: str = SMTP_HOST,
+        port: int = SMTP_PORT,
+        username: str = SMTP_USERNAME,
+        password: str = str(SMTP_PASSWORD),
+        use_tls: bool = SMTP_USE_TLS,
+        timeout: float = SMTP_TIMEOUT_SECONDS,
+        sender: str = MAIL_FROM,
+        batch_size: int = MAIL_BATCH_SIZE,
+        batch_wait: float = MAIL_BATCH_WAIT_SECONDS,
+        pool_size: int = MAIL_SMTP_POOL_SIZE,
+    ) -> None:
+        self.sender = sender
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait
+        self.pool_size = pool_size
+        self.pool = SMTPConnectionPool(
+            host=host,
+            port=port,
+            username=username,
+            password=password,
+            use_tls=use_tls,
+            timeout=timeout,
+        )
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._batcher: Optional[asyncio.Task] = None
+        self._deliveries: Set[asyncio.Task] = set()
+        self._closed = False
+
+    def build_message(self, *, to: str, subject: str, body: str) -> EmailMessage:
+        message = EmailMessage()
+        message["From"] = self.sender
+        message["To"] = to
+        message["Subject"] = subject
+        message.set_content(body)
+        return message
+
+    async def send(self, message: EmailMessage) -> None:
+        if self._closed:
+            raise MailServiceClosed("The mail service is shutting down.")
+        self._ensure_started()
+        future = self._loop.create_future()
+        await self._queue.put((message, future))
+        await future
+
+    async def close(self) -> None:
+        """
+        Stop accepting messages, deliver everything already queued, then close
+        the pooled sessions. Senders still waiting when it returns are failed
+        rather than left hanging.
+        """
+        self._closed = True
+        if self._batcher is not None and not self._batcher.done():
+            self._queue.put_nowait(_CLOSE)
+            await asyncio.gather(self._batcher, return_exceptions=True)
+        self._batcher = None
+        if self._deliveries:
+            await asyncio.gather(*self._deliveries, return_exceptions=True)
+        self._fail_queued(MailServiceClosed("The mail service was closed."))
+        await asyncio.get_running_loop().run_in_executor(None, self.pool.close)
+
+    def _fail_queued(self, error: Exception) -> None:
+        while self._queue is not None and not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not _CLOSE and not item[1].done():
+                item[1].set_exception(error)
+
+    def _ensure_started(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._slots = asyncio.Semaphore(self.pool_size)
+            self._batcher = None
+        if self._batcher is None or self._batcher.done():
+            self._batcher = loop.create_task(self._batch_loop())
+
+    async def _collect_batch(
+        self,
+    ) -> Tuple[List[Tuple[EmailMessage, asyncio.Future]], bool]:
+        """
+        Wait for a message, then gather more for up to `batch_wait` seconds.
+        The flag is set once `close` was requested; the batch then holds the
+        last queued messages, which are delivered before the loop stops.
+        """
+        item = await self._queue.get()
+        if item is _CLOSE:
+            return [], True
+        batch = [item]
+        deadline = self._loop.time() + self.batch_wait
+        while len(batch) < self.batch_size:
+            if not self._queue.empty():
+                item = self._queue.get_nowait()
+            else:
+                timeout = deadline - self._loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+            if item is _CLOSE:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    async def _batch_loop(self) -> None:
+        closing = False
+        while not closing:
+            batch, closing = await self._collect_batch()
+            if not batch:
+                continue
+            await self._slots.acquire()
+            delivery = self._loop.create_task(self._deliver(batch))
+            self._deliveries.add(delivery)
+            delivery.add_done_callback(self._deliveries.discard)
+
+    async def _deliver(self, batch: List[Tuple[EmailMessage, asyncio.Future]]) -> None:
+        try:
+            start = time.perf_counter()
+            results = await self._loop.run_in_executor(
+                None, self._send_batch, [message for message, _ in batch]
+            )
+            elapsed = time.perf_counter() - start
+        except Exception as e:
+            logger.warning("--- SMTP DELIVERY ERROR ---")
+            logger.warning(e)
+            results, elapsed = [e] * len(batch), 0.0
+        finally:
+            self._slots.release()
+
+        sent = 0
+        for (_, future), error in zip(batch, results):
+            if error is None:
+                sent += 1
+            if future.done():
+                continue
+            if error is None:
+                future.set_result(None)
+            else:
+                future.set_exception(error)
+
+        metrics.counter("mail.sent").inc(sent)
+        metrics.counter("mail.failed").inc(len(batch) - sent)
+        metrics.histogram("mail.batch_size").observe(len(batch))
+        if elapsed:
+            metrics.histogram("mail.batch_seconds").observe(elapsed)
+            metrics.gauge("mail.messages_per_second").set(sent / elapsed)
+
+    def _send_batch(self, messages: List[EmailMessage]) -> List[Optional[Exception]]:
+        connection = self.pool.acquire()
+        results: List[Optional[Exception]] = []
+        for index, message in enumerate(messages):
+            try:
+                connection.send_message(message)
+            except MESSAGE_ERRORS as e:
+                results.append(e)
+                continue
+            except (smtplib.SMTPException, OSError) as e:
+                # The session is gone; only the unsent rest of the batch fails.
+                self.pool.discard(connection)
+                return results + [e] * (len(messages) - index)
+            results.append(None)
+        self.pool.release(connection)
+        return results
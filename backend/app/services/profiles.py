@@ -0,0 +1,44 @@
+"""
+Cached profile responses.
+
+The profiles route and start-up warm-up both fill `profile_cache` with the
+JSON body of a profile, keyed by username (and requested fields) and tagged
+with its user so that updates can drop every variant.
+"""
+
+from typing import Optional, Tuple
+
+from app.core.config import PROFILE_CACHE_TTL_SECONDS
+from app.models.profile import ProfileInDB, ProfilePublic
+from app.services import profile_cache
+from app.services.cache import user_tag
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+
+
+def profile_cache_key(username: str, fields: Optional[Tuple[str, ...]] = None) -> str:
+    cache_key = f"username:{username}"
+    if fields:
+        cache_key += f":fields:{','.join(fields)}"
+    return cache_key
+
+
+def profile_response(profile: ProfileInDB) -> JSONResponse:
+    return JSONResponse(content=jsonable_encoder(ProfilePublic(**profile.dict())))
+
+
+async def cache_profile_response(
+    cache_key: str, profile: ProfileInDB, response: Response, *, version: int
+) -> None:
+    """
+    Cache a profile response. `version` is the profile cache's version read
+    before the profile was; the response is dropped if the user's entries
+    were invalidated since.
+    """
+    await profile_cache.set(
+        cache_key,
+        response.body,
+        ttl=PROFILE_CACHE_TTL_SECONDS,
+        tags=[user_tag(profile.user_id)],
+        version=version,
+    )
@@ -0,0 +1,112 @@
+import asyncio
+import json
+from collections import defaultdict
+from typing import DefaultDict, Iterable, Optional, Set
+
+from app.core.config import STREAM_MAX_SUBSCRIBERS, STREAM_SUBSCRIBER_BUFFER_SIZE
+from app.core.metrics import metrics
+from app.db.events import ChangeListener
+from app.models.event import ChangeEvent
+
+# Pushed in place of events a subscriber could not keep up with (or that the
+# listener may have missed); clients should refetch their state.
+RESYNC = None
+
+
+class StreamLimitExceeded(Exception):
+    pass
+
+
+class Subscription:
+    def __init__(self, owner: int, *, buffer_size: int) -> None:
+        self.owner = owner
+        self.dropped = 0
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=buffer_size)
+
+    def push(self, event: Optional[ChangeEvent]) -> None:
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Never block the dispatcher on a slow client: drop its backlog
+            # and leave a single resync marker instead.
+            dropped = self._queue.qsize()
+            while not self._queue.empty():
+                self._queue.get_nowait()
+            self._queue.put_nowait(RESYNC)
+            self.dropped += dropped
+            metrics.counter("streams.overflows").inc()
+            metrics.counter("streams.events_dropped").inc(dropped)
+
+    async def get(self) -> Optional[ChangeEvent]:
+        return await self._queue.get()
+
+
+class ChangeBroadcaster:
+    """
+    Fans change events from the worker's single ChangeListener out to the
+    streams of the users owning the changed rows.
+    """
+
+    def __init__(
+        self,
+        tables: Iterable[str] = ("hedgehogs",),
+        *,
+        buffer_size: int = STREAM_SUBSCRIBER_BUFFER_SIZE,
+        max_subscribers: int = STREAM_MAX_SUBSCRIBERS,
+    ) -> None:
+        self.tables = tuple(tables)
+        self.buffer_size = buffer_size
+        self.max_subscribers = max_subscribers
+        self.subscriber_count = 0
+        self._subscriptions: DefaultDict[int, Set[Subscription]] = defaultdict(set)
+        self._listener: Optional[ChangeListener] = None
+
+    def attach(self, listener: ChangeListener) -> None:
+        if self._listener is listener:
+            return
+        for table in self.tables:
+            listener.subscribe(table, self.publish)
+        listener.on_flush(self.resync_all)
+        self._listener = listener
+
+    def subscribe(self, *, owner: int) -> Subscription:
+        if self.subscriber_count >= self.max_subscribers:
+            raise StreamLimitExceeded("Too many open change streams.")
+        subscription = Subscription(owner, buffer_size=self.buffer_size)
+        self._subscriptions[owner].add(subscription)
+        self.subscriber_count += 1
+        metrics.gauge("streams.subscribers").set(self.subscriber_count)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscriptions = self._subscriptions.get(subscription.owner)
+        if not subscriptions or subscription not in subscriptions:
+            return
+        subscriptions.discard(subscription)
+        if not subscriptions:
+            del self._subscriptions[subscription.owner]
+        self.subscriber_count -= 1
+        metrics.gauge("streams.subscribers").set(self.subscriber_count)
+
+    def publish(self, event: ChangeEvent) -> None:
+        subscriptions = self._subscriptions.get(event.owner)
+        if not subscriptions:
+            return
+        for subscription in subscriptions:
+            subscription.push(event)
+        metrics.counter("streams.events_published").inc(len(subscriptions))
+
+    def resync_all(self) -> None:
+        for subscriptions in self._subscriptions.values():
+            for subscription in subscriptions:
+                subscription.push(RESYNC)
+
+
+def format_sse(event: Optional[ChangeEvent]) -> str:
+    if event is RESYNC:
+        return "event: resync\ndata: {}\n\n"
+    data = json.dumps({"op": event.op.value, "id": event.id})
+    return f"event: {event.table}\ndata: {data}\n\n"
+
+
+change_broadcaster = ChangeBroadcaster()
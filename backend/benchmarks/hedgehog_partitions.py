@@ -0,0 +1,143 @@
+"""
+Benchmark owner listings and detail reads on a large hedgehogs table.
+
+Seeds `--rows` hedgehogs (ten million by default) spread over `--owners` users
+inside a transaction, times the list and detail queries for random owners and
+ids, prints both plans and rolls everything back. Run it once before and once
+after the partitioning migration to compare:
+
+    alembic upgrade f1c6a3d8b925
+    python -m benchmarks.hedgehog_partitions --rows 10000000
+    alembic upgrade a84e2b7c6f13
+    python -m benchmarks.hedgehog_partitions --rows 10000000
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+import asyncpg
+from app.db.repositories.queries.hedgehogs import (
+    GET_HEDGEHOG_BY_ID_QUERY,
+    LIST_ALL_USER_HEDGEHOGS_QUERY,
+)
+from app.db.tasks import get_database_url
+
+from benchmarks.search_hedgehogs import report, timed
+
+SEED_USERS_QUERY = """
+    INSERT INTO users (username, email, salt, password)
+    SELECT 'partition_benchmark_' || i, 'partition_benchmark_' || i || '@example.com',
+           '', ''
+    FROM generate_series(1, $1) AS i
+    RETURNING id;
+"""
+
+SEED_HEDGEHOGS_QUERY = """
+    INSERT INTO hedgehogs (name, description, age, color_type, owner)
+    SELECT 'Bramble ' || i, 'curls up when startled', (i % 60) / 10.0,
+           (ARRAY['SOLT & PEPPER', 'DARK GREY', 'CHOCOLATE'])[1 + i % 3],
+           ($1::integer[])[1 + i % array_length($1::integer[], 1)]
+    FROM generate_series(1, $2) AS i;
+"""
+
+# Seeded ids are the range of values the sequence handed out while seeding.
+LAST_HEDGEHOG_ID_QUERY = """
+    SELECT last_value FROM hedgehogs_id_seq;
+"""
+
+# The owner lookup is maintained by a trigger, which the seeding skips.
+SEED_HEDGEHOG_OWNERS_QUERY = """
+    INSERT INTO hedgehog_owners (id, owner)
+    SELECT id, owner
+    FROM hedgehogs
+    WHERE owner = ANY($1::integer[]);
+"""
+
+# What detail reads looked like before partitioning, for the baseline run.
+UNPARTITIONED_DETAIL_QUERY = """
+    SELECT id, name, description, age, color_type, owner, created_at, updated_at
+    FROM hedgehogs
+    WHERE id = :id
+      AND deleted_at IS NULL;
+"""
+
+IS_PARTITIONED_QUERY = """
+    SELECT relkind = 'p'
+    FROM pg_class
+    WHERE oid = 'hedgehogs'::regclass;
+"""
+
+
+def to_positional(query: str) -> str:
+    return query.replace(":owner", "$1").replace(":id", "$1")
+
+
+async def print_plan(connection: asyncpg.Connection, query: str, *args) -> None:
+    plan = await connection.fetch(f"EXPLAIN (ANALYZE, BUFFERS) {query}", *args)
+    for line in plan:
+        print("   ", line[0])
+
+
+async def run(rows: int, owners: int, repeat: int) -> None:
+    connection = await asyncpg.connect(str(get_database_url()))
+    transaction = connection.transaction()
+    await transaction.start()
+    try:
+        partitioned = await connection.fetchval(IS_PARTITIONED_QUERY)
+        print(f"hedgehogs is {'' if partitioned else 'not '}partitioned")
+
+        # Skips the NOTIFY and stats triggers, which would dominate the seeding
+        # time. Needs a superuser.
+        await connection.execute("SET LOCAL session_replication_role = replica")
+        start = time.perf_counter()
+        owner_ids = [
+            row["id"] for row in await connection.fetch(SEED_USERS_QUERY, owners)
+        ]
+        first_id = await connection.fetchval(LAST_HEDGEHOG_ID_QUERY) + 1
+        await connection.execute(SEED_HEDGEHOGS_QUERY, owner_ids, rows)
+        last_id = await connection.fetchval(LAST_HEDGEHOG_ID_QUERY)
+        if partitioned:
+            await connection.execute(SEED_HEDGEHOG_OWNERS_QUERY, owner_ids)
+            await connection.execute("ANALYZE hedgehog_owners")
+        await connection.execute("ANALYZE hedgehogs")
+        print(f"seeded {rows} rows in {time.perf_counter() - start:.1f} s\n")
+
+        list_query = to_positional(LIST_ALL_USER_HEDGEHOGS_QUERY)
+        detail_query = to_positional(
+            GET_HEDGEHOG_BY_ID_QUERY if partitioned else UNPARTITIONED_DETAIL_QUERY
+        )
+        list_timings, detail_timings = [], []
+        for _ in range(repeat):
+            list_timings += await timed(
+                connection, 1, list_query, random.choice(owner_ids)
+            )
+            detail_timings += await timed(
+                connection, 1, detail_query, random.randint(first_id, last_id)
+            )
+        report(f"list ({rows // owners} per owner)", list_timings)
+        report("detail by id", detail_timings)
+
+        print("\nplan for an owner listing:")
+        await print_plan(connection, list_query, owner_ids[0])
+        print("\nplan for a detail read:")
+        await print_plan(connection, detail_query, last_id)
+    finally:
+        await transaction.rollback()
+        await connection.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmark hedgehog list and detail reads."
+    )
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--owners", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(run(args.rows, args.owners, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Micro-benchmark query preparation for the hottest repository queries.
+
+Times what happens in Python before a query reaches asyncpg: the `databases`
+wrapper's `text()` + bindparams + dialect compile on every call, next to
+binding values to the registry's precompiled statement. No database needed.
+
+    python -m benchmarks.query_compilation --repeat 20000
+"""
+
+import argparse
+import time
+from typing import Any, Callable, Dict
+
+from app.db.registry import query_registry
+from app.db.repositories.queries import hedgehogs, profiles, users
+from databases.backends.postgres import PostgresBackend, PostgresConnection
+from databases.core import Connection
+
+# Queries on the request path of most endpoints, with typical values.
+HOT_QUERIES: Dict[str, Dict[str, Any]] = {
+    "users.get_user_by_username": {"username": "hedgehog_fan"},
+    "users.get_user_by_email": {"email": "hedgehog_fan@example.com"},
+    "profiles.get_profile_by_user_id": {"user_id": 42},
+    "profiles.get_profile_by_username": {"username": "hedgehog_fan"},
+    "hedgehogs.get_hedgehog_by_id": {"id": 1234},
+    "hedgehogs.list_all_user_hedgehogs": {"owner": 42},
+    "hedgehogs.create_hedgehog": {
+        "name": "Bramble",
+        "description": "curls up when startled",
+        "age": 2.5,
+        "color_type": "DARK GREY",
+        "owner": 42,
+        "shard_count": 1,
+        "shard_index": 0,
+    },
+    "hedgehogs.update_hedgehog_by_id": {
+        "id": 1234,
+        "name": "Bramble",
+        "description": "curls up when startled",
+        "age": 2.5,
+        "color_type": "DARK GREY",
+        "owner": 42,
+    },
+}
+
+MODULES = {"hedgehogs": hedgehogs, "profiles": profiles, "users": users}
+
+
+def query_text(name: str) -> str:
+    module, constant = name.split(".")
+    return getattr(MODULES[module], f"{constant.upper()}_QUERY")
+
+
+def per_call_us(fn: Callable[[], Any], repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1_000_000
+
+
+def run(repeat: int) -> None:
+    backend = PostgresBackend("postgresql://localhost/benchmark")
+    connection = PostgresConnection(backend, backend._dialect)
+
+    print(f"{'query':<38} {'databases':>12} {'registry':>12} {'speedup':>9}")
+    for name, values in HOT_QUERIES.items():
+        text, compiled = query_text(name), query_registry[name]
+        wrapper = per_call_us(
+            lambda: connection._compile(Connection._build_query(text, values)),
+            repeat,
+        )
+        registry = per_call_us(
+            lambda: (query_registry.resolve(name).sql, compiled.bind(values)),
+            repeat,
+        )
+        print(
+            f"{name:<38} {wrapper:>9.2f} us {registry:>9.2f} us "
+            f"{wrapper / registry:>8.1f}x"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Benchmark per-call query compilation against the registry."
+    )
+    parser.add_argument("--repeat", type=int, default=20_000)
+    args = parser.parse_args()
+    run(args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Benchmark hedgehog search against a seeded table.
+
+Seeds `--rows` hedgehogs (a million by default) inside a transaction, times
+the search query for a few kinds of terms next to a plain ILIKE scan, prints
+the plan of the indexed query and rolls everything back.
+
+    python -m benchmarks.search_hedgehogs --rows 1000000 --repeat 20
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List
+
+import asyncpg
+from app.db.repositories.queries.hedgehogs import SEARCH_HEDGEHOGS_QUERY
+from app.db.tasks import get_database_url
+
+SEED_HEDGEHOGS_QUERY = """
+    INSERT INTO hedgehogs (name, description, age, color_type, owner)
+    SELECT
+        (ARRAY['Marzipan', 'Biscuit', 'Pumpernickel', 'Hazel', 'Truffle',
+               'Bramble', 'Conker', 'Nutmeg'])[1 + i % 8] || ' ' || i,
+        (ARRAY['loves burrowing under blankets', 'snores loudly at night',
+               'eats mealworms with enthusiasm', 'curls up when startled',
+               'explores the garden every evening'])[1 + i % 5],
+        (i % 60) / 10.0,
+        (ARRAY['SOLT & PEPPER', 'DARK GREY', 'CHOCOLATE'])[1 + i % 3],
+        $1
+    FROM generate_series(1, $2) AS i;
+"""
+
+ILIKE_QUERY = """
+    SELECT id FROM hedgehogs
+    WHERE name ILIKE '%' || $1 || '%' OR description ILIKE '%' || $1 || '%'
+    LIMIT $2;
+"""
+
+TERMS = {
+    "full text": "mealworms",
+    "name": "truffle",
+    "misspelled name": "Pumpernikel",
+}
+
+
+def to_positional(query: str) -> str:
+    return (
+        query.replace(":term", "$1")
+        .replace(":after_rank", "$2")
+        .replace(":after_id", "$3")
+        .replace(":limit", "$4")
+    )
+
+
+async def timed(connection: asyncpg.Connection, repeat: int, *args) -> List[float]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        await connection.fetch(*args)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def report(label: str, timings: List[float]) -> None:
+    ordered = sorted(timings)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    print(
+        f"{label:<28} p50 {statistics.median(ordered):8.2f} ms"
+        f"   p95 {p95:8.2f} ms   max {ordered[-1]:8.2f} ms"
+    )
+
+
+async def run(rows: int, repeat: int, limit: int) -> None:
+    connection = await asyncpg.connect(str(get_database_url()))
+    transaction = connection.transaction()
+    await transaction.start()
+    try:
+        # Skips the NOTIFY triggers, a million queued notifications would
+        # measure the change bus rather than search. Needs a superuser.
+        await connection.execute("SET LOCAL session_replication_role = replica")
+        owner = await connection.fetchval(
+            """
+            INSERT INTO users (username, email, salt, password)
+            VALUES ('search_benchmark', 'search_benchmark@example.com', '', '')
+            RETURNING id;
+            """
+        )
+        start = time.perf_counter()
+        await connection.execute(SEED_HEDGEHOGS_QUERY, owner, rows)
+        await connection.execute("ANALYZE hedgehogs")
+        print(f"seeded {rows} rows in {time.perf_counter() - start:.1f} s\n")
+
+        search = to_positional(SEARCH_HEDGEHOGS_QUERY)
+        for label, term in TERMS.items():
+            report(
+                f"search: {label}",
+                await timed(connection, repeat, search, term, None, None, limit + 1),
+            )
+            report(
+                f"ILIKE scan: {label}",
+                await timed(connection, repeat, ILIKE_QUERY, term, limit),
+            )
+
+        page = await connection.fetch(search, "mealworms", None, None, limit + 1)
+        last = page[limit - 1]
+        report(
+            "search: next page",
+            await timed(
+                connection, repeat, search, "mealworms", last["rank"], last["id"], limit
+            ),
+        )
+
+        print("\nplan for the full text search:")
+        plan = await connection.fetch(
+            f"EXPLAIN (ANALYZE, BUFFERS) {search}", "mealworms", None, None, limit + 1
+        )
+        for line in plan:
+            print("   ", line[0])
+    finally:
+        await transaction.rollback()
+        await connection.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark hedgehog search.")
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(run(args.rows, args.repeat, args.limit))
+
+
+if __name__ == "__main__":
+    main()
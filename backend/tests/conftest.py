@@ -7,7 +7,8 @@ import alembic
 import docker as pydocker
 import pytest
 from alembic.config import Config
-from app.core.config import JWT_TOKEN_PREFIX, SECRET_KEY
+from app.core.config import DATABASE_DRIVER, JWT_TOKEN_PREFIX, SECRET_KEY
+from app.core.metrics import metrics
 from app.db.repositories.hedgehogs import HedgehogsRepository
 from app.db.repositories.users import UsersRepository
 from app.models.hedgehog import HedgehogCreate, HedgehogInDB
@@ -18,11 +19,31 @@ from databases import Database
 from fastapi import FastAPI
 from httpx import AsyncClient
 
-from tests.utility import ping_postgres
+from tests.utility import SMTPStandIn, ping_postgres
 
 config = Config("alembic.ini")
 
 
+def pytest_terminal_summary(terminalreporter) -> None:
+    """
+    Per-query latency over the run. Set DATABASE_DRIVER=asyncpg to compare
+    with the default driver.
+    """
+    timings = metrics.snapshot(prefix="db.query.")
+    if not timings:
+        return
+    terminalreporter.section(f"query latency ({DATABASE_DRIVER} driver)")
+    terminalreporter.write_line(
+        f"{'query':<60} {'count':>7} {'mean ms':>9} {'p95 ms':>9} {'max ms':>9}"
+    )
+    for name, timing in timings.items():
+        terminalreporter.write_line(
+            f"{name[len('db.query.'):]:<60} {timing['count']:>7} "
+            f"{timing['mean'] * 1000:>9.2f} {timing['p95'] * 1000:>9.2f} "
+            f"{timing['max'] * 1000:>9.2f}"
+        )
+
+
 @pytest.fixture(scope="session")
 def docker() -> pydocker.APIClient:
     # base url is the unix socket we use to communicate with docker
@@ -139,6 +160,40 @@ def authorized_client(client: AsyncClient, test_user: UserInDB) -> AsyncClient:
     return client
 
 
+@pytest.fixture
+async def superuser(db: Database) -> UserInDB:
+    users_repo = UsersRepository(db)
+    new_user = UserCreate(
+        email="admin@mail.com", username="hedgehogadmin", password="adminpassword"
+    )
+    user = await users_repo.get_user_by_email(email=new_user.email)
+    if not user:
+        user = await users_repo.register_new_user(new_user=new_user)
+    await db.execute(
+        query="UPDATE users SET is_superuser = TRUE WHERE id = :id",
+        values={"id": user.id},
+    )
+    return user.copy(update={"is_superuser": True})
+
+
+@pytest.fixture
+async def admin_client(
+    app: FastAPI, client: AsyncClient, superuser: UserInDB
+) -> AsyncClient:
+    access_token = auth_service.create_access_token_for_user(
+        user=superuser, secret_key=str(SECRET_KEY)
+    )
+    async with AsyncClient(
+        app=app,
+        base_url="http://testserver",
+        headers={
+            "Content-Type": "application/json",
+            "Authorization": f"{JWT_TOKEN_PREFIX} {access_token}",
+        },
+    ) as client:
+        yield client
+
+
 @pytest.fixture
 async def test_user2(db: Database) -> UserInDB:
     new_user = UserCreate(
@@ -151,3 +206,11 @@ async def test_user2(db: Database) -> UserInDB:
     if existing_user:
         return existing_user
     return await user_repo.register_new_user(new_user=new_user)
+
+
+@pytest.fixture
+async def smtp_server() -> SMTPStandIn:
+    server = SMTPStandIn()
+    await server.start()
+    yield server
+    await server.stop()
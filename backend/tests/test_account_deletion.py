@@ -0,0 +1,186 @@
+import pytest
+from app.core.config import JWT_TOKEN_PREFIX, SECRET_KEY
+from app.core.worker import Worker
+from app.db.repositories.hedgehogs import HedgehogsRepository
+from app.db.repositories.jobs import JobsRepository
+from app.db.repositories.users import UsersRepository
+from app.models.hedgehog import HedgehogCreate
+from app.models.job import JobPublic, JobStatus
+from app.models.user import UserCreate, UserInDB
+from app.services import auth_service, job_handlers
+from app.services.jobs import DELETE_ACCOUNT_TASK
+from databases import Database
+from fastapi import FastAPI, status
+from httpx import AsyncClient
+
+pytestmark = pytest.mark.asyncio
+
+
+async def create_user_with_hedgehogs(
+    db: Database, *, username: str, hedgehogs: int
+) -> UserInDB:
+    user = await UsersRepository(db).register_new_user(
+        new_user=UserCreate(
+            email=f"{username}@mail.com", username=username, password="leavingsoon"
+        )
+    )
+    hedgehogs_repo = HedgehogsRepository(db)
+    for i in range(hedgehogs):
+        await hedgehogs_repo.create_hedgehog(
+            new_hedgehog=HedgehogCreate(
+                name=f"{username} hog {i}", age=1.0, color_type="CHOCOLATE"
+            ),
+            requesting_user=user,
+        )
+    return user
+
+
+def client_for(app: FastAPI, user: UserInDB) -> AsyncClient:
+    access_token = auth_service.create_access_token_for_user(
+        user=user, secret_key=str(SECRET_KEY)
+    )
+    return AsyncClient(
+        app=app,
+        base_url="http://testserver",
+        headers={
+            "Content-Type": "application/json",
+            "Authorization": f"{JWT_TOKEN_PREFIX} {access_token}",
+        },
+    )
+
+
+class TestAccountDeletion:
+    async def test_unauthenticated_users_cannot_delete_accounts(
+        self, app: FastAPI, client: AsyncClient
+    ) -> None:
+        res = await client.delete(app.url_path_for("users:delete-own-account"))
+        assert res.status_code == status.HTTP_401_UNAUTHORIZED
+
+    async def test_account_is_deactivated_then_deleted_in_batches(
+        self,
+        app: FastAPI,
+        client: AsyncClient,
+        db: Database,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        monkeypatch.setattr(job_handlers, "ACCOUNT_DELETION_BATCH_SIZE", 2)
+        monkeypatch.setattr(job_handlers, "ACCOUNT_DELETION_BATCH_PAUSE_SECONDS", 0)
+        user = await create_user_with_hedgehogs(db, username="leaving_hog", hedgehogs=5)
+
+        async with client_for(app, user) as user_client:
+            res = await user_client.delete(app.url_path_for("users:delete-own-account"))
+        assert res.status_code == status.HTTP_202_ACCEPTED
+        scheduled = JobPublic(**res.json())
+        assert scheduled.task == DELETE_ACCOUNT_TASK
+        assert scheduled.status == JobStatus.queued
+
+        users_repo = UsersRepository(db)
+        deactivated = await users_repo.get_user_by_email(email=user.email)
+        assert deactivated.is_active is False
+
+        jobs_repo = JobsRepository(db)
+        job = await jobs_repo.claim_next_job(
+            tasks=[DELETE_ACCOUNT_TASK], lock_timeout=60
+        )
+        assert job.id == scheduled.id
+        await Worker(db).process_job(job=job)
+
+        finished = await jobs_repo.get_job_by_id(id=job.id)
+        assert finished.status == JobStatus.done
+        assert finished.progress == {"hedgehogs_deleted": 5, "user_deleted": True}
+        assert await users_repo.get_user_by_email(email=user.email) is None
+        remaining = await db.fetch_val(
+            query="SELECT count(*) FROM hedgehogs WHERE owner = :owner",
+            values={"owner": user.id},
+        )
+        assert remaining == 0
+
+    async def test_reactivated_account_is_not_deleted(
+        self, client: AsyncClient, db: Database, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr(job_handlers, "ACCOUNT_DELETION_BATCH_PAUSE_SECONDS", 0)
+        user = await create_user_with_hedgehogs(
+            db, username="returning_hog", hedgehogs=2
+        )
+        users_repo = UsersRepository(db)
+        await users_repo.schedule_account_deletion(user=user)
+        await users_repo.set_users_active(ids=[user.id], is_active=True)
+
+        jobs_repo = JobsRepository(db)
+        job = await jobs_repo.claim_next_job(
+            tasks=[DELETE_ACCOUNT_TASK], lock_timeout=60
+        )
+        await Worker(db).process_job(job=job)
+
+        finished = await jobs_repo.get_job_by_id(id=job.id)
+        assert finished.progress == {"hedgehogs_deleted": 0, "user_deleted": False}
+        assert await users_repo.get_user_by_email(email=user.email) is not None
+
+    async def test_reactivating_between_batches_stops_the_deletion(
+        self, client: AsyncClient, db: Database, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr(job_handlers, "ACCOUNT_DELETION_BATCH_SIZE", 2)
+        monkeypatch.setattr(job_handlers, "ACCOUNT_DELETION_BATCH_PAUSE_SECONDS", 0)
+        user = await create_user_with_hedgehogs(
+            db, username="hesitant_hog", hedgehogs=5
+        )
+        users_repo = UsersRepository(db)
+        await users_repo.schedule_account_deletion(user=user)
+
+        delete_batch = HedgehogsRepository.delete_inactive_owner_hedgehogs_batch
+
+        async def delete_then_reactivate(
+            hedgehogs_repo: HedgehogsRepository, *, owner: int, limit: int
+        ) -> int:
+            count = await delete_batch(hedgehogs_repo, owner=owner, limit=limit)
+            await users_repo.set_users_active(ids=[owner], is_active=True)
+            return count
+
+        monkeypatch.setattr(
+            HedgehogsRepository,
+            "delete_inactive_owner_hedgehogs_batch",
+            delete_then_reactivate,
+        )
+        jobs_repo = JobsRepository(db)
+        job = await jobs_repo.claim_next_job(
+            tasks=[DELETE_ACCOUNT_TASK], lock_timeout=60
+        )
+        await Worker(db).process_job(job=job)
+
+        finished = await jobs_repo.get_job_by_id(id=job.id)
+        assert finished.progress == {"hedgehogs_deleted": 2, "user_deleted": False}
+        remaining = await db.fetch_val(
+            query="SELECT count(*) FROM hedgehogs WHERE owner = :owner",
+            values={"owner": user.id},
+        )
+        assert remaining == 3
+        # The batch itself refuses to run for an active owner.
+        assert await delete_batch(HedgehogsRepository(db), owner=user.id, limit=2) == 0
+
+    async def test_superusers_can_follow_job_progress(
+        self, app: FastAPI, client: AsyncClient, db: Database
+    ) -> None:
+        user = await create_user_with_hedgehogs(
+            db, username="followed_hog", hedgehogs=0
+        )
+        job = await UsersRepository(db).schedule_account_deletion(user=user)
+        superuser = await create_user_with_hedgehogs(
+            db, username="deletion_admin", hedgehogs=0
+        )
+        await db.execute(
+            query="UPDATE users SET is_superuser = TRUE WHERE id = :id",
+            values={"id": superuser.id},
+        )
+
+        url = app.url_path_for("admin:get-job", job_id=job.id)
+        async with client_for(app, superuser) as admin_client:
+            res = await admin_client.get(url)
+            assert res.status_code == status.HTTP_200_OK
+            assert JobPublic(**res.json()).id == job.id
+
+            res = await admin_client.get(app.url_path_for("admin:get-job", job_id=-1))
+            assert res.status_code == status.HTTP_404_NOT_FOUND
+
+        async with client_for(app, user) as user_client:
+            res = await user_client.get(url)
+        assert res.status_code == status.HTTP_401_UNAUTHORIZED
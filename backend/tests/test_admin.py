@@ -0,0 +1,128 @@
+from typing import List
+
+import pytest
+from app.core.config import JWT_TOKEN_PREFIX, SECRET_KEY
+from app.db.repositories.users import UsersRepository
+from app.models.user import UserCreate, UserInDB
+from app.services import auth_service
+from databases import Database
+from fastapi import FastAPI, status
+from httpx import AsyncClient
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+async def managed_users(db: Database) -> List[UserInDB]:
+    users_repo = UsersRepository(db)
+    users = []
+    for i in range(5):
+        new_user = UserCreate(
+            email=f"managed{i}@mail.com",
+            username=f"managed_hog_{i}",
+            password="managedpassword",
+        )
+        user = await users_repo.get_user_by_email(email=new_user.email)
+        users.append(user or await users_repo.register_new_user(new_user=new_user))
+    await users_repo.set_users_active(ids=[user.id for user in users], is_active=True)
+    return users
+
+
+class TestAdminAccess:
+    async def test_regular_users_are_forbidden(
+        self, app: FastAPI, authorized_client: AsyncClient
+    ) -> None:
+        res = await authorized_client.get(app.url_path_for("admin:list-users"))
+        assert res.status_code == status.HTTP_403_FORBIDDEN
+
+        res = await authorized_client.post(
+            app.url_path_for("admin:set-users-active"),
+            json={"activation": {"user_ids": [1], "is_active": False}},
+        )
+        assert res.status_code == status.HTTP_403_FORBIDDEN
+
+
+class TestAdminListUsers:
+    async def test_prefix_filters_match_usernames_and_emails(
+        self,
+        app: FastAPI,
+        client: AsyncClient,
+        admin_client: AsyncClient,
+        managed_users: List[UserInDB],
+    ) -> None:
+        url = app.url_path_for("admin:list-users")
+        res = await admin_client.get(url, params={"username": "managed_hog_"})
+        assert res.status_code == status.HTTP_200_OK
+        usernames = {user["username"] for user in res.json()["results"]}
+        assert usernames == {user.username for user in managed_users}
+        assert all("password" not in user for user in res.json()["results"])
+
+        res = await admin_client.get(url, params={"email": "managed3@"})
+        assert [user["email"] for user in res.json()["results"]] == [
+            "managed3@mail.com"
+        ]
+
+        # LIKE wildcards in the prefix are matched literally.
+        res = await admin_client.get(url, params={"username": "managed%"})
+        assert res.json()["results"] == []
+
+    async def test_keyset_pages_walk_every_user_once(
+        self,
+        app: FastAPI,
+        client: AsyncClient,
+        admin_client: AsyncClient,
+        managed_users: List[UserInDB],
+    ) -> None:
+        url = app.url_path_for("admin:list-users")
+        seen, cursor = [], None
+        while True:
+            params = {"username": "managed_hog_", "limit": 2}
+            if cursor:
+                params["cursor"] = cursor
+            page = (await admin_client.get(url, params=params)).json()
+            seen.extend(user["id"] for user in page["results"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        assert seen == sorted({user.id for user in managed_users}, reverse=True)
+
+
+class TestAdminActivation:
+    async def test_bulk_deactivation_locks_users_out(
+        self,
+        app: FastAPI,
+        client: AsyncClient,
+        admin_client: AsyncClient,
+        managed_users: List[UserInDB],
+    ) -> None:
+        ids = [user.id for user in managed_users[:3]]
+        res = await admin_client.post(
+            app.url_path_for("admin:set-users-active"),
+            json={"activation": {"user_ids": ids, "is_active": False}},
+        )
+        assert res.status_code == status.HTTP_200_OK
+        assert sorted(res.json()["updated"]) == sorted(ids)
+
+        res = await admin_client.get(
+            app.url_path_for("admin:list-users"),
+            params={"username": "managed_hog_", "is_active": False},
+        )
+        assert {user["id"] for user in res.json()["results"]} == set(ids)
+
+        token = auth_service.create_access_token_for_user(
+            user=managed_users[0], secret_key=str(SECRET_KEY)
+        )
+        res = await client.get(
+            app.url_path_for("users:get-current-user"),
+            headers={"Authorization": f"{JWT_TOKEN_PREFIX} {token}"},
+        )
+        assert res.status_code == status.HTTP_401_UNAUTHORIZED
+
+    async def test_superusers_cannot_deactivate_themselves(
+        self, app: FastAPI, admin_client: AsyncClient, superuser: UserInDB
+    ) -> None:
+        res = await admin_client.post(
+            app.url_path_for("admin:set-users-active"),
+            json={"activation": {"user_ids": [superuser.id], "is_active": False}},
+        )
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
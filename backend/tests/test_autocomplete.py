@@ -0,0 +1,120 @@
+import math
+from typing import Any, Dict, List, Optional, Tuple
+
+import pytest
+from app.db.events import change_listener
+from app.models.event import ChangeEvent, ChangeOperation
+from app.services import username_index
+from app.services.autocomplete import UsernameIndex
+from fastapi import FastAPI, status
+from httpx import AsyncClient
+
+from tests.test_events import wait_until
+
+pytestmark = pytest.mark.asyncio
+
+
+class FakeUsersRepository:
+    def __init__(self, usernames: Dict[int, str]) -> None:
+        self.usernames = usernames
+
+    async def list_active_usernames(self) -> List[Tuple[int, str]]:
+        return list(self.usernames.items())
+
+    async def get_active_username_by_id(self, *, id: int) -> Optional[str]:
+        return self.usernames.get(id)
+
+
+class ReadCountingList(list):
+    def __init__(self, *args: Any) -> None:
+        super().__init__(*args)
+        self.reads = 0
+
+    def __getitem__(self, index: Any) -> Any:
+        self.reads += 1
+        return super().__getitem__(index)
+
+
+def users_event(op: ChangeOperation, id: int) -> ChangeEvent:
+    return ChangeEvent(table="users", op=op, id=id, owner=id)
+
+
+class TestUsernameIndex:
+    async def test_prefix_matches_are_sorted_case_insensitive_and_capped(
+        self,
+    ) -> None:
+        index = UsernameIndex(max_results=3)
+        await index.build(
+            FakeUsersRepository(
+                {1: "hedgehog", 2: "Hedge_fund", 3: "hedy", 4: "heron", 5: "hedge"}
+            )
+        )
+        assert index.complete("hed") == ["hedge", "Hedge_fund", "hedgehog"]
+        assert index.complete("HEDGEH") == ["hedgehog"]
+        assert index.complete("hed", limit=1) == ["hedge"]
+        assert index.complete("hed", limit=50) == ["hedge", "Hedge_fund", "hedgehog"]
+        assert index.complete("zzz") == []
+
+    async def test_change_events_keep_the_index_current(self) -> None:
+        repo = FakeUsersRepository({1: "alpha"})
+        index = UsernameIndex()
+        await index.build(repo)
+
+        repo.usernames[2] = "alphabet"
+        await index.apply(users_event(ChangeOperation.insert, 2))
+        assert index.complete("alp") == ["alpha", "alphabet"]
+
+        repo.usernames[1] = "omega"
+        await index.apply(users_event(ChangeOperation.update, 1))
+        assert index.complete("alp") == ["alphabet"]
+        assert index.complete("ome") == ["omega"]
+
+        index.apply(users_event(ChangeOperation.delete, 2))
+        assert index.complete("alp") == []
+        assert len(index) == 1
+
+    async def test_lookups_are_binary_searches_not_scans(self) -> None:
+        users = 200_000
+        index = UsernameIndex()
+        await index.build(
+            FakeUsersRepository({i: f"user_{i:06d}" for i in range(users)})
+        )
+        entries = index._entries = ReadCountingList(index._entries)
+        # Two bisections plus the slice of results.
+        max_reads = 2 * math.ceil(math.log2(users + 1)) + 1
+        for prefix in ("user_0", "user_1234", "user_19999", "nobody"):
+            entries.reads = 0
+            index.complete(prefix)
+            assert entries.reads <= max_reads
+        assert index._entries is entries
+
+
+class TestAutocompleteRoute:
+    async def test_new_users_become_searchable(
+        self, app: FastAPI, authorized_client: AsyncClient
+    ) -> None:
+        await wait_until(lambda: change_listener.connected)
+        new_user = {
+            "email": "autocomplete@mail.com",
+            "username": "autocompletehog",
+            "password": "autocompletepassword",
+        }
+        res = await authorized_client.post(
+            app.url_path_for("users:register-new-user"), json={"new_user": new_user}
+        )
+        assert res.status_code == status.HTTP_201_CREATED
+        await wait_until(lambda: username_index.complete("autocompletehog"))
+
+        res = await authorized_client.get(
+            app.url_path_for("users:autocomplete-username"), params={"q": "AutoComp"}
+        )
+        assert res.status_code == status.HTTP_200_OK
+        assert res.json() == ["autocompletehog"]
+
+    async def test_unauthenticated_users_cannot_autocomplete(
+        self, app: FastAPI, client: AsyncClient
+    ) -> None:
+        res = await client.get(
+            app.url_path_for("users:autocomplete-username"), params={"q": "nm"}
+        )
+        assert res.status_code == status.HTTP_401_UNAUTHORIZED
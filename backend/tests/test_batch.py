@@ -0,0 +1,117 @@
+import pytest
+from app.db.repositories.users import UsersRepository
+from app.models.batch import BatchMethod, BatchRequestItem
+from app.models.hedgehog import HedgehogInDB
+from app.models.user import UserInDB
+from app.services.batch import group_requests
+from fastapi import FastAPI, status
+from httpx import AsyncClient
+
+pytestmark = pytest.mark.asyncio
+
+
+class TestBatchGrouping:
+    def test_reads_are_grouped_and_writes_run_alone_in_order(self) -> None:
+        requests = [
+            BatchRequestItem(url="/api/users/me/"),
+            BatchRequestItem(url="/api/hedgehogs/"),
+            BatchRequestItem(method=BatchMethod.put, url="/api/profiles/me/"),
+            BatchRequestItem(url="/api/profiles/someone/"),
+        ]
+        groups = [[index for index, _ in group] for group in group_requests(requests)]
+        assert groups == [[0, 1], [2], [3]]
+
+    def test_urls_must_be_local_paths(self) -> None:
+        with pytest.raises(ValueError):
+            BatchRequestItem(url="https://example.com/api/users/me/")
+
+
+class TestBatchRoute:
+    async def test_sub_requests_return_status_and_body_in_order(
+        self,
+        app: FastAPI,
+        authorized_client: AsyncClient,
+        test_user: UserInDB,
+        test_user2: UserInDB,
+        test_hedgehog: HedgehogInDB,
+    ) -> None:
+        res = await authorized_client.post(
+            app.url_path_for("batch:execute"),
+            json={
+                "requests": [
+                    {"url": app.url_path_for("users:get-current-user")},
+                    {"url": app.url_path_for("hedgehogs:list-all-user-hedgehogs")},
+                    {
+                        "url": app.url_path_for(
+                            "profiles:get-profile-by-username",
+                            username=test_user2.username,
+                        )
+                    },
+                    {
+                        "url": app.url_path_for(
+                            "profiles:get-profile-by-username", username="nobody_here"
+                        )
+                    },
+                    {
+                        "method": "PUT",
+                        "url": app.url_path_for("profiles:update-own-profile"),
+                        "body": {"profile_update": {"full_name": "Batched Name"}},
+                    },
+                ]
+            },
+        )
+        assert res.status_code == status.HTTP_200_OK
+        me, hedgehogs, profile, missing, update = res.json()
+        assert me["status"] == 200 and me["body"]["username"] == test_user.username
+        assert hedgehogs["status"] == 200
+        assert test_hedgehog.id in [item["id"] for item in hedgehogs["body"]]
+        assert profile["body"]["username"] == test_user2.username
+        assert missing["status"] == status.HTTP_404_NOT_FOUND
+        assert update["status"] == 200
+        assert update["body"]["full_name"] == "Batched Name"
+
+    async def test_principal_is_resolved_once_per_batch(
+        self,
+        app: FastAPI,
+        authorized_client: AsyncClient,
+        test_user: UserInDB,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        lookups = []
+        get_user_by_username = UsersRepository.get_user_by_username
+
+        async def counted(self, **kwargs):
+            lookups.append(kwargs["username"])
+            return await get_user_by_username(self, **kwargs)
+
+        monkeypatch.setattr(UsersRepository, "get_user_by_username", counted)
+        me_url = app.url_path_for("users:get-current-user")
+        res = await authorized_client.post(
+            app.url_path_for("batch:execute"),
+            json={"requests": [{"url": me_url} for _ in range(5)]},
+        )
+        assert res.status_code == status.HTTP_200_OK
+        assert [item["status"] for item in res.json()] == [200] * 5
+        assert lookups == [test_user.username]
+
+    async def test_sub_requests_without_credentials_are_rejected(
+        self, app: FastAPI, client: AsyncClient
+    ) -> None:
+        res = await client.post(
+            app.url_path_for("batch:execute"),
+            json={"requests": [{"url": app.url_path_for("users:get-current-user")}]},
+        )
+        assert res.status_code == status.HTTP_200_OK
+        assert res.json()[0]["status"] == status.HTTP_401_UNAUTHORIZED
+
+    @pytest.mark.parametrize(
+        "url",
+        ("/api/batch/", "/api/stream/"),
+    )
+    async def test_nested_batches_and_streams_are_refused(
+        self, app: FastAPI, authorized_client: AsyncClient, url: str
+    ) -> None:
+        res = await authorized_client.post(
+            app.url_path_for("batch:execute"), json={"requests": [{"url": url}]}
+        )
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
@@ -0,0 +1,130 @@
+import asyncio
+
+import pytest
+from app.models.event import ChangeEvent, ChangeOperation
+from app.services import cache as cache_module
+from app.services.cache import CacheBackend, MemoryCache, RedisCache, user_tag
+
+from tests.utility import RedisStandIn
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+async def redis_server() -> RedisStandIn:
+    server = RedisStandIn()
+    await server.start()
+    yield server
+    await server.stop()
+
+
+@pytest.fixture(params=["memory", "redis"])
+def cache(request: pytest.FixtureRequest, redis_server: RedisStandIn) -> CacheBackend:
+    if request.param == "memory":
+        return MemoryCache("test-memory")
+    return RedisCache("test-redis", url=redis_server.url)
+
+
+class TestCacheBackends:
+    async def test_set_then_get_returns_bytes(self, cache: CacheBackend) -> None:
+        assert await cache.get("missing") is None
+        await cache.set("key", b'{"bio": "hi"}', ttl=60)
+        assert await cache.get("key") == b'{"bio": "hi"}'
+
+        stats = cache.stats()
+        assert stats["hits"] >= 1
+        assert stats["misses"] >= 1
+
+    async def test_invalidating_a_tag_drops_its_entries(
+        self, cache: CacheBackend
+    ) -> None:
+        await cache.set("a", b"1", ttl=60, tags=[user_tag(1)])
+        await cache.set("b", b"2", ttl=60, tags=[user_tag(1)])
+        await cache.set("c", b"3", ttl=60, tags=[user_tag(2)])
+
+        await cache.invalidate_tags(user_tag(1))
+        assert await cache.get("a") is None
+        assert await cache.get("b") is None
+        assert await cache.get("c") == b"3"
+
+    async def test_change_event_invalidates_the_owners_entries(
+        self, cache: CacheBackend
+    ) -> None:
+        await cache.set("a", b"1", ttl=60, tags=[user_tag(5)])
+        event = ChangeEvent(table="profiles", op=ChangeOperation.update, id=1, owner=5)
+        await cache.invalidate(event)
+        assert await cache.get("a") is None
+
+    async def test_writes_read_before_an_invalidation_are_skipped(
+        self, cache: CacheBackend
+    ) -> None:
+        version = await cache.version()
+        await cache.invalidate_tags(user_tag(1))
+
+        assert not await cache.set(
+            "stale", b"1", ttl=60, tags=[user_tag(1)], version=version
+        )
+        assert await cache.get("stale") is None
+        assert await cache.set("b", b"2", ttl=60, tags=[user_tag(2)], version=version)
+        assert await cache.get("b") == b"2"
+
+        fresh = await cache.version()
+        assert await cache.set("fresh", b"3", ttl=60, tags=[user_tag(1)], version=fresh)
+        assert await cache.get("fresh") == b"3"
+
+    async def test_clear_drops_everything(self, cache: CacheBackend) -> None:
+        await cache.set("a", b"1", ttl=60)
+        await cache.set("b", b"2", ttl=60, tags=[user_tag(1)])
+        await cache.clear()
+        assert await cache.get("a") is None
+        assert await cache.get("b") is None
+
+
+class TestMemoryCache:
+    async def test_least_recently_used_entry_is_evicted(self) -> None:
+        cache = MemoryCache("test-lru", max_entries=2)
+        await cache.set("a", b"1", ttl=60)
+        await cache.set("b", b"2", ttl=60)
+        await cache.get("a")
+        await cache.set("c", b"3", ttl=60)
+
+        assert await cache.get("a") == b"1"
+        assert await cache.get("b") is None
+        assert cache.stats()["entries"] == 2
+
+    async def test_expired_entries_are_not_served(self) -> None:
+        cache = MemoryCache("test-ttl")
+        await cache.set("a", b"1", ttl=0.01)
+        await asyncio.sleep(0.02)
+        assert await cache.get("a") is None
+
+    async def test_invalidation_markers_expire(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr(cache_module, "INVALIDATION_MARKER_TTL_SECONDS", 0.01)
+        cache = MemoryCache("test-markers")
+        await cache.invalidate_tags(*(user_tag(id) for id in range(100)))
+        await asyncio.sleep(0.02)
+        await cache.invalidate_tags(user_tag(100))
+        assert list(cache._invalidated_at) == [user_tag(100)]
+
+    async def test_writes_read_before_a_clear_are_skipped(self) -> None:
+        cache = MemoryCache("test-clear-version")
+        version = await cache.version()
+        await cache.clear()
+
+        assert not await cache.set("stale", b"1", ttl=60, version=version)
+        assert await cache.set("fresh", b"2", ttl=60, version=await cache.version())
+
+
+class TestRedisCache:
+    async def test_unreachable_server_degrades_to_misses(self) -> None:
+        server = RedisStandIn()
+        await server.start()
+        url = server.url
+        await server.stop()
+
+        cache = RedisCache("test-down", url=url, timeout=0.5)
+        await cache.set("a", b"1", ttl=60)
+        assert await cache.get("a") is None
+        assert cache.stats()["errors"] >= 2
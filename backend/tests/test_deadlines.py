@@ -0,0 +1,174 @@
+import asyncio
+from typing import Dict, List, Tuple
+
+import asyncpg
+import pytest
+from app.api.dependencies import deadlines
+from app.api.dependencies.deadlines import (
+    CLIENT_CLOSED_REQUEST,
+    get_deadline,
+    parse_route_deadlines,
+    run_with_deadline,
+)
+from app.core.config import REQUEST_DEADLINE_MAX_SECONDS, REQUEST_DEADLINE_SECONDS
+from app.core.metrics import metrics
+from app.db.unit_of_work import StatementTimeoutError, UnitOfWork
+from databases import Database
+from fastapi import FastAPI, HTTPException
+from httpx import AsyncClient
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.status import (
+    HTTP_200_OK,
+    HTTP_400_BAD_REQUEST,
+    HTTP_504_GATEWAY_TIMEOUT,
+)
+
+pytestmark = pytest.mark.asyncio
+
+
+def make_request(
+    headers: List[Tuple[bytes, bytes]] = (), disconnect_after: float = None
+) -> Request:
+    async def receive() -> Dict[str, str]:
+        if disconnect_after is None:
+            await asyncio.Event().wait()
+        await asyncio.sleep(disconnect_after)
+        return {"type": "http.disconnect"}
+
+    return Request({"type": "http", "headers": list(headers)}, receive)
+
+
+class SlowHandler:
+    def __init__(self, seconds: float) -> None:
+        self.seconds = seconds
+        self.cancelled = False
+
+    async def __call__(self) -> Response:
+        try:
+            await asyncio.sleep(self.seconds)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return Response(status_code=HTTP_200_OK)
+
+
+class TestGetDeadline:
+    def test_route_deadlines_parse_name_seconds_pairs(self) -> None:
+        assert parse_route_deadlines(["hedgehogs:list-all-user-hedgehogs=2.5"]) == {
+            "hedgehogs:list-all-user-hedgehogs": 2.5
+        }
+
+    def test_routes_use_their_own_deadline_or_the_default(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        monkeypatch.setattr(deadlines, "route_deadlines", {"slow-route": 42.0})
+        assert get_deadline(make_request(), "slow-route") == 42.0
+        assert get_deadline(make_request(), "other-route") == REQUEST_DEADLINE_SECONDS
+
+    def test_clients_choose_a_deadline_up_to_the_maximum(self) -> None:
+        assert get_deadline(make_request([(b"x-request-timeout", b"0.5")]), "r") == 0.5
+        too_long = str(REQUEST_DEADLINE_MAX_SECONDS * 2).encode()
+        request = make_request([(b"x-request-timeout", too_long)])
+        assert get_deadline(request, "r") == REQUEST_DEADLINE_MAX_SECONDS
+
+    @pytest.mark.parametrize("header", (b"soon", b"0", b"-1", b"nan", b"inf"))
+    def test_invalid_deadlines_are_rejected(self, header: bytes) -> None:
+        with pytest.raises(HTTPException) as exc_info:
+            get_deadline(make_request([(b"x-request-timeout", header)]), "r")
+        assert exc_info.value.status_code == HTTP_400_BAD_REQUEST
+
+
+class TestRunWithDeadline:
+    async def test_handlers_that_finish_in_time_return_their_response(self) -> None:
+        response = await run_with_deadline(
+            make_request(), SlowHandler(0)(), deadline=1.0
+        )
+        assert response.status_code == HTTP_200_OK
+
+    async def test_handlers_past_their_deadline_are_cancelled(self) -> None:
+        cancellations = metrics.counter("db.cancellations.deadline")
+        before = cancellations.value
+        handler = SlowHandler(10)
+        with pytest.raises(HTTPException) as exc_info:
+            await run_with_deadline(make_request(), handler(), deadline=0.01)
+        assert exc_info.value.status_code == HTTP_504_GATEWAY_TIMEOUT
+        assert handler.cancelled
+        assert cancellations.value == before + 1
+
+    async def test_handlers_are_cancelled_when_the_client_disconnects(self) -> None:
+        cancellations = metrics.counter("db.cancellations.disconnect")
+        before = cancellations.value
+        handler = SlowHandler(10)
+        response = await run_with_deadline(
+            make_request(disconnect_after=0.01), handler(), deadline=10.0
+        )
+        assert response.status_code == CLIENT_CLOSED_REQUEST
+        assert handler.cancelled
+        assert cancellations.value == before + 1
+
+    async def test_timed_out_statements_answer_504(self) -> None:
+        async def handler() -> Response:
+            raise StatementTimeoutError("too slow")
+
+        with pytest.raises(HTTPException) as exc_info:
+            await run_with_deadline(make_request(), handler(), deadline=1.0)
+        assert exc_info.value.status_code == HTTP_504_GATEWAY_TIMEOUT
+
+
+class TestQueryCancellation:
+    async def test_transactional_units_set_a_local_statement_timeout(
+        self, client: AsyncClient, db: Database
+    ) -> None:
+        async with UnitOfWork(
+            db, transactional=True, statement_timeout=0.05
+        ) as unit_of_work:
+            assert await db.fetch_val("SHOW statement_timeout") == "50ms"
+            with pytest.raises(asyncpg.exceptions.QueryCanceledError):
+                await db.fetch_val("SELECT pg_sleep(1)")
+            unit_of_work.set_rollback_only()
+        async with UnitOfWork(db, transactional=True):
+            assert await db.fetch_val("SHOW statement_timeout") == "0"
+
+    async def test_read_only_units_time_queries_out_on_the_client(
+        self, client: AsyncClient, db: Database
+    ) -> None:
+        async with UnitOfWork(db, transactional=False, statement_timeout=0.05):
+            # Nothing was sent to set up the timeout.
+            assert await db.fetch_val("SHOW statement_timeout") == "0"
+            with pytest.raises(StatementTimeoutError):
+                await db.fetch_val("SELECT pg_sleep(1)")
+            # The cancelled statement doesn't hold the connection up.
+            assert await db.fetch_val("SELECT 1") == 1
+
+    async def test_disconnects_cancel_the_query_on_the_server(
+        self, client: AsyncClient, db: Database
+    ) -> None:
+        async def handler() -> Response:
+            await db.fetch_val("SELECT pg_sleep(30) /* disconnect test */")
+            return Response(status_code=HTTP_200_OK)
+
+        response = await run_with_deadline(
+            make_request(disconnect_after=0.2), handler(), deadline=60.0
+        )
+        assert response.status_code == CLIENT_CLOSED_REQUEST
+        # The server handles the cancel request asynchronously; give it a moment.
+        for _ in range(40):
+            running = await db.fetch_val(
+                "SELECT count(*) FROM pg_stat_activity "
+                "WHERE state = 'active' AND query LIKE '%/* disconnect test */' "
+                "AND pid <> pg_backend_pid()"
+            )
+            if running == 0:
+                break
+            await asyncio.sleep(0.05)
+        assert running == 0
+
+    async def test_routes_reject_malformed_deadline_headers(
+        self, app: FastAPI, authorized_client: AsyncClient
+    ) -> None:
+        res = await authorized_client.get(
+            app.url_path_for("hedgehogs:list-all-user-hedgehogs"),
+            headers={"X-Request-Timeout": "whenever"},
+        )
+        assert res.status_code == HTTP_400_BAD_REQUEST
@@ -0,0 +1,101 @@
+import pytest
+from app.core.metrics import metrics
+from app.db.drivers import AsyncpgDatabase
+from app.db.repositories.hedgehogs import HedgehogsRepository
+from app.db.registry import query_registry
+from app.db.repositories.queries.hedgehogs import GET_HEDGEHOG_BY_ID_QUERY
+from app.db.tasks import get_database_url
+from app.models.hedgehog import HedgehogCreate, HedgehogInDB
+from app.models.user import UserInDB
+from databases import Database
+from httpx import AsyncClient
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+async def native_db(client: AsyncClient) -> AsyncpgDatabase:
+    database = AsyncpgDatabase(get_database_url(), min_size=1, max_size=2)
+    await database.connect()
+    yield database
+    await database.disconnect()
+
+
+class TestInstrumentedDatabase:
+    async def test_compiled_queries_return_what_raw_sql_does(
+        self, db: Database, test_hedgehog: HedgehogInDB
+    ) -> None:
+        values = {"id": test_hedgehog.id}
+        raw = await db.fetch_one(query=GET_HEDGEHOG_BY_ID_QUERY, values=values)
+        compiled = await db.fetch_one(
+            query=query_registry["hedgehogs.get_hedgehog_by_id"], values=values
+        )
+        assert dict(compiled) == dict(raw)
+
+    async def test_queries_are_timed_by_name(
+        self, db: Database, test_hedgehog: HedgehogInDB
+    ) -> None:
+        timing = metrics.histogram("db.query.databases.hedgehogs.get_hedgehog_by_id")
+        before = timing.count
+        await db.fetch_one(
+            query=query_registry["hedgehogs.get_hedgehog_by_id"],
+            values={"id": test_hedgehog.id},
+        )
+        assert timing.count == before + 1
+
+
+class TestAsyncpgDatabase:
+    async def test_repositories_read_the_same_through_both_drivers(
+        self,
+        db: Database,
+        native_db: AsyncpgDatabase,
+        test_user: UserInDB,
+        test_hedgehog: HedgehogInDB,
+    ) -> None:
+        wrapped = await HedgehogsRepository(db).get_hedgehog_by_id(
+            id=test_hedgehog.id, requesting_user=test_user
+        )
+        native = await HedgehogsRepository(native_db).get_hedgehog_by_id(
+            id=test_hedgehog.id, requesting_user=test_user
+        )
+        assert native == wrapped
+
+    async def test_queries_are_timed_by_name(
+        self, native_db: AsyncpgDatabase, test_user: UserInDB
+    ) -> None:
+        timing = metrics.histogram("db.query.asyncpg.hedgehogs.create_hedgehog")
+        before = timing.count
+        hedgehog = await HedgehogsRepository(native_db).create_hedgehog(
+            new_hedgehog=HedgehogCreate(
+                name="native hedgehog", age=1.5, color_type="DARK GREY"
+            ),
+            requesting_user=test_user,
+        )
+        assert hedgehog.owner == test_user.id
+        assert timing.count == before + 1
+
+    async def test_transactions_pin_one_connection(
+        self, native_db: AsyncpgDatabase
+    ) -> None:
+        async with native_db.transaction():
+            pid = await native_db.fetch_val("SELECT pg_backend_pid()")
+            async with native_db.transaction():
+                assert await native_db.fetch_val("SELECT pg_backend_pid()") == pid
+            txid = await native_db.fetch_val("SELECT txid_current_if_assigned()")
+            assert txid is None
+
+    async def test_failed_transactions_roll_back(
+        self, native_db: AsyncpgDatabase, test_hedgehog: HedgehogInDB
+    ) -> None:
+        rename = "UPDATE hedgehogs SET name = :name WHERE id = :id"
+        with pytest.raises(RuntimeError):
+            async with native_db.transaction():
+                await native_db.execute(
+                    rename, {"name": "renamed", "id": test_hedgehog.id}
+                )
+                raise RuntimeError("abort")
+
+        name = await native_db.fetch_val(
+            "SELECT name FROM hedgehogs WHERE id = :id", {"id": test_hedgehog.id}
+        )
+        assert name == test_hedgehog.name
@@ -0,0 +1,114 @@
+import asyncio
+from typing import Callable, List
+
+import pytest
+from app.db.events import ChangeListener, change_listener
+from app.models.event import ChangeEvent, ChangeOperation
+from app.models.user import UserInDB
+from databases import Database
+from fastapi import FastAPI, status
+from httpx import AsyncClient
+
+pytestmark = pytest.mark.asyncio
+
+
+async def wait_until(condition: Callable[[], bool], timeout: float = 10.0) -> None:
+    async def poll() -> None:
+        while not condition():
+            await asyncio.sleep(0.05)
+
+    await asyncio.wait_for(poll(), timeout=timeout)
+
+
+class FakeCache:
+    def __init__(self) -> None:
+        self.invalidated: List[ChangeEvent] = []
+        self.cleared = 0
+
+    def invalidate(self, event: ChangeEvent) -> None:
+        self.invalidated.append(event)
+
+    def clear(self) -> None:
+        self.cleared += 1
+
+
+class TestChangeDispatch:
+    async def test_events_reach_caches_registered_for_the_table(self) -> None:
+        listener = ChangeListener()
+        profiles_cache, hedgehogs_cache = FakeCache(), FakeCache()
+        listener.register_cache(profiles_cache, "users", "profiles")
+        listener.register_cache(hedgehogs_cache, "hedgehogs")
+
+        payload = '{"t": "profiles", "op": "U", "id": 3, "o": 7}'
+        listener._on_notification(None, 0, "table_changes", payload)
+        assert profiles_cache.invalidated == [
+            ChangeEvent(table="profiles", op=ChangeOperation.update, id=3, owner=7)
+        ]
+        assert hedgehogs_cache.invalidated == []
+
+        listener.flush()
+        assert profiles_cache.cleared == hedgehogs_cache.cleared == 1
+
+    async def test_unreadable_payload_flushes_everything(self) -> None:
+        listener = ChangeListener()
+        cache = FakeCache()
+        listener.register_cache(cache, "users")
+
+        listener._on_notification(None, 0, "table_changes", "not json")
+        assert cache.invalidated == []
+        assert cache.cleared == 1
+
+
+class TestChangeListener:
+    async def test_profile_update_is_broadcast(
+        self,
+        app: FastAPI,
+        authorized_client: AsyncClient,
+        test_user: UserInDB,
+    ) -> None:
+        received: List[ChangeEvent] = []
+        change_listener.subscribe("profiles", received.append)
+        try:
+            await wait_until(lambda: change_listener.connected)
+            res = await authorized_client.put(
+                app.url_path_for("profiles:update-own-profile"),
+                json={"profile_update": {"bio": "Broadcast me"}},
+            )
+            assert res.status_code == status.HTTP_200_OK
+            await wait_until(
+                lambda: any(event.owner == test_user.id for event in received)
+            )
+        finally:
+            change_listener.unsubscribe("profiles", received.append)
+
+        event = next(event for event in received if event.owner == test_user.id)
+        assert event.op == ChangeOperation.update
+        assert event.id == test_user.profile.id
+
+    async def test_listener_reconnects_and_flushes_after_connection_loss(
+        self,
+        client: AsyncClient,
+        db: Database,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        monkeypatch.setattr(change_listener, "keepalive", 0.1)
+        flushes: List[bool] = []
+
+        def on_flush() -> None:
+            flushes.append(True)
+
+        change_listener.on_flush(on_flush)
+        try:
+            await wait_until(lambda: change_listener.server_pid is not None)
+            old_pid = change_listener.server_pid
+            await db.execute(
+                query="SELECT pg_terminate_backend(:pid)", values={"pid": old_pid}
+            )
+            await wait_until(
+                lambda: change_listener.connected
+                and change_listener.server_pid not in (None, old_pid)
+            )
+        finally:
+            change_listener.remove_flush_handler(on_flush)
+
+        assert len(flushes) >= 1
@@ -0,0 +1,102 @@
+import asyncio
+import time
+
+import pytest
+from app.api.middleware import InFlightRequestsMiddleware
+from app.api.routes import health
+from app.core.monitoring import EventLoopMonitor
+from fastapi import FastAPI, status
+from httpx import AsyncClient
+
+pytestmark = pytest.mark.asyncio
+
+
+class TestEventLoopMonitor:
+    async def test_blocking_the_loop_shows_up_as_lag(self) -> None:
+        monitor = EventLoopMonitor(interval=0.01)
+        await monitor.start()
+        try:
+            await asyncio.sleep(0.02)
+            time.sleep(0.1)
+            await asyncio.sleep(0.02)
+            assert monitor._lag.max >= 0.05
+        finally:
+            await monitor.stop()
+
+
+class TestInFlightRequestsMiddleware:
+    async def test_counts_requests_until_they_finish(self) -> None:
+        release = asyncio.Event()
+
+        async def app(scope, receive, send) -> None:
+            await release.wait()
+
+        middleware = InFlightRequestsMiddleware(app)
+        before = middleware.in_flight.value
+        requests = [
+            asyncio.ensure_future(middleware({"type": "http"}, None, None))
+            for _ in range(3)
+        ]
+        await asyncio.sleep(0)
+        assert middleware.in_flight.value == before + 3
+
+        release.set()
+        await asyncio.gather(*requests)
+        assert middleware.in_flight.value == before
+
+
+class TestHealthRoutes:
+    async def test_liveness(self, app: FastAPI, client: AsyncClient) -> None:
+        res = await client.get(app.url_path_for("health:liveness"))
+        assert res.status_code == status.HTTP_200_OK
+        assert res.json() == {"status": "ok"}
+
+    async def test_ready_when_the_database_answers_in_time(
+        self, app: FastAPI, client: AsyncClient
+    ) -> None:
+        await app.state._warm_up_task
+        res = await client.get(app.url_path_for("health:readiness"))
+        assert res.status_code == status.HTTP_200_OK
+        assert res.json()["status"] == "ok"
+        assert res.json()["ping_ms"] >= 0
+
+    async def test_not_ready_while_the_database_is_unavailable(
+        self, app: FastAPI, client: AsyncClient
+    ) -> None:
+        await app.state._warm_up_task
+        connector = app.state._db_connector
+        connector.available = False
+        try:
+            res = await client.get(app.url_path_for("health:readiness"))
+        finally:
+            connector.available = True
+        assert res.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert res.json()["database"] == "degraded"
+
+        res = await client.get(app.url_path_for("health:liveness"))
+        assert res.status_code == status.HTTP_200_OK
+
+    async def test_not_ready_when_the_ping_is_over_budget(
+        self, app: FastAPI, client: AsyncClient, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        await app.state._warm_up_task
+        monkeypatch.setattr(health, "READINESS_PING_BUDGET_SECONDS", 0)
+        res = await client.get(app.url_path_for("health:readiness"))
+        assert res.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert res.json()["status"] == "unavailable"
+
+    async def test_worker_stats_are_for_superusers(
+        self, app: FastAPI, authorized_client: AsyncClient
+    ) -> None:
+        res = await authorized_client.get(app.url_path_for("health:worker-stats"))
+        assert res.status_code == status.HTTP_403_FORBIDDEN
+
+    async def test_worker_stats(self, app: FastAPI, admin_client: AsyncClient) -> None:
+        res = await admin_client.get(app.url_path_for("health:worker-stats"))
+        assert res.status_code == status.HTTP_200_OK
+        stats = res.json()
+        assert stats["database"] == "ok"
+        primary = stats["pools"][0]
+        assert primary["size"] == primary["idle"] + primary["in_use"]
+        assert "hit_ratio" in stats["caches"]["profiles"]
+        assert stats["event_loop_lag"]["max_ms"] >= 0
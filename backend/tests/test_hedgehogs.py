@@ -1,5 +1,8 @@
+import re
+from datetime import datetime, timezone
 from typing import Dict, List, Optional, Union
 
+import app.db.repositories.queries.hedgehogs as query
 import pytest
 from app.db.repositories.hedgehogs import HedgehogsRepository
 from app.models.hedgehog import HedgehogCreate, HedgehogInDB, HedgehogPublic
@@ -285,6 +288,39 @@ class TestDeleteHedgehog:
         )
         assert res.status_code == status.HTTP_403_FORBIDDEN
 
+    async def test_deleted_hedgehog_is_kept_but_hidden(
+        self,
+        app: FastAPI,
+        authorized_client: AsyncClient,
+        db: Database,
+        test_user: UserInDB,
+        new_hedgehog: HedgehogCreate,
+    ) -> None:
+        hedgehog = await HedgehogsRepository(db).create_hedgehog(
+            new_hedgehog=new_hedgehog, requesting_user=test_user
+        )
+        url = app.url_path_for(
+            "hedgehogs:delete-hedgehog-by-id", hedgehog_id=hedgehog.id
+        )
+        res = await authorized_client.delete(url)
+        assert res.status_code == status.HTTP_200_OK
+
+        res = await authorized_client.get(
+            app.url_path_for("hedgehogs:get-hedgehog-by-id", hedgehog_id=hedgehog.id)
+        )
+        assert res.status_code == status.HTTP_404_NOT_FOUND
+        res = await authorized_client.get(
+            app.url_path_for("hedgehogs:list-all-user-hedgehogs")
+        )
+        assert hedgehog.id not in [item["id"] for item in res.json()]
+        assert (await authorized_client.delete(url)).status_code == 404
+
+        deleted_at = await db.fetch_val(
+            query="SELECT deleted_at FROM hedgehogs WHERE id = :id",
+            values={"id": hedgehog.id},
+        )
+        assert deleted_at is not None
+
     @pytest.mark.parametrize(
         "id, status_code",
         ((5000000, 404), (0, 422), (-1, 422), (None, 422)),
@@ -301,3 +337,287 @@ class TestDeleteHedgehog:
             app.url_path_for("hedgehogs:delete-hedgehog-by-id", hedgehog_id=id)
         )
         assert res.status_code == status_code
+
+
+class TestSparseFieldsets:
+    async def test_list_returns_only_requested_fields(
+        self,
+        app: FastAPI,
+        authorized_client: AsyncClient,
+        db: Database,
+        test_hedgehog: HedgehogInDB,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        queries = []
+        fetch_all = db.fetch_all
+
+        async def recording_fetch_all(query, values=None):
+            queries.append(query)
+            return await fetch_all(query=query, values=values)
+
+        monkeypatch.setattr(db, "fetch_all", recording_fetch_all)
+        res = await authorized_client.get(
+            app.url_path_for("hedgehogs:list-all-user-hedgehogs"),
+            params={"fields": "id,name,color_type"},
+        )
+        assert res.status_code == status.HTTP_200_OK
+        expected = test_hedgehog.dict(include={"id", "name", "color_type"})
+        assert expected in res.json()
+        assert all(set(item) == {"id", "name", "color_type"} for item in res.json())
+        assert "description" not in queries[-1]
+
+    async def test_detail_returns_only_requested_fields(
+        self, app: FastAPI, authorized_client: AsyncClient, test_hedgehog: HedgehogInDB
+    ) -> None:
+        res = await authorized_client.get(
+            app.url_path_for(
+                "hedgehogs:get-hedgehog-by-id", hedgehog_id=test_hedgehog.id
+            ),
+            params={"fields": "name"},
+        )
+        assert res.status_code == status.HTTP_200_OK
+        assert res.json() == {"name": test_hedgehog.name}
+
+    @pytest.mark.parametrize("fields", ("password", "name,salt", ","))
+    async def test_unknown_fields_are_rejected(
+        self, app: FastAPI, authorized_client: AsyncClient, fields: str
+    ) -> None:
+        res = await authorized_client.get(
+            app.url_path_for("hedgehogs:list-all-user-hedgehogs"),
+            params={"fields": fields},
+        )
+        assert res.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+@pytest.fixture
+async def searchable_hedgehogs(db: Database, test_user: UserInDB) -> List[HedgehogInDB]:
+    hedgehog_repo = HedgehogsRepository(db)
+    hedgehogs = [
+        ("Marzipan", "Loves burrowing under blankets"),
+        ("Marzipan Junior", "Small and curious"),
+        ("Biscuit", "Snores loudly while burrowing"),
+    ] + [(f"Pumpernickel {i}", "Pumpernickel loves mealworms") for i in range(7)]
+    return [
+        await hedgehog_repo.create_hedgehog(
+            new_hedgehog=HedgehogCreate(
+                name=name, description=description, age=1.0, color_type="DARK GREY"
+            ),
+            requesting_user=test_user,
+        )
+        for name, description in hedgehogs
+    ]
+
+
+class TestSearchHedgehogs:
+    async def search(self, app: FastAPI, client: AsyncClient, **params) -> Dict:
+        res = await client.get(
+            app.url_path_for("hedgehogs:search-hedgehogs"), params=params
+        )
+        assert res.status_code == status.HTTP_200_OK
+        return res.json()
+
+    async def test_names_rank_above_descriptions(
+        self,
+        app: FastAPI,
+        authorized_client: AsyncClient,
+        searchable_hedgehogs: List[HedgehogInDB],
+    ) -> None:
+        page = await self.search(app, authorized_client, q="marzipan")
+        names = [item["name"] for item in page["results"]]
+        assert names[:2] == ["Marzipan", "Marzipan Junior"]
+
+        page = await self.search(app, authorized_client, q="burrowing")
+        names = {item["name"] for item in page["results"]}
+        assert {"Marzipan", "Biscuit"} <= names
+
+    async def test_misspelled_names_still_match(
+        self,
+        app: FastAPI,
+        authorized_client: AsyncClient,
+        searchable_hedgehogs: List[HedgehogInDB],
+    ) -> None:
+        page = await self.search(app, authorized_client, q="Biscit")
+        assert "Biscuit" in [item["name"] for item in page["results"]]
+
+    async def test_keyset_pages_cover_every_match_once(
+        self,
+        app: FastAPI,
+        authorized_client: AsyncClient,
+        searchable_hedgehogs: List[HedgehogInDB],
+    ) -> None:
+        seen, cursor = [], None
+        while True:
+            params = {"q": "pumpernickel", "limit": 3}
+            if cursor:
+                params["cursor"] = cursor
+            page = await self.search(app, authorized_client, **params)
+            assert len(page["results"]) <= 3
+            seen.extend(item["id"] for item in page["results"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+
+        expected = {h.id for h in searchable_hedgehogs if h.name.startswith("Pump")}
+        assert len(seen) == len(set(seen))
+        assert expected <= set(seen)
+
+    async def test_invalid_cursor_is_rejected(
+        self, app: FastAPI, authorized_client: AsyncClient
+    ) -> None:
+        res = await authorized_client.get(
+            app.url_path_for("hedgehogs:search-hedgehogs"),
+            params={"q": "marzipan", "cursor": "not-a-cursor"},
+        )
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
+
+
+class TestBrowseCatalog:
+    async def browse(self, app: FastAPI, client: AsyncClient, **params) -> Dict:
+        res = await client.get(
+            app.url_path_for("hedgehogs:browse-catalog"), params=params
+        )
+        assert res.status_code == status.HTTP_200_OK
+        return res.json()
+
+    async def test_catalog_is_public_and_spans_owners(
+        self,
+        app: FastAPI,
+        client: AsyncClient,
+        test_hedgehog: HedgehogInDB,
+        test_hedgehogs_list: List[HedgehogInDB],
+    ) -> None:
+        page = await self.browse(app, client, limit=100)
+        owners = {item["owner"] for item in page["results"]}
+        assert {test_hedgehog.owner, test_hedgehogs_list[0].owner} <= owners
+        assert page["total"] >= len(test_hedgehogs_list) + 1
+
+    async def test_filters_narrow_results_and_exact_small_totals(
+        self,
+        app: FastAPI,
+        client: AsyncClient,
+        searchable_hedgehogs: List[HedgehogInDB],
+    ) -> None:
+        page = await self.browse(
+            app,
+            client,
+            color_type="DARK GREY",
+            min_age=0.5,
+            max_age=1.5,
+            name="mpernick",
+        )
+        assert page["results"]
+        for item in page["results"]:
+            assert item["color_type"] == "DARK GREY"
+            assert 0.5 <= item["age"] <= 1.5
+            assert "mpernick" in item["name"].lower()
+        assert page["total_is_estimate"] is False
+        assert page["total"] >= 7
+
+        page = await self.browse(app, client, name="100%_sure")
+        assert page["results"] == []
+        assert page["total"] == 0
+
+    async def test_pages_follow_the_cursor_without_overlap(
+        self,
+        app: FastAPI,
+        client: AsyncClient,
+        searchable_hedgehogs: List[HedgehogInDB],
+    ) -> None:
+        first = await self.browse(app, client, name="Pumpernickel", limit=4)
+        second = await self.browse(
+            app, client, name="Pumpernickel", limit=4, cursor=first["next_cursor"]
+        )
+        first_ids = [item["id"] for item in first["results"]]
+        second_ids = [item["id"] for item in second["results"]]
+        assert len(first_ids) == 4
+        assert not set(first_ids) & set(second_ids)
+        assert first_ids + second_ids == sorted(first_ids + second_ids, reverse=True)
+
+    async def test_inverted_age_range_is_rejected(
+        self, app: FastAPI, client: AsyncClient
+    ) -> None:
+        res = await client.get(
+            app.url_path_for("hedgehogs:browse-catalog"),
+            params={"min_age": 3, "max_age": 1},
+        )
+        assert res.status_code == status.HTTP_400_BAD_REQUEST
+
+
+class TestArchiveDeletedHedgehogs:
+    async def test_old_deleted_hedgehogs_move_to_the_archive(
+        self, client: AsyncClient, db: Database, test_user: UserInDB
+    ) -> None:
+        hedgehogs_repo = HedgehogsRepository(db)
+        hedgehogs = [
+            await hedgehogs_repo.create_hedgehog(
+                new_hedgehog=HedgehogCreate(
+                    name=f"archived hedgehog {i}", age=1.0, color_type="CHOCOLATE"
+                ),
+                requesting_user=test_user,
+            )
+            for i in range(3)
+        ]
+        for hedgehog in hedgehogs:
+            await hedgehogs_repo.delete_hedgehog_by_id(hedgehog=hedgehog)
+        ids = [hedgehog.id for hedgehog in hedgehogs]
+        # Two were deleted long ago, the last one only just now.
+        await db.execute(
+            query="""
+                UPDATE hedgehogs
+                SET deleted_at = TIMESTAMPTZ '2026-01-31 23:30:00+00'
+                WHERE id = ANY(:ids)
+            """,
+            values={"ids": ids[:2]},
+        )
+
+        archived = await hedgehogs_repo.archive_deleted_hedgehogs(
+            deleted_before=datetime(2026, 6, 1, tzinfo=timezone.utc), batch_size=1
+        )
+        assert archived >= 2
+
+        remaining = await db.fetch_all(
+            query="SELECT id FROM hedgehogs WHERE id = ANY(:ids)", values={"ids": ids}
+        )
+        assert [row["id"] for row in remaining] == ids[2:]
+        archive = await db.fetch_all(
+            query="""
+                SELECT id, tableoid::regclass::text AS partition
+                FROM hedgehogs_archive
+                WHERE id = ANY(:ids)
+                ORDER BY id
+            """,
+            values={"ids": ids},
+        )
+        assert [row["id"] for row in archive] == ids[:2]
+        assert {row["partition"] for row in archive} == {"hedgehogs_archive_2026_01"}
+
+
+class TestHedgehogPartitions:
+    async def test_detail_lookup_only_scans_the_owners_partition(
+        self,
+        client: AsyncClient,
+        db: Database,
+        test_user: UserInDB,
+        new_hedgehog: HedgehogCreate,
+    ) -> None:
+        hedgehog = await HedgehogsRepository(db).create_hedgehog(
+            new_hedgehog=new_hedgehog, requesting_user=test_user
+        )
+        owner = await db.fetch_val(
+            query="SELECT owner FROM hedgehog_owners WHERE id = :id",
+            values={"id": hedgehog.id},
+        )
+        assert owner == test_user.id
+
+        plan = await db.fetch_all(
+            query=f"EXPLAIN (ANALYZE) {query.GET_HEDGEHOG_BY_ID_QUERY}",
+            values={"id": hedgehog.id},
+        )
+        # Pruned partitions are either left out of the plan or never executed.
+        scanned = {
+            match.group(1)
+            for row in plan
+            if "never executed" not in row[0]
+            for match in re.finditer(r"on (hedgehogs_p\d+)\b", row[0])
+        }
+        assert len(scanned) == 1
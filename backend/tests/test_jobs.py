@@ -0,0 +1,160 @@
+import asyncio
+from typing import List
+
+import pytest
+from app.core.metrics import metrics
+from app.core.worker import Worker
+from app.db.repositories.jobs import JobsRepository
+from app.models.job import JobCreate, JobInDB, JobStatus
+from app.services.jobs import JobRegistry, get_retry_delay
+from databases import Database
+from httpx import AsyncClient
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def registry() -> JobRegistry:
+    return JobRegistry()
+
+
+class TestJobsRepository:
+    async def test_enqueued_job_can_be_claimed_once(
+        self, client: AsyncClient, db: Database
+    ) -> None:
+        jobs_repo = JobsRepository(db)
+        job = await jobs_repo.enqueue_job(
+            new_job=JobCreate(task="test:claim-once", payload={"value": 1})
+        )
+        assert job.status == JobStatus.queued
+        assert job.payload == {"value": 1}
+
+        claimed = await jobs_repo.claim_next_job(
+            tasks=["test:claim-once"], lock_timeout=60
+        )
+        assert claimed.id == job.id
+        assert claimed.status == JobStatus.running
+        assert claimed.attempts == 1
+
+        assert (
+            await jobs_repo.claim_next_job(tasks=["test:claim-once"], lock_timeout=60)
+            is None
+        )
+
+    async def test_concurrent_claims_skip_locked_jobs(
+        self, client: AsyncClient, db: Database
+    ) -> None:
+        jobs_repo = JobsRepository(db)
+        for i in range(4):
+            await jobs_repo.enqueue_job(
+                new_job=JobCreate(task="test:skip-locked", payload={"i": i})
+            )
+
+        async def claim() -> JobInDB:
+            return await JobsRepository(db).claim_next_job(
+                tasks=["test:skip-locked"], lock_timeout=60
+            )
+
+        claimed: List[JobInDB] = await asyncio.gather(*(claim() for _ in range(4)))
+        assert len({job.id for job in claimed}) == 4
+
+    async def test_job_enqueued_in_rolled_back_transaction_is_discarded(
+        self, client: AsyncClient, db: Database
+    ) -> None:
+        jobs_repo = JobsRepository(db)
+        with pytest.raises(RuntimeError):
+            async with db.transaction():
+                job = await jobs_repo.enqueue_job(
+                    new_job=JobCreate(task="test:rolled-back")
+                )
+                raise RuntimeError("abort")
+        assert await jobs_repo.get_job_by_id(id=job.id) is None
+
+
+class TestWorker:
+    async def test_worker_runs_registered_handler(
+        self, client: AsyncClient, db: Database, registry: JobRegistry
+    ) -> None:
+        seen = []
+
+        @registry.task("test:succeeds")
+        async def succeeds(*, db: Database, job: JobInDB) -> None:
+            seen.append(job.payload["name"])
+
+        jobs_repo = JobsRepository(db)
+        job = await jobs_repo.enqueue_job(
+            new_job=JobCreate(task="test:succeeds", payload={"name": "hedgehog"})
+        )
+        completed = metrics.counter("jobs.completed").value
+
+        assert await Worker(db, registry=registry).run_once()
+        assert seen == ["hedgehog"]
+        assert (await jobs_repo.get_job_by_id(id=job.id)).status == JobStatus.done
+        assert metrics.counter("jobs.completed").value == completed + 1
+
+    async def test_failing_job_is_retried_with_backoff_then_failed(
+        self, client: AsyncClient, db: Database, registry: JobRegistry
+    ) -> None:
+        @registry.task("test:fails")
+        async def fails(*, db: Database, job: JobInDB) -> None:
+            raise ValueError("boom")
+
+        jobs_repo = JobsRepository(db)
+        job = await jobs_repo.enqueue_job(
+            new_job=JobCreate(task="test:fails", max_attempts=2)
+        )
+        worker = Worker(db, registry=registry)
+
+        assert await worker.run_once()
+        retried = await jobs_repo.get_job_by_id(id=job.id)
+        assert retried.status == JobStatus.queued
+        assert retried.attempts == 1
+        assert retried.last_error == "ValueError: boom"
+        assert retried.run_at > job.run_at
+        # the backoff delay keeps the job out of reach for now
+        assert not await worker.run_once()
+
+        await db.execute(
+            query="UPDATE jobs SET run_at = now() WHERE id = :id", values={"id": job.id}
+        )
+        assert await worker.run_once()
+        failed = await jobs_repo.get_job_by_id(id=job.id)
+        assert failed.status == JobStatus.failed
+        assert failed.attempts == 2
+
+    async def test_periodic_task_is_scheduled_once_and_after_each_run(
+        self, client: AsyncClient, db: Database, registry: JobRegistry
+    ) -> None:
+        @registry.task("test:periodic", every=60)
+        async def periodic(*, db: Database, job: JobInDB) -> None:
+            pass
+
+        jobs_repo = JobsRepository(db)
+        first = await jobs_repo.schedule_job_once(
+            new_job=JobCreate(task="test:periodic")
+        )
+        assert first is not None
+        assert (
+            await jobs_repo.schedule_job_once(new_job=JobCreate(task="test:periodic"))
+            is None
+        )
+
+        assert await Worker(db, registry=registry).run_once()
+        assert (await jobs_repo.get_job_by_id(id=first.id)).status == JobStatus.done
+        queued = await db.fetch_all(
+            query="""
+                SELECT id, run_at - now() AS delay
+                FROM jobs
+                WHERE task = 'test:periodic' AND status = 'queued'
+            """
+        )
+        assert len(queued) == 1
+        assert 50 < queued[0]["delay"].total_seconds() <= 60
+
+    @pytest.mark.parametrize(
+        "attempts, delay", ((1, 2.0), (2, 4.0), (3, 8.0), (20, 600.0))
+    )
+    async def test_retry_delay_grows_exponentially(
+        self, attempts: int, delay: float
+    ) -> None:
+        assert get_retry_delay(attempts, base=2.0, cap=600.0) == delay
@@ -0,0 +1,141 @@
+import asyncio
+from typing import Callable, Dict, List
+
+import pytest
+from app.db.loaders import BatchLoader
+from app.db.repositories.hedgehogs import HedgehogsRepository
+from app.models.hedgehog import HedgehogCreate, HedgehogPublic
+from app.models.user import UserInDB, UserPublic
+from databases import Database
+from fastapi import FastAPI, status
+from httpx import AsyncClient
+
+pytestmark = pytest.mark.asyncio
+
+
+class RecordingBatch:
+    def __init__(self, error: Exception = None) -> None:
+        self.batches: List[List[int]] = []
+        self.error = error
+
+    async def __call__(self, keys: List[int]) -> Dict[int, str]:
+        self.batches.append(keys)
+        if self.error is not None:
+            raise self.error
+        return {key: f"value {key}" for key in keys if key != 404}
+
+
+def count_queries(db: Database, monkeypatch: pytest.MonkeyPatch) -> Callable[[], int]:
+    calls = []
+    for method in ("fetch_one", "fetch_all", "fetch_val", "execute"):
+        original = getattr(db, method)
+
+        async def counted(*args, _original=original, **kwargs):
+            calls.append(1)
+            return await _original(*args, **kwargs)
+
+        monkeypatch.setattr(db, method, counted)
+    return lambda: len(calls)
+
+
+class TestBatchLoader:
+    async def test_loads_in_the_same_tick_share_one_batch(self) -> None:
+        batch = RecordingBatch()
+        loader = BatchLoader("test-batch", batch)
+
+        values = await asyncio.gather(loader.load(1), loader.load(2), loader.load(1))
+        assert values == ["value 1", "value 2", "value 1"]
+        assert batch.batches == [[1, 2]]
+
+    async def test_loaded_keys_are_remembered(self) -> None:
+        batch = RecordingBatch()
+        loader = BatchLoader("test-remember", batch)
+
+        assert await loader.load_many([1, 2, 404]) == {
+            1: "value 1",
+            2: "value 2",
+            404: None,
+        }
+        await loader.load_many([2, 3])
+        assert batch.batches == [[1, 2, 404], [3]]
+
+    async def test_batch_errors_reach_every_load_and_are_not_remembered(
+        self,
+    ) -> None:
+        batch = RecordingBatch(error=RuntimeError("boom"))
+        loader = BatchLoader("test-error", batch)
+
+        results = await asyncio.gather(
+            loader.load(1), loader.load(2), return_exceptions=True
+        )
+        assert all(isinstance(result, RuntimeError) for result in results)
+
+        batch.error = None
+        assert await loader.load(1) == "value 1"
+
+
+class TestOwnerExpansion:
+    async def test_hedgehog_owner_is_expanded_on_request(
+        self,
+        app: FastAPI,
+        authorized_client: AsyncClient,
+        db: Database,
+        test_user2: UserInDB,
+    ) -> None:
+        hedgehog = await HedgehogsRepository(db).create_hedgehog(
+            new_hedgehog=HedgehogCreate(
+                name="someone else's hedgehog", age=1.0, color_type="CHOCOLATE"
+            ),
+            requesting_user=test_user2,
+        )
+        url = app.url_path_for("hedgehogs:get-hedgehog-by-id", hedgehog_id=hedgehog.id)
+        res = await authorized_client.get(url)
+        assert res.json()["owner"] == test_user2.id
+
+        res = await authorized_client.get(url, params={"expand": "owner"})
+        assert res.status_code == status.HTTP_200_OK
+        owner = HedgehogPublic(**res.json()).owner
+        assert isinstance(owner, UserPublic)
+        assert owner.id == test_user2.id
+        assert owner.username == test_user2.username
+        assert owner.profile.user_id == test_user2.id
+
+    async def test_unknown_expansion_is_rejected(
+        self, app: FastAPI, authorized_client: AsyncClient
+    ) -> None:
+        res = await authorized_client.get(
+            app.url_path_for("hedgehogs:list-all-user-hedgehogs"),
+            params={"expand": "password"},
+        )
+        assert res.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+    async def test_query_count_does_not_grow_with_list_length(
+        self,
+        app: FastAPI,
+        authorized_client: AsyncClient,
+        db: Database,
+        test_user: UserInDB,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        hedgehogs_repo = HedgehogsRepository(db)
+        url = app.url_path_for("hedgehogs:list-all-user-hedgehogs")
+        query_count = count_queries(db, monkeypatch)
+
+        counts = []
+        for _ in range(2):
+            for i in range(5):
+                await hedgehogs_repo.create_hedgehog(
+                    new_hedgehog=HedgehogCreate(
+                        name=f"expanded hedgehog {i}", age=1.0, color_type="CHOCOLATE"
+                    ),
+                    requesting_user=test_user,
+                )
+            before = query_count()
+            res = await authorized_client.get(url, params={"expand": "owner"})
+            counts.append(query_count() - before)
+
+            assert res.status_code == status.HTTP_200_OK
+            owners = [HedgehogPublic(**item).owner for item in res.json()]
+            assert all(owner.id == test_user.id for owner in owners)
+
+        assert counts[0] == counts[1]
@@ -0,0 +1,91 @@
+import asyncio
+import smtplib
+
+import pytest
+from app.core.metrics import metrics
+from app.services.mail import MailService, MailServiceClosed
+
+from tests.utility import SMTPStandIn
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+async def mailer(smtp_server: SMTPStandIn) -> MailService:
+    mailer = MailService(
+        host="127.0.0.1",
+        port=smtp_server.port,
+        batch_size=25,
+        batch_wait=0.01,
+        pool_size=2,
+    )
+    yield mailer
+    await mailer.close()
+
+
+class TestMailPipeline:
+    async def test_concurrent_messages_share_pooled_connections(
+        self, smtp_server: SMTPStandIn, mailer: MailService
+    ) -> None:
+        messages = [
+            mailer.build_message(
+                to=f"hedgehog{i}@mail.com", subject="hello", body="hi there"
+            )
+            for i in range(200)
+        ]
+        batches = metrics.histogram("mail.batch_size")
+        before = batches.count
+        await asyncio.gather(*(mailer.send(message) for message in messages))
+
+        assert len(smtp_server.messages) == 200
+        # Batched messages, and every session carried more than one batch.
+        assert smtp_server.connections <= mailer.pool_size
+        assert smtp_server.connections < batches.count - before < len(messages)
+        assert metrics.gauge("mail.messages_per_second").value > 0
+
+    async def test_refused_recipient_only_fails_its_own_message(
+        self, smtp_server: SMTPStandIn, mailer: MailService
+    ) -> None:
+        smtp_server.refused.add("refused@mail.com")
+        refused = mailer.build_message(to="refused@mail.com", subject="s", body="b")
+        accepted = mailer.build_message(to="accepted@mail.com", subject="s", body="b")
+
+        results = await asyncio.gather(
+            mailer.send(refused), mailer.send(accepted), return_exceptions=True
+        )
+        assert isinstance(results[0], smtplib.SMTPRecipientsRefused)
+        assert results[1] is None
+        assert [m["To"] for m in smtp_server.messages] == ["accepted@mail.com"]
+
+    async def test_send_fails_when_server_is_unreachable(self) -> None:
+        server = SMTPStandIn()
+        await server.start()
+        port = server.port
+        await server.stop()
+
+        mailer = MailService(host="127.0.0.1", port=port, timeout=1)
+        message = mailer.build_message(to="a@mail.com", subject="s", body="b")
+        with pytest.raises(OSError):
+            await mailer.send(message)
+        await mailer.close()
+
+    async def test_close_delivers_queued_messages_and_rejects_new_ones(
+        self, smtp_server: SMTPStandIn
+    ) -> None:
+        mailer = MailService(
+            host="127.0.0.1", port=smtp_server.port, batch_size=5, batch_wait=10
+        )
+        messages = [
+            mailer.build_message(to=f"queued{i}@mail.com", subject="s", body="b")
+            for i in range(12)
+        ]
+        sends = [asyncio.ensure_future(mailer.send(m)) for m in messages]
+        await asyncio.sleep(0.01)
+        await mailer.close()
+
+        assert all(send.done() for send in sends)
+        await asyncio.gather(*sends)
+        assert len(smtp_server.messages) == 12
+        late = mailer.build_message(to="late@mail.com", subject="s", body="b")
+        with pytest.raises(MailServiceClosed):
+            await mailer.send(late)
@@ -2,6 +2,8 @@ import pytest
 from app.db.repositories.profiles import ProfilesRepository
 from app.models.profile import ProfileInDB, ProfilePublic
 from app.models.user import UserInDB, UserPublic
+from app.services import profile_cache
+from app.services.cache import user_tag
 from databases import Database
 from fastapi import FastAPI, status
 from httpx import AsyncClient
@@ -139,3 +141,98 @@ class TestProfileManagement:
             json={"profile_update": {attr: value}},
         )
         assert res.status_code == status_code
+
+
+class TestProfileCache:
+    async def test_repeated_profile_reads_are_served_from_cache(
+        self,
+        app: FastAPI,
+        authorized_client: AsyncClient,
+        test_user2: UserInDB,
+    ) -> None:
+        url = app.url_path_for(
+            "profiles:get-profile-by-username", username=test_user2.username
+        )
+        first = await authorized_client.get(url)
+        hits = profile_cache.stats()["hits"]
+        second = await authorized_client.get(url)
+
+        assert second.status_code == status.HTTP_200_OK
+        assert second.content == first.content
+        assert profile_cache.stats()["hits"] == hits + 1
+
+    async def test_updating_own_profile_invalidates_cached_response(
+        self,
+        app: FastAPI,
+        authorized_client: AsyncClient,
+        test_user: UserInDB,
+    ) -> None:
+        url = app.url_path_for(
+            "profiles:get-profile-by-username", username=test_user.username
+        )
+        await authorized_client.get(url)
+        res = await authorized_client.put(
+            app.url_path_for("profiles:update-own-profile"),
+            json={"profile_update": {"bio": "Freshly cached bio"}},
+        )
+        assert res.status_code == status.HTTP_200_OK
+
+        res = await authorized_client.get(url)
+        assert ProfilePublic(**res.json()).bio == "Freshly cached bio"
+
+    async def test_reads_racing_an_update_are_not_cached(
+        self,
+        app: FastAPI,
+        authorized_client: AsyncClient,
+        test_user2: UserInDB,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        get_profile = ProfilesRepository.get_profile_by_username
+
+        async def read_then_update(self, **kwargs) -> ProfileInDB:
+            profile = await get_profile(self, **kwargs)
+            # An update commits and invalidates after the read saw old data.
+            await profile_cache.invalidate_tags(user_tag(test_user2.id))
+            return profile
+
+        monkeypatch.setattr(
+            ProfilesRepository, "get_profile_by_username", read_then_update
+        )
+        url = app.url_path_for(
+            "profiles:get-profile-by-username", username=test_user2.username
+        )
+        await profile_cache.invalidate_tags(user_tag(test_user2.id))
+        res = await authorized_client.get(url)
+        assert res.status_code == status.HTTP_200_OK
+        assert await profile_cache.get(f"username:{test_user2.username}") is None
+
+
+class TestProfileSparseFieldsets:
+    async def test_profile_returns_only_requested_fields(
+        self,
+        app: FastAPI,
+        authorized_client: AsyncClient,
+        test_user2: UserInDB,
+    ) -> None:
+        url = app.url_path_for(
+            "profiles:get-profile-by-username", username=test_user2.username
+        )
+        full = await authorized_client.get(url)
+        res = await authorized_client.get(url, params={"fields": "username,bio"})
+
+        assert res.status_code == status.HTTP_200_OK
+        assert res.json() == {
+            "username": test_user2.username,
+            "bio": full.json()["bio"],
+        }
+
+    async def test_unknown_profile_fields_are_rejected(
+        self, app: FastAPI, authorized_client: AsyncClient, test_user2: UserInDB
+    ) -> None:
+        res = await authorized_client.get(
+            app.url_path_for(
+                "profiles:get-profile-by-username", username=test_user2.username
+            ),
+            params={"fields": "password"},
+        )
+        assert res.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
@@ -0,0 +1,49 @@
+import pytest
+from app.db.registry import QueryRegistry, compile_query, query_registry
+from app.db.repositories.queries import users
+from app.db.repositories.queries.hedgehogs import GET_HEDGEHOG_BY_ID_QUERY
+
+pytestmark = pytest.mark.asyncio
+
+
+class TestCompileQuery:
+    async def test_named_parameters_become_positional(self) -> None:
+        compiled = compile_query("SELECT :a, :b, :a + 1, c::text FROM t")
+        assert compiled.sql == "SELECT $1, $2, $1 + 1, c::text FROM t"
+        assert compiled.params == ("a", "b")
+
+    async def test_escaped_colons_are_not_parameters(self) -> None:
+        compiled = compile_query("SELECT '12\\:30'")
+        assert (compiled.sql, compiled.params) == ("SELECT '12:30'", ())
+
+    async def test_bind_orders_values_and_requires_all_of_them(self) -> None:
+        compiled = compile_query("SELECT :b, :a")
+        assert compiled.bind({"a": 1, "b": 2, "unused": 3}) == [2, 1]
+        with pytest.raises(KeyError):
+            compiled.bind({"a": 1})
+
+    async def test_compiling_the_same_text_is_cached(self) -> None:
+        sql = "SELECT :id FROM hedgehogs"
+        assert compile_query(sql, name="test") is compile_query(sql, name="test")
+
+
+class TestQueryRegistry:
+    async def test_constants_are_registered_by_module_and_name(self) -> None:
+        compiled = query_registry["hedgehogs.get_hedgehog_by_id"]
+        assert ":id" not in compiled.sql
+        assert compiled.params == ("id",)
+        assert query_registry.lookup(GET_HEDGEHOG_BY_ID_QUERY) is compiled
+        assert query_registry.name_of(GET_HEDGEHOG_BY_ID_QUERY) == compiled.name
+
+    async def test_templates_are_left_to_call_time(self) -> None:
+        registry = QueryRegistry()
+        registry.register_module(users)
+        assert "users.get_user_by_email" in registry
+        assert "users.list_users" not in registry
+        compiled = registry.lookup(users.LIST_USERS_QUERY.format(where="TRUE"))
+        assert compiled.name == "unnamed"
+        assert compiled.params == ("limit",)
+
+    async def test_unknown_names_fail_loudly(self) -> None:
+        with pytest.raises(KeyError):
+            query_registry.resolve("users.get_user_by_nickname")
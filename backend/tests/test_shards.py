@@ -0,0 +1,309 @@
+import os
+from argparse import Namespace
+from typing import List
+
+import alembic
+import pytest
+import sqlalchemy
+from alembic.config import Config
+from app.core.worker import Worker
+from app.db import shards as shards_module
+from app.db.events import ChangeListener
+from app.db.repositories.hedgehogs import HedgehogsRepository
+from app.db.repositories.jobs import JobsRepository
+from app.db.repositories.user_stats import UserStatsRepository
+from app.db.repositories.users import UsersRepository
+from app.db.shards import (
+    ShardLayoutError,
+    ShardRouter,
+    ShardsNotConnectedError,
+    check_shard_layout,
+    get_shard_router,
+)
+from app.models.event import ChangeEvent
+from app.models.hedgehog import HedgehogCreate, HedgehogInDB
+from app.models.user import UserCreate, UserInDB
+from app.services import job_handlers
+from app.services.jobs import DELETE_ACCOUNT_TASK
+from databases import Database
+from httpx import AsyncClient
+
+from tests.test_events import wait_until
+
+pytestmark = pytest.mark.asyncio
+
+SHARD_NAMES = ("hedgehogs_shard_1", "hedgehogs_shard_2")
+
+
+@pytest.fixture(scope="module")
+def shard_dsns() -> List[str]:
+    """
+    Extra databases in the test container, migrated as shards.
+    """
+    primary_dsn = os.environ["CONTAINER_DSN"]
+    engine = sqlalchemy.create_engine(primary_dsn, isolation_level="AUTOCOMMIT")
+    dsns = []
+    try:
+        for name in SHARD_NAMES:
+            engine.execute(f"DROP DATABASE IF EXISTS {name}")
+            engine.execute(f"CREATE DATABASE {name}")
+            dsns.append(f"{primary_dsn.rsplit('/', 1)[0]}/{name}")
+            os.environ["CONTAINER_DSN"] = dsns[-1]
+            config = Config("alembic.ini", cmd_opts=Namespace(x=["shard=true"]))
+            alembic.command.upgrade(config, "head")
+    finally:
+        os.environ["CONTAINER_DSN"] = primary_dsn
+        engine.dispose()
+    return dsns
+
+
+@pytest.fixture
+async def shards(
+    client: AsyncClient, db: Database, shard_dsns: List[str]
+) -> ShardRouter:
+    databases = [Database(dsn, min_size=1, max_size=2) for dsn in shard_dsns]
+    for database in databases:
+        await database.connect()
+    yield ShardRouter([db, *databases])
+    for database in databases:
+        await database.disconnect()
+
+
+@pytest.fixture
+async def shard_owners(db: Database) -> List[UserInDB]:
+    """
+    Consecutive user ids, so the owners cover every shard.
+    """
+    users_repo = UsersRepository(db)
+    owners = []
+    for i in range(len(SHARD_NAMES) + 1):
+        new_user = UserCreate(
+            email=f"shard_owner_{i}@mail.com",
+            username=f"shard_owner_{i}",
+            password="shardedpassword",
+        )
+        user = await users_repo.get_user_by_email(email=new_user.email)
+        owners.append(user or await users_repo.register_new_user(new_user=new_user))
+    return owners
+
+
+async def create_hedgehogs(
+    repo: HedgehogsRepository, owners: List[UserInDB], name: str
+) -> List[HedgehogInDB]:
+    return [
+        await repo.create_hedgehog(
+            new_hedgehog=HedgehogCreate(name=name, age=1.0, color_type="CHOCOLATE"),
+            requesting_user=owner,
+        )
+        for owner in owners
+    ]
+
+
+async def register_owner_off_primary(
+    users_repo: UsersRepository, shards: ShardRouter, username: str
+) -> UserInDB:
+    """
+    A new user whose hedgehogs live on a shard other than the primary.
+    """
+    for i in range(shards.count):
+        user = await users_repo.register_new_user(
+            new_user=UserCreate(
+                email=f"{username}_{i}@mail.com",
+                username=f"{username}_{i}",
+                password="shardedpassword",
+            )
+        )
+        if shards.shard_for_owner(user.id) != 0:
+            return user
+    raise AssertionError("consecutive user ids should reach another shard")
+
+
+async def count_owner_rows(shard: Database, table: str, column: str, owner: int) -> int:
+    return await shard.fetch_val(
+        query=f"SELECT count(*) FROM {table} WHERE {column} = :owner",
+        values={"owner": owner},
+    )
+
+
+class TestShardRouter:
+    async def test_owners_and_ids_map_to_the_same_shard(self) -> None:
+        router = ShardRouter(["primary", "shard_1", "shard_2"])
+        assert router.count == 3
+        assert router.primary == "primary"
+        assert [router.for_owner(owner) for owner in (3, 4, 5)] == [
+            "primary",
+            "shard_1",
+            "shard_2",
+        ]
+        # shard i of 3 hands out ids 3 * n + i
+        assert router.for_hedgehog(3 * 17 + 2) == "shard_2"
+
+    async def test_router_needs_a_database(self) -> None:
+        with pytest.raises(ValueError):
+            ShardRouter([])
+
+    async def test_unconnected_primary_is_refused_when_shards_are_configured(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        assert get_shard_router("primary").databases == ["primary"]
+        monkeypatch.setattr(shards_module, "SHARD_DATABASE_URLS", ["shard_1"])
+        with pytest.raises(ShardsNotConnectedError):
+            get_shard_router("primary")
+
+
+class TestShardLayout:
+    async def test_databases_keep_the_layout_they_were_first_used_with(
+        self, client: AsyncClient, db: Database
+    ) -> None:
+        await check_shard_layout(ShardRouter([db]))
+        with pytest.raises(ShardLayoutError):
+            await check_shard_layout(ShardRouter([db, db]))
+
+    async def test_hedgehog_ids_are_64_bit(
+        self, client: AsyncClient, db: Database
+    ) -> None:
+        id_types = await db.fetch_all(
+            query="SELECT table_name, data_type FROM information_schema.columns "
+            "WHERE column_name = 'id' AND table_name IN "
+            "('hedgehogs', 'hedgehog_owners', 'hedgehogs_archive')"
+        )
+        assert {row["data_type"] for row in id_types} == {"bigint"}
+
+
+class TestShardedHedgehogs:
+    async def test_hedgehogs_are_stored_on_their_owners_shard(
+        self, shards: ShardRouter, shard_owners: List[UserInDB]
+    ) -> None:
+        repo = HedgehogsRepository(shards.primary, shards=shards)
+        hedgehogs = await create_hedgehogs(repo, shard_owners, "sharded hedgehog")
+
+        for owner, hedgehog in zip(shard_owners, hedgehogs):
+            shard = shards.shard_for_owner(owner.id)
+            assert hedgehog.id % shards.count == shard
+            for index, database in enumerate(shards.databases):
+                stored = await database.fetch_val(
+                    query="SELECT count(*) FROM hedgehogs WHERE id = :id",
+                    values={"id": hedgehog.id},
+                )
+                assert stored == (1 if index == shard else 0)
+
+            found = await repo.get_hedgehog_by_id(id=hedgehog.id, requesting_user=owner)
+            assert found.id == hedgehog.id
+            listed = await repo.list_all_user_hedgehogs(requesting_user=owner)
+            assert hedgehog.id in [item.id for item in listed]
+
+    async def test_catalog_fans_out_and_merges_pages(
+        self, shards: ShardRouter, shard_owners: List[UserInDB]
+    ) -> None:
+        repo = HedgehogsRepository(shards.primary, shards=shards)
+        hedgehogs = await create_hedgehogs(repo, shard_owners, "fanned out hedgehog")
+        expected = sorted((hedgehog.id for hedgehog in hedgehogs), reverse=True)
+
+        first = await repo.browse_catalog(limit=2, name="fanned out")
+        assert [item.id for item in first.results] == expected[:2]
+        assert first.total == len(hedgehogs)
+        second = await repo.browse_catalog(
+            limit=2, name="fanned out", cursor=first.next_cursor
+        )
+        assert [item.id for item in second.results] == expected[2:]
+        assert second.next_cursor is None
+
+    async def test_stats_are_kept_on_the_owners_shard(
+        self, shards: ShardRouter, shard_owners: List[UserInDB]
+    ) -> None:
+        repo = HedgehogsRepository(shards.primary, shards=shards)
+        stats_repo = UserStatsRepository(shards.primary, shards=shards)
+        owner = shard_owners[-1]
+        before = await stats_repo.get_user_stats(user_id=owner.id)
+        await create_hedgehogs(repo, [owner], "counted hedgehog")
+
+        after = await stats_repo.get_user_stats(user_id=owner.id)
+        assert after.hedgehog_count == before.hedgehog_count + 1
+        assert owner.id not in await stats_repo.find_inconsistent_stats()
+
+    async def test_changes_are_heard_from_every_shard(
+        self,
+        shards: ShardRouter,
+        shard_dsns: List[str],
+        shard_owners: List[UserInDB],
+    ) -> None:
+        received: List[ChangeEvent] = []
+        listener = ChangeListener()
+        listener.subscribe("hedgehogs", received.append)
+        await listener.start(os.environ["CONTAINER_DSN"], *shard_dsns)
+        try:
+            await wait_until(lambda: listener.connected)
+            repo = HedgehogsRepository(shards.primary, shards=shards)
+            hedgehogs = await create_hedgehogs(repo, shard_owners, "announced hog")
+            ids = {hedgehog.id for hedgehog in hedgehogs}
+            await wait_until(lambda: ids <= {event.id for event in received})
+        finally:
+            await listener.stop()
+
+
+class TestShardedAccountDeletion:
+    @pytest.fixture(autouse=True)
+    def route_jobs_over_shards(
+        self, db: Database, shards: ShardRouter, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        # The job handler builds its repositories from the primary alone.
+        monkeypatch.setitem(shards_module._routers, id(db), shards)
+        monkeypatch.setattr(job_handlers, "ACCOUNT_DELETION_BATCH_SIZE", 2)
+        monkeypatch.setattr(job_handlers, "ACCOUNT_DELETION_BATCH_PAUSE_SECONDS", 0)
+
+    async def test_deletion_clears_hedgehogs_and_stats_on_the_owners_shard(
+        self, db: Database, shards: ShardRouter
+    ) -> None:
+        users_repo = UsersRepository(db)
+        owner = await register_owner_off_primary(users_repo, shards, "sharded_leaver")
+        shard = shards.for_owner(owner.id)
+        await create_hedgehogs(HedgehogsRepository(db), [owner] * 5, "leaving hog")
+        assert await count_owner_rows(shard, "user_stats", "user_id", owner.id) == 1
+
+        await users_repo.schedule_account_deletion(user=owner)
+        jobs_repo = JobsRepository(db)
+        job = await jobs_repo.claim_next_job(
+            tasks=[DELETE_ACCOUNT_TASK], lock_timeout=60
+        )
+        await Worker(db).process_job(job=job)
+
+        finished = await jobs_repo.get_job_by_id(id=job.id)
+        assert finished.progress == {"hedgehogs_deleted": 5, "user_deleted": True}
+        assert await count_owner_rows(shard, "hedgehogs", "owner", owner.id) == 0
+        assert await count_owner_rows(shard, "user_stats", "user_id", owner.id) == 0
+
+    async def test_reactivating_stops_the_deletion_on_the_owners_shard(
+        self, db: Database, shards: ShardRouter, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        users_repo = UsersRepository(db)
+        owner = await register_owner_off_primary(users_repo, shards, "sharded_stayer")
+        shard = shards.for_owner(owner.id)
+        await create_hedgehogs(HedgehogsRepository(db), [owner] * 5, "staying hog")
+        await users_repo.schedule_account_deletion(user=owner)
+
+        delete_batch = HedgehogsRepository.delete_inactive_owner_hedgehogs_batch
+
+        async def delete_then_reactivate(
+            hedgehogs_repo: HedgehogsRepository, *, owner: int, limit: int
+        ) -> int:
+            count = await delete_batch(hedgehogs_repo, owner=owner, limit=limit)
+            await users_repo.set_users_active(ids=[owner], is_active=True)
+            return count
+
+        monkeypatch.setattr(
+            HedgehogsRepository,
+            "delete_inactive_owner_hedgehogs_batch",
+            delete_then_reactivate,
+        )
+        jobs_repo = JobsRepository(db)
+        job = await jobs_repo.claim_next_job(
+            tasks=[DELETE_ACCOUNT_TASK], lock_timeout=60
+        )
+        await Worker(db).process_job(job=job)
+
+        finished = await jobs_repo.get_job_by_id(id=job.id)
+        assert finished.progress == {"hedgehogs_deleted": 2, "user_deleted": False}
+        assert await count_owner_rows(shard, "hedgehogs", "owner", owner.id) == 3
+        assert await count_owner_rows(shard, "user_stats", "user_id", owner.id) == 1
+        # The batch itself refuses to run for an active owner.
+        assert await delete_batch(HedgehogsRepository(db), owner=owner.id, limit=2) == 0
@@ -0,0 +1,150 @@
+import asyncio
+from contextvars import ContextVar
+
+import pytest
+from app.db.registry import compile_query
+from app.db.repositories.base import BaseRepository
+from app.db.repositories.hedgehogs import HedgehogsRepository
+from app.db.singleflight import SingleFlight, single_flight
+from app.db.unit_of_work import StatementTimeoutError, UnitOfWork
+from app.models.hedgehog import HedgehogInDB
+from app.models.user import UserInDB
+from databases import Database
+from httpx import AsyncClient
+
+pytestmark = pytest.mark.asyncio
+
+caller: ContextVar[str] = ContextVar("caller", default="nobody")
+
+
+class SlowQuery:
+    def __init__(self, result: object = "row", error: Exception = None) -> None:
+        self.calls = 0
+        self.result = result
+        self.error = error
+        self.release = asyncio.Event()
+
+    async def __call__(self) -> object:
+        self.calls += 1
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class TestSingleFlight:
+    async def test_concurrent_calls_with_same_key_share_one_execution(self) -> None:
+        flight = SingleFlight("test.flight.shared")
+        query = SlowQuery()
+        waiters = [asyncio.ensure_future(flight.do("key", query)) for _ in range(50)]
+        await asyncio.sleep(0)
+        assert flight.in_flight == 1
+
+        query.release.set()
+        assert await asyncio.gather(*waiters) == ["row"] * 50
+        assert query.calls == 1
+        assert flight.in_flight == 0
+
+    async def test_distinct_keys_run_separately(self) -> None:
+        flight = SingleFlight("test.flight.distinct")
+        query = SlowQuery()
+        query.release.set()
+        await asyncio.gather(flight.do("a", query), flight.do("b", query))
+        assert query.calls == 2
+
+    async def test_errors_reach_every_waiter(self) -> None:
+        flight = SingleFlight("test.flight.error")
+        query = SlowQuery(error=RuntimeError("boom"))
+        waiters = [asyncio.ensure_future(flight.do("key", query)) for _ in range(3)]
+        await asyncio.sleep(0)
+        query.release.set()
+
+        results = await asyncio.gather(*waiters, return_exceptions=True)
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert query.calls == 1
+        assert flight.in_flight == 0
+
+    async def test_cancelled_waiter_does_not_cancel_the_others(self) -> None:
+        flight = SingleFlight("test.flight.cancel")
+        query = SlowQuery()
+        first = asyncio.ensure_future(flight.do("key", query))
+        second = asyncio.ensure_future(flight.do("key", query))
+        await asyncio.sleep(0)
+
+        first.cancel()
+        await asyncio.sleep(0)
+        query.release.set()
+        assert await second == "row"
+        assert first.cancelled()
+
+    async def test_finished_calls_are_not_remembered(self) -> None:
+        flight = SingleFlight("test.flight.forget")
+        query = SlowQuery()
+        query.release.set()
+        await flight.do("key", query)
+        await flight.do("key", query)
+        assert query.calls == 2
+
+    async def test_shared_call_does_not_run_in_a_callers_context(self) -> None:
+        flight = SingleFlight("test.flight.context")
+
+        async def whose_context() -> str:
+            return caller.get()
+
+        caller.set("first")
+        assert await flight.do("key", whose_context) == "nobody"
+
+    async def test_each_waiter_is_bound_by_its_own_timeout(self) -> None:
+        flight = SingleFlight("test.flight.timeout")
+        query = SlowQuery()
+        impatient = asyncio.ensure_future(flight.do("key", query, timeout=0.01))
+        patient = asyncio.ensure_future(flight.do("key", query, timeout=5))
+
+        with pytest.raises(asyncio.TimeoutError):
+            await impatient
+        query.release.set()
+        assert await patient == "row"
+        assert query.calls == 1
+
+
+class TestCoalescedRepositoryReads:
+    async def test_concurrent_hedgehog_reads_issue_one_query(
+        self,
+        client: AsyncClient,
+        db: Database,
+        test_user: UserInDB,
+        test_hedgehog: HedgehogInDB,
+    ) -> None:
+        hedgehogs_repo = HedgehogsRepository(db)
+        executed = single_flight._executed.value
+
+        hedgehogs = await asyncio.gather(
+            *(
+                hedgehogs_repo.get_hedgehog_by_id(
+                    id=test_hedgehog.id, requesting_user=test_user
+                )
+                for _ in range(20)
+            )
+        )
+        assert all(hedgehog == test_hedgehog for hedgehog in hedgehogs)
+        assert single_flight._executed.value == executed + 1
+
+    async def test_a_short_deadline_does_not_fail_coalesced_reads(
+        self, client: AsyncClient, db: Database
+    ) -> None:
+        repo = BaseRepository(db)
+        slow_query = compile_query(
+            "SELECT pg_sleep(0.2), CAST(:id AS INTEGER) AS id",
+            name="test.slow_coalesced_read",
+        )
+
+        async def read(deadline: float) -> int:
+            async with UnitOfWork(db, transactional=False, statement_timeout=deadline):
+                row = await repo.fetch_one_coalesced(slow_query, {"id": 1})
+                return row["id"]
+
+        impatient = asyncio.ensure_future(read(0.05))
+        patient = asyncio.ensure_future(read(5))
+        with pytest.raises(StatementTimeoutError):
+            await impatient
+        assert await patient == 1
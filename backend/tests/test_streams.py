@@ -0,0 +1,112 @@
+import asyncio
+
+import pytest
+from app.api.routes.streams import SubscriptionResponse
+from app.db.events import change_listener
+from app.models.event import ChangeEvent, ChangeOperation
+from app.models.hedgehog import HedgehogCreate
+from app.models.user import UserInDB
+from app.services.streams import (
+    RESYNC,
+    ChangeBroadcaster,
+    StreamLimitExceeded,
+    change_broadcaster,
+    format_sse,
+)
+from fastapi import FastAPI, status
+from httpx import AsyncClient
+
+from tests.test_events import wait_until
+
+pytestmark = pytest.mark.asyncio
+
+
+def hedgehog_event(id: int, owner: int) -> ChangeEvent:
+    return ChangeEvent(table="hedgehogs", op=ChangeOperation.update, id=id, owner=owner)
+
+
+class TestChangeBroadcaster:
+    async def test_events_only_reach_the_owners_subscribers(self) -> None:
+        broadcaster = ChangeBroadcaster()
+        mine = broadcaster.subscribe(owner=1)
+        theirs = broadcaster.subscribe(owner=2)
+
+        broadcaster.publish(hedgehog_event(id=10, owner=1))
+        assert (await mine.get()).id == 10
+        assert theirs._queue.empty()
+
+        broadcaster.unsubscribe(mine)
+        broadcaster.unsubscribe(theirs)
+        assert broadcaster.subscriber_count == 0
+
+    async def test_slow_subscriber_buffer_is_bounded(self) -> None:
+        broadcaster = ChangeBroadcaster(buffer_size=3)
+        slow = broadcaster.subscribe(owner=1)
+
+        for i in range(10):
+            broadcaster.publish(hedgehog_event(id=i, owner=1))
+        assert slow._queue.qsize() <= 3
+        assert slow.dropped > 0
+
+        events = [slow._queue.get_nowait() for _ in range(slow._queue.qsize())]
+        assert events[0] is RESYNC
+
+    async def test_subscriber_limit_is_enforced(self) -> None:
+        broadcaster = ChangeBroadcaster(max_subscribers=1)
+        broadcaster.subscribe(owner=1)
+        with pytest.raises(StreamLimitExceeded):
+            broadcaster.subscribe(owner=2)
+
+    async def test_server_sent_event_format(self) -> None:
+        assert format_sse(hedgehog_event(id=5, owner=1)) == (
+            'event: hedgehogs\ndata: {"op": "U", "id": 5}\n\n'
+        )
+        assert format_sse(RESYNC) == "event: resync\ndata: {}\n\n"
+
+    async def test_unstreamed_responses_release_their_subscription(self) -> None:
+        before = change_broadcaster.subscriber_count
+        response = SubscriptionResponse(change_broadcaster.subscribe(owner=1))
+        assert change_broadcaster.subscriber_count == before + 1
+
+        async def receive() -> dict:
+            return {"type": "http.disconnect"}
+
+        async def send(message: dict) -> None:
+            raise ConnectionResetError("client went away")
+
+        with pytest.raises(ConnectionResetError):
+            await response({"type": "http"}, receive, send)
+        assert change_broadcaster.subscriber_count == before
+
+
+class TestChangeStream:
+    async def test_unauthenticated_users_cannot_subscribe(
+        self, app: FastAPI, client: AsyncClient
+    ) -> None:
+        res = await client.get(app.url_path_for("stream:subscribe-changes"))
+        assert res.status_code == status.HTTP_401_UNAUTHORIZED
+
+    async def test_new_hedgehog_reaches_owner_stream(
+        self,
+        app: FastAPI,
+        authorized_client: AsyncClient,
+        test_user: UserInDB,
+    ) -> None:
+        await wait_until(lambda: change_listener.connected)
+        subscription = change_broadcaster.subscribe(owner=test_user.id)
+        try:
+            new_hedgehog = HedgehogCreate(
+                name="streamed hedgehog", age=1.0, color_type="CHOCOLATE"
+            )
+            res = await authorized_client.post(
+                app.url_path_for("hedgehogs:create-hedgehog"),
+                json={"new_hedgehog": new_hedgehog.dict()},
+            )
+            assert res.status_code == status.HTTP_201_CREATED
+            event = await asyncio.wait_for(subscription.get(), timeout=10)
+        finally:
+            change_broadcaster.unsubscribe(subscription)
+
+        assert event.table == "hedgehogs"
+        assert event.op == ChangeOperation.insert
+        assert event.id == res.json()["id"]
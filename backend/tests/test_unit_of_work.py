@@ -0,0 +1,111 @@
+from contextlib import nullcontext
+from typing import List
+
+import pytest
+from app.core.metrics import metrics
+from app.db.repositories.users import UsersRepository
+from app.db.unit_of_work import UnitOfWork, after_commit, in_transaction
+from app.models.user import UserCreate
+from databases import Database
+from fastapi import FastAPI
+from httpx import AsyncClient
+from starlette.status import HTTP_201_CREATED, HTTP_400_BAD_REQUEST
+
+pytestmark = pytest.mark.asyncio
+
+
+def new_user(name: str) -> UserCreate:
+    return UserCreate(
+        email=f"{name}@unitofwork.io", username=name, password="unitofworkpassword"
+    )
+
+
+class TestAfterCommit:
+    async def test_callbacks_run_right_away_outside_a_unit_of_work(self) -> None:
+        calls: List[str] = []
+        assert not in_transaction()
+        await after_commit(lambda: calls.append("sync"))
+
+        async def record() -> None:
+            calls.append("async")
+
+        await after_commit(record)
+        assert calls == ["sync", "async"]
+
+    async def test_failing_callbacks_are_logged_not_raised(self) -> None:
+        await after_commit(lambda: 1 / 0)
+
+
+class TestUnitOfWork:
+    async def test_queries_share_one_connection(
+        self, client: AsyncClient, db: Database
+    ) -> None:
+        async with UnitOfWork(db, transactional=False):
+            pid = await db.fetch_val("SELECT pg_backend_pid()")
+            assert await db.fetch_val("SELECT pg_backend_pid()") == pid
+            assert not in_transaction()
+
+    async def test_multi_statement_writes_commit_together(
+        self, client: AsyncClient, db: Database
+    ) -> None:
+        users_repo = UsersRepository(db)
+        calls: List[str] = []
+        async with UnitOfWork(db, transactional=True):
+            assert in_transaction()
+            await users_repo.register_new_user(new_user=new_user("uow_committed"))
+            await after_commit(lambda: calls.append("committed"))
+            assert calls == []
+
+        assert calls == ["committed"]
+        user = await users_repo.get_user_by_username(username="uow_committed")
+        assert user.profile is not None
+
+    @pytest.mark.parametrize("fail_with", ("exception", "rollback_only"))
+    async def test_failed_units_roll_everything_back(
+        self, client: AsyncClient, db: Database, fail_with: str
+    ) -> None:
+        users_repo = UsersRepository(db)
+        username = f"uow_{fail_with}"
+        calls: List[str] = []
+        failure = pytest.raises(RuntimeError) if fail_with == "exception" else None
+        with failure or nullcontext():
+            async with UnitOfWork(db, transactional=True) as unit_of_work:
+                await users_repo.register_new_user(new_user=new_user(username))
+                await after_commit(lambda: calls.append("committed"))
+                if fail_with == "exception":
+                    raise RuntimeError("abort")
+                unit_of_work.set_rollback_only()
+
+        assert calls == []
+        assert await users_repo.get_user_by_username(username=username) is None
+        profiles = await db.fetch_val(
+            "SELECT count(*) FROM profiles p JOIN users u ON p.user_id = u.id "
+            "WHERE u.username = :username",
+            {"username": username},
+        )
+        assert profiles == 0
+
+
+class TestUnitOfWorkRoutes:
+    async def test_mutating_routes_commit_or_roll_back_by_status(
+        self, app: FastAPI, client: AsyncClient
+    ) -> None:
+        commits = metrics.counter("db.unit_of_work.commits")
+        rollbacks = metrics.counter("db.unit_of_work.rollbacks")
+        before = (commits.value, rollbacks.value)
+
+        payload = {
+            "new_user": {
+                "email": "uow_route@unitofwork.io",
+                "username": "uow_route",
+                "password": "unitofworkpassword",
+            }
+        }
+        url = app.url_path_for("users:register-new-user")
+        res = await client.post(url, json=payload)
+        assert res.status_code == HTTP_201_CREATED
+        assert (commits.value, rollbacks.value) == (before[0] + 1, before[1])
+
+        res = await client.post(url, json=payload)
+        assert res.status_code == HTTP_400_BAD_REQUEST
+        assert (commits.value, rollbacks.value) == (before[0] + 1, before[1] + 1)
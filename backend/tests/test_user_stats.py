@@ -0,0 +1,94 @@
+import pytest
+from app.db.repositories.hedgehogs import HedgehogsRepository
+from app.db.repositories.user_stats import UserStatsRepository
+from app.models.hedgehog import HedgehogCreate, HedgehogUpdate
+from app.models.user import UserInDB, UserPublic
+from app.models.user_stats import UserStats
+from databases import Database
+from fastapi import FastAPI, status
+from httpx import AsyncClient
+
+pytestmark = pytest.mark.asyncio
+
+
+async def get_my_stats(app: FastAPI, client: AsyncClient) -> UserStats:
+    res = await client.get(app.url_path_for("users:get-current-user"))
+    assert res.status_code == status.HTTP_200_OK
+    return UserPublic(**res.json()).stats
+
+
+class TestUserStats:
+    async def test_stats_follow_hedgehog_writes(
+        self,
+        app: FastAPI,
+        authorized_client: AsyncClient,
+        db: Database,
+        test_user: UserInDB,
+    ) -> None:
+        hedgehogs_repo = HedgehogsRepository(db)
+        before = await get_my_stats(app, authorized_client)
+
+        hedgehog = await hedgehogs_repo.create_hedgehog(
+            new_hedgehog=HedgehogCreate(
+                name="counted hedgehog", age=2.0, color_type="CHOCOLATE"
+            ),
+            requesting_user=test_user,
+        )
+        created = await get_my_stats(app, authorized_client)
+        assert created.hedgehog_count == before.hedgehog_count + 1
+        assert created.hedgehogs_by_color["CHOCOLATE"] == (
+            before.hedgehogs_by_color.get("CHOCOLATE", 0) + 1
+        )
+
+        await hedgehogs_repo.update_hedgehog(
+            hedgehog=hedgehog,
+            hedgehog_update=HedgehogUpdate(color_type="DARK GREY"),
+        )
+        updated = await get_my_stats(app, authorized_client)
+        assert updated.hedgehog_count == created.hedgehog_count
+        assert updated.hedgehogs_by_color.get("CHOCOLATE", 0) == (
+            before.hedgehogs_by_color.get("CHOCOLATE", 0)
+        )
+        assert updated.hedgehogs_by_color["DARK GREY"] == (
+            before.hedgehogs_by_color.get("DARK GREY", 0) + 1
+        )
+
+        await hedgehogs_repo.delete_hedgehog_by_id(hedgehog=hedgehog)
+        assert await get_my_stats(app, authorized_client) == before
+
+    async def test_average_age_matches_hedgehogs(
+        self,
+        app: FastAPI,
+        authorized_client: AsyncClient,
+        db: Database,
+        test_user: UserInDB,
+    ) -> None:
+        stats = await get_my_stats(app, authorized_client)
+        hedgehogs = await HedgehogsRepository(db).list_all_user_hedgehogs(
+            requesting_user=test_user
+        )
+        assert stats.hedgehog_count == len(hedgehogs)
+        if hedgehogs:
+            expected = sum(hedgehog.age for hedgehog in hedgehogs) / len(hedgehogs)
+            assert stats.average_age == pytest.approx(expected, abs=0.01)
+
+
+class TestUserStatsMaintenance:
+    async def test_check_finds_drift_and_rebuild_repairs_it(
+        self, client: AsyncClient, db: Database, test_user: UserInDB
+    ) -> None:
+        stats_repo = UserStatsRepository(db)
+        assert await stats_repo.find_inconsistent_stats() == []
+
+        await db.execute(
+            query="""
+                INSERT INTO user_stats (user_id, hedgehog_count)
+                VALUES (:user_id, 999)
+                ON CONFLICT (user_id) DO UPDATE SET hedgehog_count = 999;
+            """,
+            values={"user_id": test_user.id},
+        )
+        assert await stats_repo.find_inconsistent_stats() == [test_user.id]
+
+        await stats_repo.rebuild_stats()
+        assert await stats_repo.find_inconsistent_stats() == []
@@ -1,3 +1,4 @@
+import re
 from typing import Type, Union, Optional
 
 import jwt
@@ -8,9 +9,11 @@ from app.core.config import (
     JWT_AUDIENCE,
     SECRET_KEY,
 )
+from app.core.worker import Worker
 from app.db.repositories.users import UsersRepository
 from app.models.user import UserInDB, UserPublic
-from app.services import auth_service
+from app.services import auth_service, job_handlers
+from app.services.mail import MailService
 from databases import Database
 from fastapi import FastAPI, HTTPException
 from httpx import AsyncClient
@@ -19,10 +22,13 @@ from starlette.datastructures import Secret
 from starlette.status import (
     HTTP_200_OK,
     HTTP_201_CREATED,
+    HTTP_400_BAD_REQUEST,
     HTTP_404_NOT_FOUND,
     HTTP_401_UNAUTHORIZED,
 )
 
+from tests.utility import SMTPStandIn
+
 pytestmark = pytest.mark.asyncio
 
 
@@ -348,3 +354,66 @@ class TestUserMe:
             headers={"Authorization": f"{jwt_prefix} {token}"},
         )
         assert res.status_code == HTTP_401_UNAUTHORIZED
+
+
+class TestEmailVerification:
+    async def test_registration_sends_verification_email(
+        self,
+        app: FastAPI,
+        client: AsyncClient,
+        db: Database,
+        smtp_server: SMTPStandIn,
+        monkeypatch: pytest.MonkeyPatch,
+    ) -> None:
+        mailer = MailService(host="127.0.0.1", port=smtp_server.port)
+        monkeypatch.setattr(job_handlers, "mail_service", mailer)
+        new_user = {
+            "email": "verify@mail.com",
+            "username": "verifyme",
+            "password": "verifymepassword",
+        }
+        res = await client.post(
+            app.url_path_for("users:register-new-user"), json={"new_user": new_user}
+        )
+        assert res.status_code == HTTP_201_CREATED
+        assert res.json()["email_verified"] is False
+
+        worker = Worker(db)
+        while await worker.run_once():
+            pass
+        await mailer.close()
+
+        messages = [m for m in smtp_server.messages if m["To"] == new_user["email"]]
+        assert len(messages) == 1
+        token = re.search(r"token=(\S+)", messages[0].get_content()).group(1)
+
+        res = await client.post(
+            app.url_path_for("users:verify-email"), json={"token": token}
+        )
+        assert res.status_code == HTTP_200_OK
+        assert UserPublic(**res.json()).email_verified is True
+
+        user_repo = UsersRepository(db)
+        user_in_db = await user_repo.get_user_by_email(
+            email=new_user["email"], populate=False
+        )
+        assert user_in_db.email_verified is True
+
+    @pytest.mark.parametrize(
+        "token",
+        (
+            "invalid-token",
+            "use access token",
+        ),
+    )
+    async def test_invalid_verification_token_is_rejected(
+        self, app: FastAPI, client: AsyncClient, test_user: UserInDB, token: str
+    ) -> None:
+        if token == "use access token":
+            token = auth_service.create_access_token_for_user(
+                user=test_user, secret_key=str(SECRET_KEY)
+            )
+        res = await client.post(
+            app.url_path_for("users:verify-email"), json={"token": token}
+        )
+        assert res.status_code == HTTP_400_BAD_REQUEST
@@ -0,0 +1,117 @@
+from types import SimpleNamespace
+
+import pytest
+from app.core import warmup
+from app.core.metrics import metrics
+from app.db.drivers import pool_stats, warm_pool
+from app.db.registry import query_registry
+from app.models.user import UserInDB
+from app.services import profile_cache
+from app.services.profiles import profile_cache_key
+from databases import Database
+from fastapi import FastAPI, status
+from httpx import AsyncClient
+
+pytestmark = pytest.mark.asyncio
+
+
+class TestWarmUpSteps:
+    async def test_models_and_encoder_warm_up_without_a_database(self) -> None:
+        await warmup.warm_models()
+
+    async def test_failed_steps_are_logged_not_raised(self) -> None:
+        async def broken() -> None:
+            raise RuntimeError("cold")
+
+        await warmup.run_step("broken", broken)
+
+    async def test_warm_up_marks_the_worker_ready_and_times_it(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        async def skip() -> None:
+            pass
+
+        monkeypatch.setattr(warmup, "warm_auth", skip)
+        app = FastAPI()
+        app.state._db_connector = SimpleNamespace(available=False)
+        app.state._warmed_up = False
+
+        await warmup.warm_up(app, started_at=0.0)
+        assert app.state._warmed_up
+        assert metrics.gauge("startup.time_to_ready_seconds").value > 0
+
+    async def test_recovery_skips_warm_up_while_connections_are_in_use(
+        self, monkeypatch: pytest.MonkeyPatch
+    ) -> None:
+        warmed = []
+
+        async def warm_database(connector: object) -> None:
+            warmed.append(connector)
+
+        def connector_with(in_use: int) -> SimpleNamespace:
+            pool = SimpleNamespace(
+                get_size=lambda: 3,
+                get_idle_size=lambda: 3 - in_use,
+                get_min_size=lambda: 2,
+                get_max_size=lambda: 5,
+            )
+            return SimpleNamespace(
+                shards=SimpleNamespace(databases=[SimpleNamespace(pool=pool)])
+            )
+
+        monkeypatch.setattr(warmup, "warm_database", warm_database)
+        busy, idle = connector_with(in_use=1), connector_with(in_use=0)
+        await warmup.rewarm_database(busy)
+        await warmup.rewarm_database(idle)
+        assert warmed == [idle]
+
+
+class TestDatabaseWarmUp:
+    async def test_readiness_waits_for_warm_up(
+        self, app: FastAPI, client: AsyncClient
+    ) -> None:
+        await app.state._warm_up_task
+        app.state._warmed_up = False
+        try:
+            res = await client.get(app.url_path_for("health:readiness"))
+        finally:
+            app.state._warmed_up = True
+        assert res.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert res.json()["status"] == "warming"
+
+        res = await client.get(app.url_path_for("health:readiness"))
+        assert res.status_code == status.HTTP_200_OK
+
+    async def test_pools_are_filled_and_statements_prepared(
+        self, client: AsyncClient, db: Database
+    ) -> None:
+        max_size = pool_stats(db)["max_size"]
+        statement = query_registry["users.get_user_by_username"]
+        warmed = await warm_pool(db, size=max_size + 1, statements=[statement])
+
+        assert warmed == max_size
+        assert pool_stats(db)["size"] == max_size
+        prepared = await db.fetch_val(
+            "SELECT count(*) FROM pg_prepared_statements WHERE statement = :sql",
+            {"sql": statement.sql},
+        )
+        assert prepared == 1
+
+    async def test_connections_in_use_are_left_alone(
+        self, client: AsyncClient, db: Database
+    ) -> None:
+        max_size = pool_stats(db)["max_size"]
+        busy = await db.pool.acquire()
+        try:
+            warmed = await warm_pool(db, size=max_size)
+        finally:
+            await db.pool.release(busy)
+        assert warmed == max_size - 1
+
+    async def test_recently_updated_profiles_are_preloaded(
+        self, app: FastAPI, client: AsyncClient, test_user: UserInDB
+    ) -> None:
+        cache_key = profile_cache_key(test_user.username)
+        await profile_cache.delete(cache_key)
+        await warmup.preload_caches(app.state._db_connector)
+        assert await profile_cache.get(cache_key) is not None
@@ -1,6 +1,9 @@
+import asyncio
 import time
+from email import message_from_bytes, policy
+from email.message import EmailMessage
 from functools import wraps
-from typing import Any, Callable, Type
+from typing import Any, Callable, Dict, List, Set, Type
 
 import psycopg2
 
@@ -33,3 +36,142 @@ def ping_postgres(dsn: str) -> None:  # pragma: no cover
     cur.execute('select pid, state from pg_stat_activity;')
     cur.close()
     conn.close()
+
+
+class SMTPStandIn:
+    """
+    Just enough of an SMTP server to accept mail from smtplib. Messages are
+    collected in `messages`; recipients listed in `refused` are rejected.
+    """
+
+    def __init__(self) -> None:
+        self.messages: List[EmailMessage] = []
+        self.refused: Set[str] = set()
+        self.connections = 0
+        self.port = None
+        self._server = None
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        self.connections += 1
+        writer.write(b"220 localhost SMTP stand-in\r\n")
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            command = line.decode().strip()
+            verb = command.split(" ", 1)[0].upper()
+            if verb == "QUIT":
+                writer.write(b"221 Bye\r\n")
+                await writer.drain()
+                break
+            if verb == "RCPT" and any(addr in command for addr in self.refused):
+                writer.write(b"550 Mailbox unavailable\r\n")
+            elif verb == "DATA":
+                writer.write(b"354 End data with <CR><LF>.<CR><LF>\r\n")
+                await writer.drain()
+                data = b""
+                while True:
+                    chunk = await reader.readline()
+                    if chunk in (b".\r\n", b""):
+                        break
+                    data += chunk[1:] if chunk.startswith(b"..") else chunk
+                self.messages.append(message_from_bytes(data, policy=policy.default))
+                writer.write(b"250 OK\r\n")
+            elif verb in ("EHLO", "HELO", "MAIL", "RCPT", "RSET", "NOOP"):
+                writer.write(b"250 OK\r\n")
+            else:
+                writer.write(b"502 Command not implemented\r\n")
+            await writer.drain()
+        writer.close()
+
+
+class RedisStandIn:
+    """
+    In-process server speaking the subset of RESP used by RedisCache. TTLs are
+    accepted but not enforced.
+    """
+
+    def __init__(self) -> None:
+        self.data: Dict[bytes, Any] = {}
+        self.port = None
+        self._server = None
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        self._server.close()
+        await self._server.wait_closed()
+
+    @property
+    def url(self) -> str:
+        return f"redis://127.0.0.1:{self.port}/0"
+
+    async def _handle(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            while True:
+                header = await reader.readline()
+                if not header:
+                    break
+                args = []
+                for _ in range(int(header[1:])):
+                    length = int((await reader.readline())[1:])
+                    args.append((await reader.readexactly(length + 2))[:-2])
+                writer.write(self._reply(self._run(args[0].upper(), args[1:])))
+                await writer.drain()
+        finally:
+            writer.close()
+
+    def _run(self, command: bytes, args: List[bytes]) -> Any:
+        if command in (b"PING", b"SELECT", b"PEXPIRE"):
+            return "OK"
+        if command == b"GET":
+            value = self.data.get(args[0])
+            return value if isinstance(value, bytes) else None
+        if command == b"MGET":
+            return [self._run(b"GET", [key]) for key in args]
+        if command == b"SET":
+            self.data[args[0]] = args[1]
+            return "OK"
+        if command == b"INCR":
+            value = int(self.data.get(args[0], b"0")) + 1
+            self.data[args[0]] = str(value).encode()
+            return value
+        if command == b"DEL":
+            return sum(self.data.pop(key, None) is not None for key in args)
+        if command == b"SADD":
+            members = self.data.setdefault(args[0], set())
+            members.update(args[1:])
+            return len(args) - 1
+        if command == b"SMEMBERS":
+            return sorted(self.data.get(args[0], set()))
+        if command == b"SCAN":
+            pattern = args[2].rstrip(b"*")
+            return [b"0", [key for key in self.data if key.startswith(pattern)]]
+        return Exception(f"ERR unknown command {command.decode()}")
+
+    def _reply(self, value: Any) -> bytes:
+        if value is None:
+            return b"$-1\r\n"
+        if isinstance(value, Exception):
+            return f"-{value}\r\n".encode()
+        if isinstance(value, str):
+            return f"+{value}\r\n".encode()
+        if isinstance(value, int):
+            return f":{value}\r\n".encode()
+        if isinstance(value, bytes):
+            return b"$%d\r\n%s\r\n" % (len(value), value)
+        return b"*%d\r\n" % len(value) + b"".join(self._reply(v) for v in value)